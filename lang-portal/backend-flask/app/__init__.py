@@ -1,12 +1,15 @@
 from flask import Flask
 from flask_cors import CORS
 from config import Config
+from lib import db, query_stats
 
 def create_app():
     """Create and configure the Flask application."""
     app = Flask(__name__)
     app.config.from_object(Config)
     CORS(app)
+    db.init_app(app)
+    query_stats.init_app(app)
     
     # Register blueprints
     from app.routes.dashboard_routes import dashboard_bp
@@ -20,5 +23,8 @@ def create_app():
     app.register_blueprint(word_bp, url_prefix='/api')
     app.register_blueprint(group_bp, url_prefix='/api')
     app.register_blueprint(study_session_bp, url_prefix='/api')
+    if Config.DEBUG_ENDPOINTS:
+        from app.routes.debug_routes import debug_bp
+        app.register_blueprint(debug_bp, url_prefix='/api/debug')
     
     return app
@@ -0,0 +1,74 @@
+import threading
+import time
+from collections import OrderedDict
+
+class TTLCache:
+    """A small thread-safe in-process cache whose entries expire after ``ttl`` seconds."""
+
+    def __init__(self, ttl, max_entries=128):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Return the cached value for ``key``, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        """Store ``value`` under ``key``, evicting the oldest entry when full."""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+# Bumped by every model write path; cached results keyed on it go stale immediately
+# in this process, while the TTL bounds staleness across worker processes.
+_data_version = 0
+_table_versions = {}
+_invalidation_listeners = []
+_data_version_lock = threading.Lock()
+
+def get_data_version():
+    """Return the current in-process data version."""
+    return _data_version
+
+def get_table_versions(tables):
+    """Return the in-process versions of ``tables`` as a tuple."""
+    return tuple(_table_versions.get(table, 0) for table in tables)
+
+def bump_data_version(*tables):
+    """
+    Mark cached results as stale after a write.
+
+    The global data version always moves; ``tables`` additionally bumps the
+    versions of the tables that were written and notifies invalidation listeners.
+    """
+    global _data_version
+    with _data_version_lock:
+        _data_version += 1
+        for table in tables:
+            _table_versions[table] = _table_versions.get(table, 0) + 1
+        version = _data_version
+    for listener in _invalidation_listeners:
+        listener(tables)
+    return version
+
+def add_invalidation_listener(listener):
+    """Call ``listener(tables)`` whenever bump_data_version runs."""
+    _invalidation_listeners.append(listener)
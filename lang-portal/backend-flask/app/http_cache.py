@@ -0,0 +1,123 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import request, make_response
+from config import Config
+from app.cache import get_table_versions, add_invalidation_listener
+
+class ResponseCache:
+    """
+    An LRU cache of serialized JSON response bodies bounded by their total size.
+
+    Each entry remembers the versions of the tables it was built from and is only
+    served while those versions are unchanged and its TTL has not expired.
+    """
+
+    def __init__(self, max_bytes, ttl):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, versions):
+        """Return ``(etag, body)`` for a fresh entry, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry['versions'] != versions or entry['expires'] < time.monotonic():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry['etag'], entry['body']
+
+    def set(self, key, tables, versions, etag, body):
+        """Store a body, evicting least recently used entries to stay within max_bytes."""
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = {
+                'tables': tables,
+                'versions': versions,
+                'expires': time.monotonic() + self.ttl,
+                'etag': etag,
+                'body': body
+            }
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, tables):
+        """Drop every entry built from any of ``tables``."""
+        tables = set(tables)
+        with self._lock:
+            for key in [k for k, e in self._entries.items() if tables & set(e['tables'])]:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self.size,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self.size -= len(entry['body'])
+
+response_cache = ResponseCache(Config.HTTP_CACHE_MAX_BYTES, Config.HTTP_CACHE_TTL)
+add_invalidation_listener(response_cache.invalidate)
+
+def cached_response(*tables):
+    """
+    Cache a JSON GET view's body and answer conditional requests for it.
+
+    ``tables`` lists every table the response is built from; a write through the
+    models to any of them invalidates the cached body. Responses carry a strong
+    ETag (a hash of the body) and If-None-Match requests get a 304 straight from
+    the cache without touching the database.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            key = (Config.DATABASE_PATH, request.full_path)
+            versions = get_table_versions(tables)
+            cached = response_cache.get(key, versions)
+            
+            if cached is None:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200 or response.mimetype != 'application/json':
+                    return response
+                body = response.get_data()
+                etag = hashlib.sha1(body).hexdigest()
+                response_cache.set(key, tables, versions, etag, body)
+            else:
+                etag, body = cached
+                response = make_response(body)
+                response.mimetype = 'application/json'
+            
+            response.set_etag(etag)
+            # Clients may store the body but must revalidate it on every use
+            response.headers['Cache-Control'] = 'no-cache'
+            return response.make_conditional(request)
+        return wrapper
+    return decorator
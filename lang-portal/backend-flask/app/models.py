@@ -1,33 +1,48 @@
+import datetime
 import json
-from lib.db import query_db, execute_db
+import sqlite3
+from config import Config
+from lib.db import query_db, execute_db, transaction, clear_review_history
+from app.cache import TTLCache, get_data_version, bump_data_version
+from app.utils import decode_cursor, offset_page, keyset_page
+
+_dashboard_cache = TTLCache(Config.DASHBOARD_CACHE_TTL)
 
 class Word:
     @staticmethod
-    def get_all(page=1, per_page=100):
-        offset = (page - 1) * per_page
-        words = query_db("""
-            SELECT w.*, 
-                   (SELECT COUNT(*) FROM word_review_items WHERE word_id = w.id AND correct = 1) as correct_count,
-                   (SELECT COUNT(*) FROM word_review_items WHERE word_id = w.id AND correct = 0) as wrong_count
-            FROM words w
-            LIMIT ? OFFSET ?
-        """, (per_page, offset))
-        
-        total = query_db("SELECT COUNT(*) as count FROM words", one=True)['count']
+    def get_all(page=1, per_page=100, cursor=None, include_total=True):
+        if cursor is not None:
+            after = decode_cursor(cursor, 1)
+            words = query_db(f"""
+                SELECT w.*, 
+                       COALESCE(ws.correct_count, 0) as correct_count,
+                       COALESCE(ws.wrong_count, 0) as wrong_count
+                FROM words w
+                LEFT JOIN word_stats ws ON ws.word_id = w.id
+                {'WHERE w.id > ?' if after else ''}
+                ORDER BY w.id
+                LIMIT ?
+            """, (*after, per_page + 1))
+        else:
+            offset = (page - 1) * per_page
+            words = query_db("""
+                SELECT w.*, 
+                       COALESCE(ws.correct_count, 0) as correct_count,
+                       COALESCE(ws.wrong_count, 0) as wrong_count
+                FROM words w
+                LEFT JOIN word_stats ws ON ws.word_id = w.id
+                LIMIT ? OFFSET ?
+            """, (per_page, offset))
+        
+        total = query_db("SELECT COUNT(*) as count FROM words", one=True)['count'] if include_total else None
         
         for word in words:
             if 'parts' in word and word['parts']:
                 word['parts'] = json.loads(word['parts'])
         
-        return {
-            'pagination': {
-                'page': page,
-                'per_page': per_page,
-                'total': total,
-                'total_pages': (total + per_page - 1) // per_page
-            },
-            'items': words
-        }
+        if cursor is not None:
+            return keyset_page(words, per_page, cursor, total, key=lambda w: [w['id']])
+        return offset_page(words, page, per_page, total)
     
     @staticmethod
     def get_by_id(word_id):
@@ -38,16 +53,10 @@ class Word:
         if 'parts' in word and word['parts']:
             word['parts'] = json.loads(word['parts'])
         
-        stats = {
-            'correct_count': query_db(
-                "SELECT COUNT(*) as count FROM word_review_items WHERE word_id = ? AND correct = 1",
-                (word_id,), one=True
-            )['count'],
-            'wrong_count': query_db(
-                "SELECT COUNT(*) as count FROM word_review_items WHERE word_id = ? AND correct = 0",
-                (word_id,), one=True
-            )['count']
-        }
+        stats = query_db(
+            "SELECT correct_count, wrong_count FROM word_stats WHERE word_id = ?",
+            (word_id,), one=True
+        ) or {'correct_count': 0, 'wrong_count': 0}
         
         groups = query_db("""
             SELECT g.id, g.name 
@@ -63,20 +72,21 @@ class Word:
 
 class Group:
     @staticmethod
-    def get_all(page=1, per_page=100):
-        offset = (page - 1) * per_page
-        groups = query_db("SELECT * FROM groups LIMIT ? OFFSET ?", (per_page, offset))
-        total = query_db("SELECT COUNT(*) as count FROM groups", one=True)['count']
-        
-        return {
-            'pagination': {
-                'page': page,
-                'per_page': per_page,
-                'total': total,
-                'total_pages': (total + per_page - 1) // per_page
-            },
-            'items': groups
-        }
+    def get_all(page=1, per_page=100, cursor=None, include_total=True):
+        if cursor is not None:
+            after = decode_cursor(cursor, 1)
+            groups = query_db(
+                f"SELECT * FROM groups {'WHERE id > ?' if after else ''} ORDER BY id LIMIT ?",
+                (*after, per_page + 1)
+            )
+        else:
+            offset = (page - 1) * per_page
+            groups = query_db("SELECT * FROM groups LIMIT ? OFFSET ?", (per_page, offset))
+        total = query_db("SELECT COUNT(*) as count FROM groups", one=True)['count'] if include_total else None
+        
+        if cursor is not None:
+            return keyset_page(groups, per_page, cursor, total, key=lambda g: [g['id']])
+        return offset_page(groups, page, per_page, total)
     
     @staticmethod
     def get_by_id(group_id):
@@ -86,16 +96,16 @@ class Group:
         
         # Count of review items for this group
         group_review_count = query_db("""
-            SELECT COUNT(*) as count 
-            FROM word_review_items wri
-            JOIN words_groups wg ON wri.word_id = wg.word_id
+            SELECT COALESCE(SUM(ws.correct_count + ws.wrong_count), 0) as count 
+            FROM word_stats ws
+            JOIN words_groups wg ON ws.word_id = wg.word_id
             WHERE wg.group_id = ?
         """, (group_id,), one=True)['count']
         
         # Total count of review items across all groups
         total_review_count = query_db("""
-            SELECT COUNT(*) as count 
-            FROM word_review_items
+            SELECT COALESCE(SUM(correct_count + wrong_count), 0) as count 
+            FROM word_stats
         """, one=True)['count']
         
         # Calculate the percentage
@@ -114,19 +124,34 @@ class Group:
         return group
     
     @staticmethod
-    def get_words(group_id, page=1, per_page=100, raw=False):
-        offset = (page - 1) * per_page if not raw else 0
-        limit = per_page if not raw else -1
-        
-        words = query_db("""
-            SELECT w.*, 
-                   (SELECT COUNT(*) FROM word_review_items WHERE word_id = w.id AND correct = 1) as correct_count,
-                   (SELECT COUNT(*) FROM word_review_items WHERE word_id = w.id AND correct = 0) as wrong_count
-            FROM words w
-            JOIN words_groups wg ON w.id = wg.word_id
-            WHERE wg.group_id = ?
-            LIMIT ? OFFSET ?
-        """, (group_id, limit, offset))
+    def get_words(group_id, page=1, per_page=100, raw=False, cursor=None, include_total=True):
+        if cursor is not None and not raw:
+            after = decode_cursor(cursor, 1)
+            words = query_db(f"""
+                SELECT w.*, 
+                       COALESCE(ws.correct_count, 0) as correct_count,
+                       COALESCE(ws.wrong_count, 0) as wrong_count
+                FROM words w
+                JOIN words_groups wg ON w.id = wg.word_id
+                LEFT JOIN word_stats ws ON ws.word_id = w.id
+                WHERE wg.group_id = ? {'AND wg.word_id > ?' if after else ''}
+                ORDER BY wg.word_id
+                LIMIT ?
+            """, (group_id, *after, per_page + 1))
+        else:
+            offset = (page - 1) * per_page if not raw else 0
+            limit = per_page if not raw else -1
+            
+            words = query_db("""
+                SELECT w.*, 
+                       COALESCE(ws.correct_count, 0) as correct_count,
+                       COALESCE(ws.wrong_count, 0) as wrong_count
+                FROM words w
+                JOIN words_groups wg ON w.id = wg.word_id
+                LEFT JOIN word_stats ws ON ws.word_id = w.id
+                WHERE wg.group_id = ?
+                LIMIT ? OFFSET ?
+            """, (group_id, limit, offset))
         
         for word in words:
             if 'parts' in word and word['parts']:
@@ -138,17 +163,11 @@ class Group:
         total = query_db(
             "SELECT COUNT(*) as count FROM words_groups WHERE group_id = ?", 
             (group_id,), one=True
-        )['count']
+        )['count'] if include_total else None
         
-        return {
-            'pagination': {
-                'page': page,
-                'per_page': per_page,
-                'total': total,
-                'total_pages': (total + per_page - 1) // per_page
-            },
-            'items': words
-        }
+        if cursor is not None:
+            return keyset_page(words, per_page, cursor, total, key=lambda w: [w['id']])
+        return offset_page(words, page, per_page, total)
 
 class StudyActivity:
     @staticmethod
@@ -179,39 +198,72 @@ class StudySession:
             "INSERT INTO study_sessions (group_id, study_activity_id) VALUES (?, ?)",
             (group_id, study_activity_id)
         )
+        bump_data_version('study_sessions')
         
         return StudySession.get_by_id(session_id)
     
     @staticmethod
-    def get_all(page=1, per_page=100):
-        offset = (page - 1) * per_page
-        sessions = query_db("""
+    def _list(page, per_page, cursor, include_total, filter_column=None, filter_value=None, detailed=True):
+        """
+        List sessions newest first, optionally filtered by group or activity.
+
+        Keyset pagination seeks on (created_at, id), which the study_sessions
+        created_at indexes cover since SQLite appends the rowid to every index entry.
+        """
+        where, args = [], []
+        if filter_column:
+            where.append(f"ss.{filter_column} = ?")
+            args.append(filter_value)
+        
+        if cursor is not None:
+            after = decode_cursor(cursor, 2)
+            if after:
+                where.append("(ss.created_at, ss.id) < (?, ?)")
+                args.extend(after)
+            order_limit = "ORDER BY ss.created_at DESC, ss.id DESC LIMIT ?"
+            args.append(per_page + 1)
+        else:
+            order_limit = "ORDER BY ss.created_at DESC LIMIT ? OFFSET ?"
+            args.extend([per_page, (page - 1) * per_page])
+        
+        counts = """,
+                  COALESCE(st.correct_count, 0) as correct_count,
+                  COALESCE(st.wrong_count, 0) as wrong_count""" if detailed else ""
+        sessions = query_db(f"""
             SELECT ss.*, 
                   sa.name as activity_name, 
+                  g.id as group_id,
                   g.name as group_name,
                   ss.created_at as start_time,
-                  (SELECT COUNT(*) FROM word_review_items WHERE study_session_id = ss.id) as review_items_count
+                  COALESCE(st.correct_count + st.wrong_count, 0) as review_items_count{counts}
             FROM study_sessions ss
             JOIN study_activities sa ON ss.study_activity_id = sa.id
             JOIN groups g ON ss.group_id = g.id
-            ORDER BY ss.created_at DESC
-            LIMIT ? OFFSET ?
-        """, (per_page, offset))
+            LEFT JOIN session_stats st ON st.study_session_id = ss.id
+            {'WHERE ' + ' AND '.join(where) if where else ''}
+            {order_limit}
+        """, tuple(args))
         
         for session in sessions:
             session['end_time'] = session['start_time']  # Placeholder, in real app would calc based on last review
         
-        total = query_db("SELECT COUNT(*) as count FROM study_sessions", one=True)['count']
-        
-        return {
-            'pagination': {
-                'page': page,
-                'per_page': per_page,
-                'total': total,
-                'total_pages': (total + per_page - 1) // per_page
-            },
-            'items': sessions
-        }
+        total = None
+        if include_total:
+            if filter_column:
+                total = query_db(
+                    f"SELECT COUNT(*) as count FROM study_sessions WHERE {filter_column} = ?",
+                    (filter_value,), one=True
+                )['count']
+            else:
+                total = query_db("SELECT COUNT(*) as count FROM study_sessions", one=True)['count']
+        
+        if cursor is not None:
+            return keyset_page(sessions, per_page, cursor, total, key=lambda ss: [ss['created_at'], ss['id']])
+        return offset_page(sessions, page, per_page, total)
+    
+    @staticmethod
+    def get_all(page=1, per_page=100, cursor=None, include_total=True):
+        return StudySession._list(page, per_page, cursor, include_total, detailed=False)
     
     @staticmethod
     def get_by_id(session_id):
@@ -221,12 +273,13 @@ class StudySession:
                   g.id as group_id,
                   g.name as group_name,
                   ss.created_at as start_time,
-                  (SELECT COUNT(*) FROM word_review_items WHERE study_session_id = ss.id) as review_items_count,
-                  (SELECT COUNT(*) FROM word_review_items WHERE study_session_id = ss.id AND correct = 1) as correct_count,
-                  (SELECT COUNT(*) FROM word_review_items WHERE study_session_id = ss.id AND correct = 0) as wrong_count
+                  COALESCE(st.correct_count + st.wrong_count, 0) as review_items_count,
+                  COALESCE(st.correct_count, 0) as correct_count,
+                  COALESCE(st.wrong_count, 0) as wrong_count
             FROM study_sessions ss
             JOIN study_activities sa ON ss.study_activity_id = sa.id
             JOIN groups g ON ss.group_id = g.id
+            LEFT JOIN session_stats st ON st.study_session_id = ss.id
             WHERE ss.id = ?
         """, (session_id,), one=True)
         
@@ -236,109 +289,51 @@ class StudySession:
         return session
     
     @staticmethod
-    def get_by_activity_id(activity_id, page=1, per_page=100):
-        offset = (page - 1) * per_page
-        sessions = query_db("""
-            SELECT ss.*, 
-                  sa.name as activity_name,
-                  g.id as group_id,
-                  g.name as group_name,
-                  ss.created_at as start_time,
-                  (SELECT COUNT(*) FROM word_review_items WHERE study_session_id = ss.id) as review_items_count,
-                  (SELECT COUNT(*) FROM word_review_items WHERE study_session_id = ss.id AND correct = 1) as correct_count,
-                  (SELECT COUNT(*) FROM word_review_items WHERE study_session_id = ss.id AND correct = 0) as wrong_count
-            FROM study_sessions ss
-            JOIN study_activities sa ON ss.study_activity_id = sa.id
-            JOIN groups g ON ss.group_id = g.id
-            WHERE sa.id = ?
-            ORDER BY ss.created_at DESC
-            LIMIT ? OFFSET ?
-        """, (activity_id, per_page, offset))
-        
-        for session in sessions:
-            session['end_time'] = session['start_time']  # Placeholder
-        
-        total = query_db(
-            "SELECT COUNT(*) as count FROM study_sessions WHERE study_activity_id = ?", 
-            (activity_id,), one=True
-        )['count']
-        
-        return {
-            'pagination': {
-                'page': page,
-                'per_page': per_page,
-                'total': total,
-                'total_pages': (total + per_page - 1) // per_page
-            },
-            'items': sessions
-        }
+    def get_by_activity_id(activity_id, page=1, per_page=100, cursor=None, include_total=True):
+        return StudySession._list(page, per_page, cursor, include_total, 'study_activity_id', activity_id)
 
     @staticmethod
-    def get_by_group_id(group_id, page=1, per_page=100):
-        offset = (page - 1) * per_page
-        sessions = query_db("""
-            SELECT ss.*, 
-                  sa.name as activity_name, 
-                  g.id as group_id,
-                  g.name as group_name,
-                  ss.created_at as start_time,
-                  (SELECT COUNT(*) FROM word_review_items WHERE study_session_id = ss.id) as review_items_count,
-                  (SELECT COUNT(*) FROM word_review_items WHERE study_session_id = ss.id AND correct = 1) as correct_count,
-                  (SELECT COUNT(*) FROM word_review_items WHERE study_session_id = ss.id AND correct = 0) as wrong_count
-            FROM study_sessions ss
-            JOIN study_activities sa ON ss.study_activity_id = sa.id
-            JOIN groups g ON ss.group_id = g.id
-            WHERE g.id = ?
-            ORDER BY ss.created_at DESC
-            LIMIT ? OFFSET ?
-        """, (group_id, per_page, offset))
-        
-        for session in sessions:
-            session['end_time'] = session['start_time']  # Placeholder
-        
-        total = query_db(
-            "SELECT COUNT(*) as count FROM study_sessions WHERE group_id = ?", 
-            (group_id,), one=True
-        )['count']
-        
-        return {
-            'pagination': {
-                'page': page,
-                'per_page': per_page,
-                'total': total,
-                'total_pages': (total + per_page - 1) // per_page
-            },
-            'items': sessions
-        }
+    def get_by_group_id(group_id, page=1, per_page=100, cursor=None, include_total=True):
+        return StudySession._list(page, per_page, cursor, include_total, 'group_id', group_id)
     
     @staticmethod
-    def get_session_words(session_id, page=1, per_page=100):
-        offset = (page - 1) * per_page
-        words = query_db("""
-            SELECT w.id, w.portuguese, w.kimbundu, w.english,
-                   (SELECT COUNT(*) FROM word_review_items WHERE word_id = w.id AND correct = 1) as correct_count,
-                   (SELECT COUNT(*) FROM word_review_items WHERE word_id = w.id AND correct = 0) as wrong_count
-            FROM words w
-            JOIN word_review_items wri ON w.id = wri.word_id
-            WHERE wri.study_session_id = ?
-            GROUP BY w.id
-            LIMIT ? OFFSET ?
-        """, (session_id, per_page, offset))
+    def get_session_words(session_id, page=1, per_page=100, cursor=None, include_total=True):
+        if cursor is not None:
+            after = decode_cursor(cursor, 1)
+            words = query_db(f"""
+                SELECT w.id, w.portuguese, w.kimbundu, w.english,
+                       COALESCE(ws.correct_count, 0) as correct_count,
+                       COALESCE(ws.wrong_count, 0) as wrong_count
+                FROM words w
+                JOIN word_review_items wri ON w.id = wri.word_id
+                LEFT JOIN word_stats ws ON ws.word_id = w.id
+                WHERE wri.study_session_id = ? {'AND wri.word_id > ?' if after else ''}
+                GROUP BY wri.word_id
+                ORDER BY wri.word_id
+                LIMIT ?
+            """, (session_id, *after, per_page + 1))
+        else:
+            offset = (page - 1) * per_page
+            words = query_db("""
+                SELECT w.id, w.portuguese, w.kimbundu, w.english,
+                       COALESCE(ws.correct_count, 0) as correct_count,
+                       COALESCE(ws.wrong_count, 0) as wrong_count
+                FROM words w
+                JOIN word_review_items wri ON w.id = wri.word_id
+                LEFT JOIN word_stats ws ON ws.word_id = w.id
+                WHERE wri.study_session_id = ?
+                GROUP BY w.id
+                LIMIT ? OFFSET ?
+            """, (session_id, per_page, offset))
         
         total = query_db(
-            "SELECT COUNT(DISTINCT word_id) as count FROM word_review_items WHERE study_session_id = ?", 
+            "SELECT COALESCE(MAX(distinct_words), 0) as count FROM session_stats WHERE study_session_id = ?", 
             (session_id,), one=True
-        )['count']
+        )['count'] if include_total else None
         
-        return {
-            'pagination': {
-                'page': page,
-                'per_page': per_page,
-                'total': total,
-                'total_pages': (total + per_page - 1) // per_page
-            },
-            'items': words
-        }
+        if cursor is not None:
+            return keyset_page(words, per_page, cursor, total, key=lambda w: [w['id']])
+        return offset_page(words, page, per_page, total)
     
     @staticmethod
     def record_word_review(session_id, word_id, correct):
@@ -346,6 +341,7 @@ class StudySession:
             "INSERT INTO word_review_items (word_id, study_session_id, correct) VALUES (?, ?, ?)",
             (word_id, session_id, 1 if correct else 0)
         )
+        bump_data_version('word_review_items')
         
         review = query_db(
             "SELECT * FROM word_review_items WHERE id = ?", 
@@ -361,10 +357,69 @@ class StudySession:
             'created_at': review['created_at']
         }
     
+    # Rows per multi-row INSERT; 3 bind variables each stays under SQLite's
+    # historical 999 variable limit
+    REVIEW_BATCH_SIZE = 300
+    
+    @staticmethod
+    def record_word_reviews(session_id, reviews):
+        """
+        Record a batch of ``{'word_id', 'correct'}`` reviews in one transaction.
+
+        Returns None if the session does not exist and raises ValueError if any
+        word is not part of the session's group; nothing is written in either case.
+        """
+        rows = [(review['word_id'], session_id, 1 if review['correct'] else 0) for review in reviews]
+        created = []
+        
+        with transaction() as conn:
+            session = conn.execute(
+                "SELECT group_id FROM study_sessions WHERE id = ?", (session_id,)
+            ).fetchone()
+            if not session:
+                return None
+            
+            # Set-based membership check for every submitted word at once
+            invalid = conn.execute("""
+                SELECT DISTINCT value as word_id
+                FROM json_each(?)
+                WHERE value NOT IN (SELECT word_id FROM words_groups WHERE group_id = ?)
+                ORDER BY value
+            """, (json.dumps([row[0] for row in rows]), session['group_id'])).fetchall()
+            if invalid:
+                word_ids = ', '.join(str(row['word_id']) for row in invalid)
+                raise ValueError(f"Words not in the session's group: {word_ids}")
+            
+            for i in range(0, len(rows), StudySession.REVIEW_BATCH_SIZE):
+                batch = rows[i:i + StudySession.REVIEW_BATCH_SIZE]
+                cur = conn.execute(f"""
+                    INSERT INTO word_review_items (word_id, study_session_id, correct)
+                    VALUES {', '.join(['(?, ?, ?)'] * len(batch))}
+                    RETURNING id, word_id, study_session_id, correct, created_at
+                """, [value for row in batch for value in row])
+                created.extend(cur.fetchall())
+        
+        bump_data_version('word_review_items')
+        
+        return {
+            'success': True,
+            'study_session_id': session_id,
+            'count': len(created),
+            'items': [{
+                'id': review['id'],
+                'word_id': review['word_id'],
+                'study_session_id': review['study_session_id'],
+                'correct': review['correct'] == 1,
+                'created_at': review['created_at']
+            } for review in created]
+        }
+    
     @staticmethod
     def reset_history():
-        execute_db("DELETE FROM word_review_items")
-        execute_db("DELETE FROM study_sessions")
+        with transaction() as conn:
+            clear_review_history(conn)
+            conn.execute("DELETE FROM study_sessions")
+        bump_data_version('word_review_items', 'study_sessions')
         return {'success': True, 'message': 'History reset successfully'}
     
     @staticmethod
@@ -379,18 +434,16 @@ class StudySession:
                 ss.study_activity_id AS activity_id,
                 ss.group_id,
                 g.name AS group_name,
-                COUNT(DISTINCT wri.word_id) AS review_items_count,
+                COALESCE(st.distinct_words, 0) AS review_items_count,
                 g.words_count AS total_words_count
             FROM 
                 study_sessions ss
             JOIN 
                 groups g ON ss.group_id = g.id
             LEFT JOIN 
-                word_review_items wri ON ss.id = wri.study_session_id
-            GROUP BY 
-                ss.id
-            HAVING 
-                review_items_count < total_words_count
+                session_stats st ON ss.id = st.study_session_id
+            WHERE 
+                COALESCE(st.distinct_words, 0) < g.words_count
             ORDER BY 
                 ss.created_at DESC
             LIMIT 3
@@ -404,145 +457,126 @@ class StudySession:
 class Dashboard:
     @staticmethod
     def get_last_study_session():
-        session = query_db("""
-            SELECT ss.id, ss.group_id, 
-                   ss.created_at as start_time, 
-                   COALESCE(
-                       (SELECT MAX(created_at) FROM word_review_items WHERE study_session_id = ss.id),
-                       ss.created_at
-                   ) as end_time,
-                   sa.name as activity_name,
-                   g.name as group_name,
-                   (SELECT COUNT(*) FROM word_review_items WHERE study_session_id = ss.id AND correct = 1) as correct_count,
-                   (SELECT COUNT(*) FROM word_review_items WHERE study_session_id = ss.id AND correct = 0) as wrong_count
-            FROM study_sessions ss
-            JOIN study_activities sa ON ss.study_activity_id = sa.id
-            JOIN groups g ON ss.group_id = g.id
-            ORDER BY ss.created_at DESC
-            LIMIT 1
-        """, one=True)
-        
-        return session or {
-            'id': None,
-            'group_id': None,
-            'start_time': None,
-            'end_time': None,
-            'activity_name': None,
-            'group_name': None,
-            'correct_count': 0,
-            'wrong_count': 0
-        }
+        return Dashboard.get_summary()['last_study_session']
     
     @staticmethod
     def get_study_progress():
-        total_words = query_db("SELECT COUNT(*) as count FROM words", one=True)['count']
-        studied_words = query_db(
-            "SELECT COUNT(DISTINCT word_id) as count FROM word_review_items", 
-            one=True
-        )['count']
-        
-        # Calculate studied words trend as a percentage
-        # Get the latest session ID
-        latest_session = query_db("""
-            SELECT id FROM study_sessions 
-            ORDER BY created_at DESC 
-            LIMIT 1
-        """, one=True)
-        
-        studied_words_trend = 0
-        if latest_session:
-            # Count new words learned in the latest session (not seen before)
-            new_words_count = query_db("""
-                SELECT COUNT(DISTINCT word_id) as count
-                FROM word_review_items
-                WHERE study_session_id = ? 
-                AND word_id NOT IN (
-                    SELECT DISTINCT word_id 
-                    FROM word_review_items 
-                    WHERE study_session_id != ?
-                )
-            """, (latest_session['id'], latest_session['id']), one=True)['count']
-            
-            # Calculate trend as percentage of total studied words
-            if studied_words > 0:
-                studied_words_trend = round((new_words_count / studied_words) * 100, 1)
-        
-        return {
-            'total_words': total_words,
-            'studied_words': studied_words,
-            'studied_words_trend': studied_words_trend
-        }
+        return Dashboard.get_summary()['study_progress']
     
     @staticmethod
     def get_quick_stats():
-        # Calculate success rate
-        review_stats = query_db("""
+        return Dashboard.get_summary()['quick_stats']
+    
+    @staticmethod
+    def get_summary():
+        """
+        Returns every dashboard metric in one payload.
+
+        The result is cached against the data version bumped by the write paths,
+        so repeated landing page loads skip the database entirely.
+        """
+        today = datetime.date.today()
+        key = ('dashboard_summary', Config.DATABASE_PATH, get_data_version(), today.isoformat())
+        summary = _dashboard_cache.get(key)
+        if summary is None:
+            summary = Dashboard._compute_summary(today)
+            _dashboard_cache.set(key, summary)
+        return summary
+    
+    @staticmethod
+    def _compute_summary(today):
+        # One aggregate scan over the sessions and their materialized counters
+        totals = query_db("""
             SELECT 
-                COUNT(*) as total,
-                SUM(CASE WHEN correct = 1 THEN 1 ELSE 0 END) as correct
-            FROM word_review_items
+                (SELECT COUNT(*) FROM words) as total_words,
+                (SELECT COUNT(*) FROM word_stats) as studied_words,
+                COUNT(ss.id) as total_study_sessions,
+                COUNT(DISTINCT ss.group_id) as total_active_groups,
+                COALESCE(SUM(st.correct_count), 0) as correct,
+                COALESCE(SUM(st.correct_count + st.wrong_count), 0) as total
+            FROM study_sessions ss
+            LEFT JOIN session_stats st ON st.study_session_id = ss.id
         """, one=True)
         
-        success_rate = 0
-        if review_stats['total'] > 0:
-            success_rate = (review_stats['correct'] / review_stats['total']) * 100
-        
-        # Calculate success rate trend
-        # Get the latest session ID
-        latest_session = query_db("""
-            SELECT id FROM study_sessions 
-            ORDER BY created_at DESC 
+        # The latest session, including how many of its words were never reviewed
+        # in any other session (their whole review history lies in this session)
+        latest = query_db("""
+            SELECT ss.id, ss.group_id, 
+                   ss.created_at as start_time, 
+                   COALESCE(st.last_reviewed_at, ss.created_at) as end_time,
+                   sa.name as activity_name,
+                   g.name as group_name,
+                   COALESCE(st.correct_count, 0) as correct_count,
+                   COALESCE(st.wrong_count, 0) as wrong_count,
+                   (SELECT COUNT(*)
+                    FROM (SELECT word_id, COUNT(*) as reviews
+                          FROM word_review_items
+                          WHERE study_session_id = ss.id
+                          GROUP BY word_id) sw
+                    JOIN word_stats ws ON ws.word_id = sw.word_id
+                    WHERE ws.correct_count + ws.wrong_count = sw.reviews) as new_words_count
+            FROM study_sessions ss
+            JOIN study_activities sa ON ss.study_activity_id = sa.id
+            JOIN groups g ON ss.group_id = g.id
+            LEFT JOIN session_stats st ON st.study_session_id = ss.id
+            ORDER BY ss.created_at DESC, ss.id DESC
             LIMIT 1
         """, one=True)
         
+        success_rate = 0
+        if totals['total'] > 0:
+            success_rate = (totals['correct'] / totals['total']) * 100
+        
         success_rate_trend = 0
-        if latest_session:
-            # Calculate success rate for previous sessions
-            previous_stats = query_db("""
-                SELECT 
-                    COUNT(*) as total,
-                    SUM(CASE WHEN correct = 1 THEN 1 ELSE 0 END) as correct
-                FROM word_review_items
-                WHERE study_session_id != ?
-            """, (latest_session['id'],), one=True)
+        studied_words_trend = 0
+        if latest:
+            new_words_count = latest.pop('new_words_count')
+            latest_total = latest['correct_count'] + latest['wrong_count']
+            previous_total = totals['total'] - latest_total
             
-            # Calculate success rate for the latest session
-            latest_stats = query_db("""
-                SELECT 
-                    COUNT(*) as total,
-                    SUM(CASE WHEN correct = 1 THEN 1 ELSE 0 END) as correct
-                FROM word_review_items
-                WHERE study_session_id = ?
-            """, (latest_session['id'],), one=True)
+            latest_rate = 0
+            if latest_total > 0:
+                latest_rate = (latest['correct_count'] / latest_total) * 100
             
             previous_rate = 0
-            if previous_stats['total'] > 0:
-                previous_rate = (previous_stats['correct'] / previous_stats['total']) * 100
-                
-            latest_rate = 0
-            if latest_stats['total'] > 0:
-                latest_rate = (latest_stats['correct'] / latest_stats['total']) * 100
-                
+            if previous_total > 0:
+                previous_rate = ((totals['correct'] - latest['correct_count']) / previous_total) * 100
+            
             # Calculate trend (difference between latest and previous rates)
             success_rate_trend = latest_rate - previous_rate
-
-        # Get session count
-        total_sessions = query_db(
-            "SELECT COUNT(*) as count FROM study_sessions", 
-            one=True
-        )['count']
-        
-        # Get active groups count
-        active_groups = query_db("""
-            SELECT COUNT(DISTINCT group_id) as count 
-            FROM study_sessions
-        """, one=True)['count']
-        
-        # Calculate study streak (consecutive days with sessions up to yesterday)
-        import datetime
-        import sqlite3
+            
+            # New words in the latest session as a percentage of total studied words
+            if totals['studied_words'] > 0:
+                studied_words_trend = round((new_words_count / totals['studied_words']) * 100, 1)
         
-        today = datetime.date.today()
+        return {
+            'last_study_session': latest or {
+                'id': None,
+                'group_id': None,
+                'start_time': None,
+                'end_time': None,
+                'activity_name': None,
+                'group_name': None,
+                'correct_count': 0,
+                'wrong_count': 0
+            },
+            'study_progress': {
+                'total_words': totals['total_words'],
+                'studied_words': totals['studied_words'],
+                'studied_words_trend': studied_words_trend
+            },
+            'quick_stats': {
+                'success_rate': round(success_rate, 1),
+                'success_rate_trend': round(success_rate_trend, 1),
+                'total_study_sessions': totals['total_study_sessions'],
+                'total_active_groups': totals['total_active_groups'],
+                'study_streak_days': Dashboard._study_streak(today)
+            }
+        }
+    
+    @staticmethod
+    def _study_streak(today):
+        """Consecutive days with sessions, counting back from yesterday."""
         yesterday = today - datetime.timedelta(days=1)
         yesterday_str = yesterday.strftime('%Y-%m-%d')
         
@@ -558,9 +592,9 @@ class Dashboard:
             streak_dates AS (
                 SELECT 
                     session_date,
-                    -- Calculate difference between row number and date
-                    -- This will be constant for consecutive dates
-                    julianday(session_date) - ROW_NUMBER() OVER (ORDER BY session_date DESC) as group_id
+                    -- Dates are numbered newest first, so the sum of date and row
+                    -- number stays constant across consecutive dates
+                    julianday(session_date) + ROW_NUMBER() OVER (ORDER BY session_date DESC) as group_id
                 FROM session_dates
             )
             SELECT CASE 
@@ -573,7 +607,7 @@ class Dashboard:
             END as streak_days
             """
             
-            study_streak = query_db(study_streak_query, (yesterday_str, yesterday_str, yesterday_str), one=True)['streak_days']
+            return query_db(study_streak_query, (yesterday_str, yesterday_str, yesterday_str), one=True)['streak_days']
             
         except sqlite3.OperationalError:
             # Fallback for older SQLite versions that don't support window functions
@@ -602,30 +636,26 @@ class Dashboard:
                         streak_date = streak_date - datetime.timedelta(days=1)
                     else:
                         break
-        
-        return {
-            'success_rate': round(success_rate, 1),
-            'success_rate_trend': round(success_rate_trend, 1),
-            'total_study_sessions': total_sessions,
-            'total_active_groups': active_groups,
-            'study_streak_days': study_streak
-        }
+            return study_streak
     
     @staticmethod
     def full_reset():
         # Delete in order of dependency to avoid foreign key constraint violations
         
-        # Start with tables that have foreign keys to other tables
-        execute_db("DELETE FROM word_review_items")  # References words and study_sessions
-        
-        # Then delete from tables with fewer dependencies
-        execute_db("DELETE FROM words_groups")  # Junction table between words and groups
-        execute_db("DELETE FROM study_sessions")  # References groups and study_activities
-        
-        # Finally delete from primary tables
-        execute_db("DELETE FROM words")
-        execute_db("DELETE FROM groups")
-        execute_db("DELETE FROM study_activities")  # Including this as requested
+        with transaction() as conn:
+            # Start with tables that have foreign keys to other tables
+            clear_review_history(conn)  # References words and study_sessions, with their counters
+            
+            # Then delete from tables with fewer dependencies
+            conn.execute("DELETE FROM words_groups")  # Junction table between words and groups
+            conn.execute("DELETE FROM study_sessions")  # References groups and study_activities
+            
+            # Finally delete from primary tables
+            conn.execute("DELETE FROM words")
+            conn.execute("DELETE FROM groups")
+            conn.execute("DELETE FROM study_activities")  # Including this as requested
+        bump_data_version('word_review_items', 'words_groups', 'study_sessions',
+                          'words', 'groups', 'study_activities')
         
         return {'success': True, 'message': 'Full database reset completed successfully'}
     
@@ -636,24 +666,21 @@ class Dashboard:
         """
         try:
             # Calculate date 31 days ago
-            import datetime
             thirty_one_days_ago = (datetime.datetime.now() - datetime.timedelta(days=31)).strftime('%Y-%m-%d')
             
             query = """
             SELECT 
                 ss.id,
                 DATE(ss.created_at) as start_time,
-                COUNT(wri.id) as review_items_count,
-                SUM(CASE WHEN wri.correct = 1 THEN 1 ELSE 0 END) as correct_count,
-                SUM(CASE WHEN wri.correct = 0 THEN 1 ELSE 0 END) as wrong_count
+                COALESCE(st.correct_count + st.wrong_count, 0) as review_items_count,
+                COALESCE(st.correct_count, 0) as correct_count,
+                COALESCE(st.wrong_count, 0) as wrong_count
             FROM 
                 study_sessions ss
             LEFT JOIN 
-                word_review_items wri ON ss.id = wri.study_session_id
+                session_stats st ON ss.id = st.study_session_id
             WHERE 
                 DATE(ss.created_at) >= ?
-            GROUP BY 
-                ss.id, DATE(ss.created_at)
             ORDER BY 
                 DATE(ss.created_at) ASC
             """
@@ -25,3 +25,10 @@ def get_performance_graph():
     Returns performance statistics for the last 31 days.
     """
     return jsonify(Dashboard.get_performance_graph())
+
+@dashboard_bp.route('/summary', methods=['GET'])
+def get_summary():
+    """
+    Returns the last study session, study progress and quick stats in one payload.
+    """
+    return jsonify(Dashboard.get_summary())
@@ -0,0 +1,43 @@
+from flask import Blueprint, jsonify, request
+from lib.db import get_pool_stats
+from lib.query_stats import query_stats
+from app.http_cache import response_cache
+
+debug_bp = Blueprint('debug', __name__)
+
+@debug_bp.route('/pool', methods=['GET'])
+def get_pool():
+    """
+    Returns connection pool statistics for the current worker process.
+    """
+    return jsonify(get_pool_stats())
+
+@debug_bp.route('/http_cache', methods=['GET'])
+def get_http_cache():
+    """
+    Returns response cache statistics for the current worker process.
+    """
+    return jsonify(response_cache.stats())
+
+@debug_bp.route('/queries', methods=['GET'])
+def get_queries():
+    """
+    Returns the top statements by fingerprint and suspected N+1 patterns
+    for the current worker process.
+    """
+    limit = request.args.get('limit', 20, type=int)
+    order_by = request.args.get('order_by', 'total_ms')
+    if order_by not in ('total_ms', 'calls', 'max_ms'):
+        return jsonify({'error': 'order_by must be one of total_ms, calls, max_ms'}), 400
+    return jsonify({
+        'queries': query_stats.top(limit, order_by),
+        'n_plus_one': query_stats.n_plus_one(),
+    })
+
+@debug_bp.route('/queries', methods=['DELETE'])
+def reset_queries():
+    """
+    Clears the collected query statistics.
+    """
+    query_stats.reset()
+    return jsonify({'message': 'Query statistics reset'})
@@ -1,15 +1,22 @@
 from flask import Blueprint, jsonify
 from app.models import Group
-from app.utils import get_pagination_params
+from app.utils import get_pagination_params, get_cursor_params, InvalidCursor
+from app.http_cache import cached_response
 
 group_bp = Blueprint('groups', __name__)
 
 @group_bp.route('/groups', methods=['GET'])
+@cached_response('groups', 'words_groups')
 def get_groups():
     page, per_page = get_pagination_params()
-    return jsonify(Group.get_all(page, per_page))
+    cursor, include_total = get_cursor_params()
+    try:
+        return jsonify(Group.get_all(page, per_page, cursor, include_total))
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
 
 @group_bp.route('/groups/<int:group_id>', methods=['GET'])
+@cached_response('groups', 'words_groups', 'word_review_items')
 def get_group(group_id):
     group = Group.get_by_id(group_id)
     if not group:
@@ -17,17 +24,28 @@ def get_group(group_id):
     return jsonify(group)
 
 @group_bp.route('/groups/<int:group_id>/words', methods=['GET'])
+@cached_response('words', 'words_groups', 'word_review_items')
 def get_group_words(group_id):
     page, per_page = get_pagination_params()
-    return jsonify(Group.get_words(group_id, page, per_page))
+    cursor, include_total = get_cursor_params()
+    try:
+        return jsonify(Group.get_words(group_id, page, per_page, cursor=cursor, include_total=include_total))
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
 
 @group_bp.route('/groups/<int:group_id>/words/raw', methods=['GET'])
+@cached_response('words', 'words_groups', 'word_review_items')
 def get_group_words_raw(group_id):
     words = Group.get_words(group_id, raw=True)
     return jsonify(words)
 
 @group_bp.route('/groups/<int:group_id>/study_sessions', methods=['GET'])
+@cached_response('study_sessions', 'word_review_items', 'groups', 'study_activities')
 def get_group_study_sessions(group_id):
     from app.models import StudySession
     page, per_page = get_pagination_params()
-    return jsonify(StudySession.get_by_group_id(group_id, page, per_page))
+    cursor, include_total = get_cursor_params()
+    try:
+        return jsonify(StudySession.get_by_group_id(group_id, page, per_page, cursor, include_total))
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
@@ -1,15 +1,18 @@
 from flask import Blueprint, jsonify
 from app.models import StudyActivity, StudySession
-from app.utils import get_pagination_params
+from app.utils import get_pagination_params, get_cursor_params, InvalidCursor
+from app.http_cache import cached_response
 
 study_activity_bp = Blueprint('study_activities', __name__)
 
 @study_activity_bp.route('/study_activities', methods=['GET'])
+@cached_response('study_activities')
 def get_study_activities():
     activities = StudyActivity.get_all()
     return jsonify(activities)
 
 @study_activity_bp.route('/study_activities/<int:activity_id>', methods=['GET'])
+@cached_response('study_activities')
 def get_study_activity(activity_id):
     activity = StudyActivity.get_by_id(activity_id)
     if not activity:
@@ -17,6 +20,7 @@ def get_study_activity(activity_id):
     return jsonify(activity)
 
 @study_activity_bp.route('/study_activities/<int:activity_id>/launch', methods=['GET'])
+@cached_response('study_activities', 'groups')
 def launch_study_activity(activity_id):
     launch_info = StudyActivity.get_launch_info(activity_id)
     if not launch_info:
@@ -24,6 +28,11 @@ def launch_study_activity(activity_id):
     return jsonify(launch_info)
 
 @study_activity_bp.route('/study_activities/<int:activity_id>/study_sessions', methods=['GET'])
+@cached_response('study_sessions', 'word_review_items', 'groups', 'study_activities')
 def get_activity_study_sessions(activity_id):
     page, per_page = get_pagination_params()
-    return jsonify(StudySession.get_by_activity_id(activity_id, page, per_page))
+    cursor, include_total = get_cursor_params()
+    try:
+        return jsonify(StudySession.get_by_activity_id(activity_id, page, per_page, cursor, include_total))
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
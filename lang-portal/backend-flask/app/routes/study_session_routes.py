@@ -1,6 +1,6 @@
 from flask import Blueprint, jsonify, request
 from app.models import StudySession
-from app.utils import get_pagination_params
+from app.utils import get_pagination_params, get_cursor_params, InvalidCursor
 from lib.db import query_db
 
 study_session_bp = Blueprint('study_sessions', __name__)
@@ -8,7 +8,11 @@ study_session_bp = Blueprint('study_sessions', __name__)
 @study_session_bp.route('/study_sessions', methods=['GET'])
 def get_study_sessions():
     page, per_page = get_pagination_params()
-    return jsonify(StudySession.get_all(page, per_page))
+    cursor, include_total = get_cursor_params()
+    try:
+        return jsonify(StudySession.get_all(page, per_page, cursor, include_total))
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
 
 @study_session_bp.route('/study_sessions', methods=['POST'])
 def create_study_session():
@@ -31,7 +35,11 @@ def get_study_session(session_id):
 @study_session_bp.route('/study_sessions/<int:session_id>/words', methods=['GET'])
 def get_session_words(session_id):
     page, per_page = get_pagination_params()
-    return jsonify(StudySession.get_session_words(session_id, page, per_page))
+    cursor, include_total = get_cursor_params()
+    try:
+        return jsonify(StudySession.get_session_words(session_id, page, per_page, cursor, include_total))
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
 
 @study_session_bp.route('/study_sessions/<int:session_id>/words/<int:word_id>/review', methods=['POST'])
 def record_word_review(session_id, word_id):
@@ -42,6 +50,27 @@ def record_word_review(session_id, word_id):
     result = StudySession.record_word_review(session_id, word_id, correct)
     return jsonify(result)
 
+@study_session_bp.route('/study_sessions/<int:session_id>/reviews', methods=['POST'])
+def record_word_reviews(session_id):
+    reviews = request.get_json(silent=True)
+    if isinstance(reviews, dict):
+        reviews = reviews.get('reviews')
+    if not isinstance(reviews, list) or not reviews:
+        return jsonify({'error': 'Expected a non-empty array of reviews'}), 400
+    
+    for review in reviews:
+        if (not isinstance(review, dict) or 'correct' not in review
+                or not isinstance(review.get('word_id'), int) or isinstance(review.get('word_id'), bool)):
+            return jsonify({'error': 'Each review requires an integer "word_id" and "correct"'}), 400
+    
+    try:
+        result = StudySession.record_word_reviews(session_id, reviews)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if result is None:
+        return jsonify({'error': 'Study session not found'}), 404
+    return jsonify(result)
+
 @study_session_bp.route('/study_sessions/reset_history', methods=['POST'])
 def reset_history():
     return jsonify(StudySession.reset_history())
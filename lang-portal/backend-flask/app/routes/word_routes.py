@@ -1,15 +1,22 @@
 from flask import Blueprint, jsonify
 from app.models import Word
-from app.utils import get_pagination_params
+from app.utils import get_pagination_params, get_cursor_params, InvalidCursor
+from app.http_cache import cached_response
 
 word_bp = Blueprint('words', __name__)
 
 @word_bp.route('/words', methods=['GET'])
+@cached_response('words', 'word_review_items')
 def get_words():
     page, per_page = get_pagination_params()
-    return jsonify(Word.get_all(page, per_page))
+    cursor, include_total = get_cursor_params()
+    try:
+        return jsonify(Word.get_all(page, per_page, cursor, include_total))
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
 
 @word_bp.route('/words/<int:word_id>', methods=['GET'])
+@cached_response('words', 'word_review_items', 'words_groups', 'groups')
 def get_word(word_id):
     word = Word.get_by_id(word_id)
     if not word:
@@ -1,5 +1,10 @@
+import base64
+import json
 from flask import request
 
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor cannot be decoded."""
+
 def get_pagination_params():
     """Extract and validate pagination parameters from the request."""
     try:
@@ -14,3 +19,63 @@ def get_pagination_params():
         per_page = 100
     
     return page, per_page
+
+def get_cursor_params():
+    """
+    Extract keyset pagination parameters from the request.
+
+    Returns ``(cursor, include_total)``. ``cursor`` is None unless the client opted
+    into keyset pagination; an empty ``cursor=`` requests the first page.
+    """
+    cursor = request.args.get('cursor')
+    include_total = request.args.get('include_total', 'true').lower() not in ('false', '0', 'no')
+    return cursor, include_total
+
+def encode_cursor(values):
+    """Encode the seek values of the last row on a page as an opaque cursor."""
+    raw = json.dumps(values, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor, size):
+    """Decode a cursor into its ``size`` seek values; an empty cursor yields []."""
+    if not cursor:
+        return []
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        raise InvalidCursor(f"Invalid cursor: {cursor}")
+    if not isinstance(values, list) or len(values) != size:
+        raise InvalidCursor(f"Invalid cursor: {cursor}")
+    return values
+
+def offset_page(items, page, per_page, total):
+    """Build a page/per_page paginated response; ``total`` may be None when not requested."""
+    return {
+        'pagination': {
+            'page': page,
+            'per_page': per_page,
+            'total': total,
+            'total_pages': (total + per_page - 1) // per_page if total is not None else None
+        },
+        'items': items
+    }
+
+def keyset_page(rows, per_page, cursor, total, key):
+    """
+    Build a cursor paginated response from ``per_page + 1`` fetched rows.
+
+    The extra row only signals that another page exists; ``key`` returns the seek
+    values of a row, which become the ``next_cursor``.
+    """
+    has_more = len(rows) > per_page
+    items = rows[:per_page]
+    return {
+        'pagination': {
+            'per_page': per_page,
+            'cursor': cursor or None,
+            'next_cursor': encode_cursor(key(items[-1])) if has_more else None,
+            'has_more': has_more,
+            'total': total
+        },
+        'items': items
+    }
@@ -0,0 +1,133 @@
+"""
+Measure model method latency on a large synthetic dataset before and after
+the index migrations are applied.
+
+Usage (from the backend-flask directory):
+
+    python -m benchmarks.bench_indexes --reviews 1000000 --output results/indexes.json
+"""
+import argparse
+import json
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from lib.db import close_pool
+from benchmarks.datasets import build_database, index_migration_files, apply_migrations
+
+def model_calls(words, groups, sessions):
+    """Return (name, callable) pairs covering every read-only model method."""
+    from app.models import Word, Group, StudyActivity, StudySession, Dashboard
+
+    last_page = max((words + 99) // 100, 1)
+    return [
+        ('Word.get_all', lambda: Word.get_all(1, 100)),
+        ('Word.get_all[last_page]', lambda: Word.get_all(last_page, 100)),
+        ('Word.get_by_id', lambda: Word.get_by_id(words // 2 or 1)),
+        ('Group.get_all', lambda: Group.get_all(1, 100)),
+        ('Group.get_by_id', lambda: Group.get_by_id(1)),
+        ('Group.get_words', lambda: Group.get_words(1, 1, 100)),
+        ('Group.get_words[raw]', lambda: Group.get_words(1, raw=True)),
+        ('StudyActivity.get_all', lambda: StudyActivity.get_all()),
+        ('StudyActivity.get_launch_info', lambda: StudyActivity.get_launch_info(1)),
+        ('StudySession.get_all', lambda: StudySession.get_all(1, 100)),
+        ('StudySession.get_by_id', lambda: StudySession.get_by_id(sessions // 2 or 1)),
+        ('StudySession.get_by_activity_id', lambda: StudySession.get_by_activity_id(1, 1, 100)),
+        ('StudySession.get_by_group_id', lambda: StudySession.get_by_group_id(1, 1, 100)),
+        ('StudySession.get_session_words', lambda: StudySession.get_session_words(sessions // 2 or 1, 1, 100)),
+        ('StudySession.get_continue_learning', lambda: StudySession.get_continue_learning()),
+        ('Dashboard.get_last_study_session', lambda: Dashboard.get_last_study_session()),
+        ('Dashboard.get_study_progress', lambda: Dashboard.get_study_progress()),
+        ('Dashboard.get_quick_stats', lambda: Dashboard.get_quick_stats()),
+        ('Dashboard.get_performance_graph', lambda: Dashboard.get_performance_graph()),
+    ]
+
+def time_calls(calls, repeat):
+    """Run each call ``repeat`` times and return latency summaries in milliseconds."""
+    from app import models
+    # the dashboard methods would otherwise be served from the summary cache
+    models._dashboard_cache.ttl = 0
+    results = {}
+    for name, fn in calls:
+        fn()  # warm the page cache and the connection pool
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            samples.append((time.perf_counter() - start) * 1000)
+        samples.sort()
+        results[name] = {
+            'median_ms': round(statistics.median(samples), 3),
+            'p95_ms': round(samples[min(int(len(samples) * 0.95), len(samples) - 1)], 3),
+            'max_ms': round(samples[-1], 3),
+        }
+        print(f"  {name:<40} {results[name]['median_ms']:>12.3f} ms")
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--words', type=int, default=10000)
+    parser.add_argument('--groups', type=int, default=20)
+    parser.add_argument('--sessions', type=int, default=10000)
+    parser.add_argument('--reviews', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--database', help='Where to build the benchmark database (default: a temp file)')
+    parser.add_argument('--output', help='Write the JSON results to this file')
+    args = parser.parse_args(argv)
+
+    database = args.database or os.path.join(tempfile.mkdtemp(prefix='bench-indexes-'), 'bench.db')
+    index_files = index_migration_files()
+
+    print(f"Building dataset at {database} ({args.words} words, {args.sessions} sessions, {args.reviews} reviews)")
+    start = time.perf_counter()
+    build_database(database, words=args.words, groups=args.groups, sessions=args.sessions,
+                   reviews=args.reviews, exclude_migrations=index_files)
+    print(f"Dataset built in {time.perf_counter() - start:.1f}s")
+
+    Config.DATABASE_PATH = database
+    close_pool()
+    calls = model_calls(args.words, args.groups, args.sessions)
+
+    print("Before index migrations:")
+    before = time_calls(calls, args.repeat)
+
+    close_pool()
+    conn = sqlite3.connect(database)
+    try:
+        start = time.perf_counter()
+        apply_migrations(conn, index_files)
+        conn.execute("ANALYZE")
+        print(f"Applied {', '.join(index_files)} in {time.perf_counter() - start:.1f}s")
+    finally:
+        conn.close()
+
+    print("After index migrations:")
+    after = time_calls(calls, args.repeat)
+    close_pool()
+
+    print(f"\n{'method':<40} {'before ms':>12} {'after ms':>12} {'speedup':>9}")
+    for name, _ in calls:
+        b, a = before[name]['median_ms'], after[name]['median_ms']
+        speedup = b / a if a else float('inf')
+        print(f"{name:<40} {b:>12.3f} {a:>12.3f} {speedup:>8.1f}x")
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump({
+                'dataset': {'words': args.words, 'groups': args.groups,
+                            'sessions': args.sessions, 'reviews': args.reviews},
+                'index_migrations': index_files,
+                'before': before,
+                'after': after,
+            }, f, indent=2)
+        print(f"Results written to {args.output}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,307 @@
+"""
+Load-test every GET route of the API on a synthetic dataset and profile the
+SQL behind it.
+
+For each endpoint the benchmark reports throughput and p50/p95/p99 latency
+under concurrency. When driving the app in-process it also records per-query
+timings through the lib/db query listener hook and captures the
+EXPLAIN QUERY PLAN of every distinct statement. Results are written as JSON
+so runs can be compared across commits.
+
+Usage (from the backend-flask directory):
+
+    python -m benchmarks.bench_routes --scale medium --concurrency 8
+    python -m benchmarks.bench_routes --scale large --compare benchmarks/results/large-abc1234.json
+    python -m benchmarks.bench_routes --url http://localhost:5000 --scale small
+"""
+import argparse
+import datetime
+import json
+import os
+import re
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from lib import db
+from benchmarks.datasets import build_database
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+
+SCALES = {
+    'small': {'words': 1000, 'groups': 10, 'sessions': 1000, 'reviews': 10000},
+    'medium': {'words': 10000, 'groups': 20, 'sessions': 10000, 'reviews': 100000},
+    'large': {'words': 10000, 'groups': 50, 'sessions': 100000, 'reviews': 1000000},
+}
+
+# Extra query strings worth measuring on top of each route's default request
+VARIANTS = {
+    '/api/words': ['?page={last_page}', '?cursor=&include_total=false'],
+    '/api/study_sessions': ['?page={last_session_page}', '?cursor=&include_total=false'],
+}
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not samples:
+        return None
+    index = max(int(round(pct / 100 * len(samples) + 0.5)) - 1, 0)
+    return samples[min(index, len(samples) - 1)]
+
+def current_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       cwd=BENCH_DIR, stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+def dataset_path(scale, dataset):
+    """Build (once) and return the database for a scale."""
+    data_dir = os.path.join(BENCH_DIR, '.data')
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, f"{scale}.db")
+    if not os.path.exists(path):
+        print(f"Building {scale} dataset at {path} ({dataset})")
+        start = time.perf_counter()
+        build_database(path, **dataset)
+        print(f"Dataset built in {time.perf_counter() - start:.1f}s")
+    return path
+
+def get_endpoints(app, dataset):
+    """Every GET route with its path parameters filled in from the dataset."""
+    ids = {
+        'word_id': dataset['words'] // 2 or 1,
+        'group_id': 1,
+        'session_id': dataset['sessions'] // 2 or 1,
+        'activity_id': 1,
+    }
+    fill = {
+        'last_page': max((dataset['words'] + 99) // 100, 1),
+        'last_session_page': max((dataset['sessions'] + 99) // 100, 1),
+    }
+    endpoints = []
+    for rule in sorted(app.url_map.iter_rules(), key=lambda r: r.rule):
+        if 'GET' not in rule.methods or rule.endpoint == 'static' or rule.rule.startswith('/api/debug'):
+            continue
+        path = rule.rule
+        for name in rule.arguments:
+            path = re.sub(rf"<(?:\w+:)?{name}>", str(ids.get(name, 1)), path)
+        endpoints.append(path)
+        endpoints.extend(path + variant.format(**fill) for variant in VARIANTS.get(rule.rule, []))
+    return endpoints
+
+class QueryProfiler:
+    """Collects per-statement timings from the lib/db listener hook, per endpoint."""
+
+    def __init__(self):
+        self.current = threading.local()
+        self.lock = threading.Lock()
+        self.queries = {}
+
+    def __call__(self, query, args, duration):
+        statement = ' '.join(query.split())
+        with self.lock:
+            entry = self.queries.setdefault(statement, {
+                'statement': statement,
+                'sample_args': list(args) if isinstance(args, (list, tuple)) else args,
+                'endpoints': {},
+                'calls': 0,
+                'total_ms': 0.0,
+                'max_ms': 0.0,
+            })
+            entry['calls'] += 1
+            entry['total_ms'] += duration * 1000
+            entry['max_ms'] = max(entry['max_ms'], duration * 1000)
+            endpoint = getattr(self.current, 'endpoint', None)
+            if endpoint:
+                entry['endpoints'][endpoint] = entry['endpoints'].get(endpoint, 0) + 1
+
+    def explain(self, database):
+        """Attach EXPLAIN QUERY PLAN output to every recorded statement."""
+        conn = sqlite3.connect(database)
+        try:
+            for entry in self.queries.values():
+                if not entry['statement'].lstrip().upper().startswith(('SELECT', 'WITH')):
+                    continue
+                try:
+                    rows = conn.execute(f"EXPLAIN QUERY PLAN {entry['statement']}", entry['sample_args'] or ()).fetchall()
+                    entry['query_plan'] = [row[-1] for row in rows]
+                except sqlite3.Error as e:
+                    entry['query_plan'] = [f"error: {e}"]
+        finally:
+            conn.close()
+
+    def report(self):
+        rows = sorted(self.queries.values(), key=lambda e: e['total_ms'], reverse=True)
+        for entry in rows:
+            entry['total_ms'] = round(entry['total_ms'], 3)
+            entry['max_ms'] = round(entry['max_ms'], 3)
+            entry['avg_ms'] = round(entry['total_ms'] / entry['calls'], 3)
+        return rows
+
+def run_endpoint(request, endpoint, requests, concurrency, profiler=None):
+    """Issue ``requests`` GETs to ``endpoint`` from ``concurrency`` threads."""
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+
+    def worker(count):
+        nonlocal errors
+        if profiler:
+            profiler.current.endpoint = endpoint
+        local, failed = [], 0
+        for _ in range(count):
+            start = time.perf_counter()
+            status = request(endpoint)
+            local.append((time.perf_counter() - start) * 1000)
+            if status >= 400:
+                failed += 1
+        with lock:
+            latencies.extend(local)
+            errors += failed
+
+    shares = [requests // concurrency + (1 if i < requests % concurrency else 0) for i in range(concurrency)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(worker, [share for share in shares if share]))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'throughput_rps': round(len(latencies) / elapsed, 1) if elapsed else None,
+        'p50_ms': round(percentile(latencies, 50), 3),
+        'p95_ms': round(percentile(latencies, 95), 3),
+        'p99_ms': round(percentile(latencies, 99), 3),
+        'max_ms': round(latencies[-1], 3),
+    }
+
+def test_client_request(app):
+    """A request function backed by one Flask test client per thread."""
+    local = threading.local()
+
+    def request(path):
+        if not hasattr(local, 'client'):
+            local.client = app.test_client()
+        return local.client.get(path).status_code
+    return request
+
+def http_request(base_url):
+    """A request function against a running server."""
+    def request(path):
+        try:
+            with urllib.request.urlopen(base_url.rstrip('/') + path) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as e:
+            return e.code
+    return request
+
+def compare(current, baseline_path):
+    """Print p50/p95 changes per endpoint against an earlier result file."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\nCompared with {baseline.get('commit', '?')} ({baseline_path}):")
+    print(f"{'endpoint':<60} {'p50 ms':>10} {'delta':>8} {'p95 ms':>10} {'delta':>8}")
+    for endpoint, result in current['endpoints'].items():
+        before = baseline.get('endpoints', {}).get(endpoint)
+        if not before:
+            continue
+        deltas = []
+        for key in ('p50_ms', 'p95_ms'):
+            deltas.append((result[key] - before[key]) / before[key] * 100 if before[key] else 0.0)
+        print(f"{endpoint:<60} {result['p50_ms']:>10.3f} {deltas[0]:>+7.1f}% {result['p95_ms']:>10.3f} {deltas[1]:>+7.1f}%")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small')
+    parser.add_argument('--requests', type=int, default=200, help='Requests per endpoint')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--url', help='Drive a running server instead of the in-process test client')
+    parser.add_argument('--cold', action='store_true',
+                        help='Disable the in-process response and dashboard caches to measure the SQL path')
+    parser.add_argument('--output', help='Result file (default: benchmarks/results/<scale>-<commit>.json)')
+    parser.add_argument('--compare', help='Earlier result file to compare against')
+    args = parser.parse_args(argv)
+
+    dataset = SCALES[args.scale]
+    commit = current_commit()
+    profiler = None
+
+    if args.url:
+        request = http_request(args.url)
+        endpoints = get_endpoints(_create_app(), dataset)
+        database = None
+    else:
+        database = dataset_path(args.scale, dataset)
+        Config.DATABASE_PATH = database
+        db.close_pool()
+        app = _create_app()
+        if args.cold:
+            _disable_caches()
+        profiler = QueryProfiler()
+        db.add_query_listener(profiler)
+        request = test_client_request(app)
+        endpoints = get_endpoints(app, dataset)
+
+    results = {}
+    print(f"{'endpoint':<60} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for endpoint in endpoints:
+        request(endpoint)  # warm up
+        results[endpoint] = run_endpoint(request, endpoint, args.requests, args.concurrency, profiler)
+        r = results[endpoint]
+        print(f"{endpoint:<60} {r['throughput_rps']:>9.1f} {r['p50_ms']:>9.3f} {r['p95_ms']:>9.3f} {r['p99_ms']:>9.3f} {r['errors']:>7}")
+
+    output = {
+        'commit': commit,
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'scale': args.scale,
+        'dataset': dataset,
+        'mode': 'http' if args.url else 'test_client',
+        'cold': args.cold,
+        'requests_per_endpoint': args.requests,
+        'concurrency': args.concurrency,
+        'endpoints': results,
+    }
+
+    if profiler:
+        db.remove_query_listener(profiler)
+        profiler.explain(database)
+        output['queries'] = profiler.report()
+        print("\nTop statements by total time:")
+        for entry in output['queries'][:10]:
+            print(f"  {entry['total_ms']:>12.1f} ms  {entry['calls']:>7} calls  {entry['statement'][:90]}")
+        db.close_pool()
+
+    path = args.output or os.path.join(BENCH_DIR, 'results', f"{args.scale}-{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(output, f, indent=2)
+    print(f"\nResults written to {path}")
+
+    if args.compare:
+        compare(output, args.compare)
+
+def _create_app():
+    from app import create_app
+    app = create_app()
+    app.config['TESTING'] = True
+    app.config['DEBUG'] = False
+    return app
+
+def _disable_caches():
+    from app import models
+    from app.http_cache import response_cache
+    response_cache.max_bytes = 0
+    models._dashboard_cache.ttl = 0
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+import json
+import os
+import random
+import sqlite3
+import datetime
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'migrations')
+
+def migration_files(exclude=()):
+    """Return the sorted migration file names, skipping any listed in ``exclude``."""
+    return [f for f in sorted(os.listdir(MIGRATIONS_DIR)) if f.endswith('.sql') and f not in exclude]
+
+def index_migration_files():
+    """Return the migration files that only create indexes."""
+    return [f for f in migration_files() if f.endswith('_indexes.sql')]
+
+def apply_migrations(conn, files):
+    """Apply the given migration files to an open connection."""
+    for migration_file in files:
+        with open(os.path.join(MIGRATIONS_DIR, migration_file), 'r') as f:
+            conn.executescript(f.read())
+
+def build_database(path, words=10000, groups=20, sessions=10000, reviews=1000000,
+                   seed=42, exclude_migrations=()):
+    """
+    Create a SQLite database at ``path`` filled with synthetic, reproducible data.
+
+    Words are spread round-robin over the groups, each session studies one group,
+    and review items only reference words that belong to their session's group.
+    """
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute("PRAGMA journal_mode = MEMORY")
+        conn.execute("PRAGMA synchronous = OFF")
+        apply_migrations(conn, migration_files(exclude=exclude_migrations))
+
+        with conn:
+            conn.executemany(
+                "INSERT INTO study_activities (id, name, description, url, preview_url) VALUES (?, ?, ?, ?, ?)",
+                [(i, f"Activity {i}", f"Synthetic activity {i}", f"https://example.com/{i}", f"/images/{i}.jpg")
+                 for i in range(1, 5)]
+            )
+            conn.executemany(
+                "INSERT INTO groups (id, name) VALUES (?, ?)",
+                [(i, f"Group {i}") for i in range(1, groups + 1)]
+            )
+            conn.executemany(
+                "INSERT INTO words (id, portuguese, kimbundu, english, parts) VALUES (?, ?, ?, ?, ?)",
+                ((i, f"palavra{i}", f"dizwi{i}", f"word{i}",
+                  json.dumps({'portuguese': f"p{i}", 'kimbundu': f"k{i}", 'english': f"e{i}"}))
+                 for i in range(1, words + 1))
+            )
+            conn.executemany(
+                "INSERT INTO words_groups (word_id, group_id) VALUES (?, ?)",
+                ((i, (i - 1) % groups + 1) for i in range(1, words + 1))
+            )
+            conn.execute(
+                "UPDATE groups SET words_count = (SELECT COUNT(*) FROM words_groups WHERE group_id = groups.id)"
+            )
+
+            now = datetime.datetime(2025, 3, 1)
+            session_rows = []
+            for i in range(1, sessions + 1):
+                created = now - datetime.timedelta(minutes=rng.randrange(365 * 24 * 60))
+                session_rows.append((i, rng.randint(1, groups), rng.randint(1, 4), created))
+            conn.executemany(
+                "INSERT INTO study_sessions (id, group_id, study_activity_id, created_at) VALUES (?, ?, ?, ?)",
+                ((sid, gid, aid, created.strftime('%Y-%m-%d %H:%M:%S')) for sid, gid, aid, created in session_rows)
+            )
+
+            words_per_group = max(words // groups, 1)
+
+            def review_rows():
+                for i in range(1, reviews + 1):
+                    sid, gid, _, created = session_rows[rng.randrange(sessions)]
+                    word_id = gid + groups * rng.randrange(words_per_group)
+                    if word_id > words:
+                        word_id = gid
+                    reviewed = created + datetime.timedelta(seconds=rng.randrange(3600))
+                    yield (i, word_id, sid, 1 if rng.random() < 0.7 else 0,
+                           reviewed.strftime('%Y-%m-%d %H:%M:%S'))
+
+            conn.executemany(
+                "INSERT INTO word_review_items (id, word_id, study_session_id, correct, created_at) VALUES (?, ?, ?, ?, ?)",
+                review_rows()
+            )
+    finally:
+        conn.close()
+    return path
@@ -5,3 +5,31 @@ class Config:
     DEBUG = True
     CORS_HEADERS = 'Content-Type'
     isDemo = os.environ.get('FLASK_DEMO', 'False').lower() == 'true'
+
+    # Connection pool (one pool per worker process)
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 5))
+    DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 5.0))
+
+    # Connection-level SQLite PRAGMAs, applied once when a connection is opened
+    SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 64 * 1024 * 1024))
+    SQLITE_CACHE_SIZE = int(os.environ.get('SQLITE_CACHE_SIZE', -16000))  # negative values are KiB
+
+    # Seconds a cached dashboard summary may be served before it is recomputed
+    DASHBOARD_CACHE_TTL = float(os.environ.get('DASHBOARD_CACHE_TTL', 5.0))
+
+    # Serialized response cache for the word, group and study activity routes
+    HTTP_CACHE_MAX_BYTES = int(os.environ.get('HTTP_CACHE_MAX_BYTES', 16 * 1024 * 1024))
+    HTTP_CACHE_TTL = float(os.environ.get('HTTP_CACHE_TTL', 30.0))
+
+    # Unauthenticated /api/debug routes; only for development
+    DEBUG_ENDPOINTS = os.environ.get('DEBUG_ENDPOINTS', 'False').lower() == 'true'
+
+    # Per-statement instrumentation (see /api/debug/queries); follows DEBUG_ENDPOINTS unless set
+    QUERY_STATS_ENABLED = os.environ.get('QUERY_STATS_ENABLED', str(DEBUG_ENDPOINTS)).lower() == 'true'
+    QUERY_STATS_MAX_FINGERPRINTS = int(os.environ.get('QUERY_STATS_MAX_FINGERPRINTS', 500))
+    SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', 100.0))  # 0 disables the slow-query log
+    SLOW_QUERY_LOG = os.environ.get('SLOW_QUERY_LOG')  # file path; defaults to the 'db.slow' logger only
+    SLOW_QUERY_LOG_ARGS = os.environ.get('SLOW_QUERY_LOG_ARGS', 'False').lower() == 'true'  # bind args are user data
+    N_PLUS_ONE_THRESHOLD = int(os.environ.get('N_PLUS_ONE_THRESHOLD', 10))
@@ -0,0 +1,166 @@
+import json
+import time
+import logging
+from contextlib import contextmanager
+from itertools import islice
+
+logger = logging.getLogger('db')
+
+def iter_json_array(path, chunk_size=1 << 16):
+    """
+    Stream the elements of a top-level JSON array (or a JSON Lines file) from disk.
+
+    Only one element plus one read chunk is held in memory at a time, so seed and
+    vocabulary files of any size can be loaded.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, 'r') as f:
+        buffer = f.read(chunk_size)
+        pos = _skip_whitespace(buffer, 0)
+        in_array = buffer[pos:pos + 1] == '['
+        if in_array:
+            pos += 1
+
+        while True:
+            pos = _skip_whitespace(buffer, pos)
+            if in_array and buffer[pos:pos + 1] == ',':
+                pos = _skip_whitespace(buffer, pos + 1)
+            if in_array and buffer[pos:pos + 1] == ']':
+                return
+            if pos >= len(buffer):
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    if in_array:
+                        raise json.JSONDecodeError("Unterminated array", buffer, pos)
+                    return
+                buffer = buffer[pos:] + chunk
+                pos = 0
+                continue
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    raise
+                buffer = buffer[pos:] + chunk
+                pos = 0
+                continue
+            # A number can be cut at the chunk boundary and still decode
+            if end == len(buffer) and not isinstance(item, (dict, list, str)):
+                chunk = f.read(chunk_size)
+                if chunk:
+                    buffer = buffer[pos:] + chunk
+                    pos = 0
+                    continue
+            yield item
+            pos = end
+
+def _skip_whitespace(buffer, pos):
+    while pos < len(buffer) and buffer[pos] in ' \t\r\n':
+        pos += 1
+    return pos
+
+@contextmanager
+def bulk_load_settings(conn):
+    """
+    Relax durability while a bulk load runs and restore the settings afterwards.
+
+    ``synchronous`` is turned off and the rollback journal kept in memory. A
+    database in WAL mode stays in WAL: leaving it needs exclusive access, and WAL
+    commits are already append-only.
+    """
+    synchronous = conn.execute("PRAGMA synchronous").fetchone()[0]
+    journal_mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    if journal_mode.lower() != 'wal':
+        conn.execute("PRAGMA journal_mode = MEMORY")
+    try:
+        yield conn
+    finally:
+        if journal_mode.lower() != 'wal':
+            conn.execute(f"PRAGMA journal_mode = {journal_mode}")
+        conn.execute(f"PRAGMA synchronous = {int(synchronous)}")
+
+def batched(iterable, size):
+    """Yield lists of up to ``size`` items from ``iterable``."""
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+class LoadReport:
+    """Row count and throughput of one bulk load step."""
+
+    def __init__(self, name):
+        self.name = name
+        self.rows = 0
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    def finish(self):
+        self.elapsed = time.perf_counter() - self.started
+        message = f"Loaded {self.rows} rows into {self.name} in {self.elapsed:.2f}s ({self.rows_per_second:,.0f} rows/sec)"
+        logger.info(message)
+        print(message)
+        return self
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.elapsed if self.elapsed > 0 else float(self.rows)
+
+def load_rows(conn, name, query, rows, batch_size=5000):
+    """Insert ``rows`` with executemany in batches inside a single transaction."""
+    report = LoadReport(name)
+    with conn:
+        for batch in batched(rows, batch_size):
+            conn.executemany(query, batch)
+            report.rows += len(batch)
+    return report.finish()
+
+def load_words(conn, path, group_name, batch_size=5000):
+    """
+    Load a vocabulary file into a new group inside a single transaction.
+
+    Accepts the seed format and vocabulary-importer output: a JSON array (or JSON
+    Lines) of objects with portuguese, kimbundu, english and parts. Word ids are
+    assigned up front so words and their group links go in with executemany.
+    """
+    report = LoadReport(f"words ({group_name})")
+    with conn:
+        cur = conn.cursor()
+        cur.execute("INSERT INTO groups (name) VALUES (?)", (group_name,))
+        group_id = cur.lastrowid
+        next_id = cur.execute("SELECT COALESCE(MAX(id), 0) FROM words").fetchone()[0] + 1
+
+        for batch in batched(iter_json_array(path), batch_size):
+            words = []
+            for offset, word in enumerate(batch):
+                try:
+                    words.append((next_id + offset, word['portuguese'], word['kimbundu'], word['english'],
+                                  json.dumps(word['parts'])))
+                except KeyError as e:
+                    raise KeyError(f"{e.args[0]} (word {report.rows + offset + 1})") from e
+            cur.executemany(
+                "INSERT INTO words (id, portuguese, kimbundu, english, parts) VALUES (?, ?, ?, ?, ?)",
+                words
+            )
+            cur.executemany(
+                "INSERT INTO words_groups (word_id, group_id) VALUES (?, ?)",
+                [(word[0], group_id) for word in words]
+            )
+            next_id += len(words)
+            report.rows += len(words)
+    report.finish()
+    return group_id, report
+
+def rebuild_group_word_counts(conn):
+    """Recompute groups.words_count for every group in one statement."""
+    with conn:
+        conn.execute("""
+            UPDATE groups SET words_count = (
+                SELECT COUNT(*) FROM words_groups WHERE words_groups.group_id = groups.id
+            )
+        """)
@@ -1,67 +1,304 @@
 import sqlite3
 import json
 import os
+import queue
+import threading
+import time
 import logging
+from contextlib import contextmanager
+from flask import g, has_app_context
 from config import Config
+from lib.bulk import iter_json_array, bulk_load_settings, load_rows, load_words, rebuild_group_word_counts
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger('db')
 
-def get_db_connection():
+def _apply_pragmas(conn):
+    """Apply the connection-level PRAGMAs configured in Config."""
+    conn.execute("PRAGMA foreign_keys = ON")
+    conn.execute(f"PRAGMA journal_mode = {Config.SQLITE_JOURNAL_MODE}")
+    conn.execute(f"PRAGMA synchronous = {Config.SQLITE_SYNCHRONOUS}")
+    conn.execute(f"PRAGMA mmap_size = {int(Config.SQLITE_MMAP_SIZE)}")
+    conn.execute(f"PRAGMA cache_size = {int(Config.SQLITE_CACHE_SIZE)}")
+
+def get_db_connection(check_same_thread=True):
     """Establish a connection to the SQLite database."""
     try:
-        conn = sqlite3.connect(Config.DATABASE_PATH)
+        conn = sqlite3.connect(Config.DATABASE_PATH, check_same_thread=check_same_thread)
         conn.row_factory = sqlite3.Row
-        conn.execute("PRAGMA foreign_keys = ON")
+        _apply_pragmas(conn)
         return conn
     except sqlite3.Error as e:
         logger.error(f"Database connection error: {e}")
         raise Exception(f"Failed to connect to database: {e}")
 
+class ConnectionPool:
+    """A fixed-size pool of long-lived SQLite connections.
+
+    Connections are opened lazily up to ``size`` and handed out one at a time;
+    a connection is never shared by two threads at once, but may move between
+    threads across checkouts (hence ``check_same_thread=False``).
+    """
+
+    def __init__(self, size=None, timeout=None):
+        self.size = size or Config.DB_POOL_SIZE
+        self.timeout = timeout if timeout is not None else Config.DB_POOL_TIMEOUT
+        self.database = Config.DATABASE_PATH
+        self.pid = os.getpid()
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._in_use = 0
+        self._checkouts = 0
+        self._timeouts = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._closed = False
+
+    def acquire(self):
+        """Check out a connection, opening a new one if the pool is not yet full."""
+        start = time.perf_counter()
+        conn = None
+        with self._lock:
+            if self._idle.empty() and self._created < self.size:
+                self._created += 1
+                create = True
+            else:
+                create = False
+        if create:
+            try:
+                conn = get_db_connection(check_same_thread=False)
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+        else:
+            try:
+                conn = self._idle.get(timeout=self.timeout)
+            except queue.Empty:
+                with self._lock:
+                    self._timeouts += 1
+                logger.error(f"Timed out after {self.timeout}s waiting for a database connection")
+                raise Exception(f"Timed out waiting for a database connection (pool size {self.size})")
+
+        waited = time.perf_counter() - start
+        with self._lock:
+            self._in_use += 1
+            self._checkouts += 1
+            self._total_wait += waited
+            self._max_wait = max(self._max_wait, waited)
+        return conn
+
+    def release(self, conn):
+        """Return a connection to the pool, discarding any uncommitted work."""
+        try:
+            if self._closed:
+                conn.close()
+                return
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle.put(conn)
+        except sqlite3.Error as e:
+            logger.warning(f"Discarding broken pooled connection: {e}")
+            with self._lock:
+                self._created -= 1
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        finally:
+            with self._lock:
+                self._in_use -= 1
+
+    def close(self):
+        """Close every idle connection; connections still checked out are closed on release."""
+        self._closed = True
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._created -= 1
+
+    def stats(self):
+        """Return a snapshot of the pool counters."""
+        with self._lock:
+            return {
+                'size': self.size,
+                'connections_open': self._created,
+                'connections_in_use': self._in_use,
+                'connections_idle': self._idle.qsize(),
+                'checkouts': self._checkouts,
+                'timeouts': self._timeouts,
+                'total_wait_ms': round(self._total_wait * 1000, 3),
+                'avg_wait_ms': round(self._total_wait * 1000 / self._checkouts, 3) if self._checkouts else 0,
+                'max_wait_ms': round(self._max_wait * 1000, 3)
+            }
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    """Return the process-wide connection pool, creating it on first use.
+
+    The pool is rebuilt after a fork (e.g. gunicorn pre-fork workers) or when
+    Config.DATABASE_PATH changes, so connections are never shared across processes.
+    """
+    global _pool
+    pool = _pool
+    if pool is None or pool.pid != os.getpid() or pool.database != Config.DATABASE_PATH:
+        with _pool_lock:
+            if _pool is None or _pool.pid != os.getpid() or _pool.database != Config.DATABASE_PATH:
+                if _pool is not None and _pool.pid == os.getpid():
+                    _pool.close()
+                _pool = ConnectionPool()
+            pool = _pool
+    return pool
+
+def close_pool():
+    """Close all pooled connections (e.g. before the database file is replaced)."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None and _pool.pid == os.getpid():
+            _pool.close()
+        _pool = None
+
+def get_pool_stats():
+    """Return statistics for the current process' connection pool."""
+    return get_pool().stats()
+
+_local = threading.local()
+
+@contextmanager
+def connection():
+    """Yield a pooled connection for the current unit of work.
+
+    Inside a Flask application context the connection is checked out once and
+    kept on ``g`` until the context is torn down, so every query made while
+    handling a request reuses it. Outside of Flask (CLI tasks, scripts) the
+    connection is bound to the current thread for the duration of the block.
+    """
+    if has_app_context():
+        if 'db_conn' not in g:
+            g.db_pool = get_pool()
+            g.db_conn = g.db_pool.acquire()
+        yield g.db_conn
+        return
+
+    conn = getattr(_local, 'conn', None)
+    if conn is not None:
+        yield conn
+        return
+
+    pool = get_pool()
+    conn = pool.acquire()
+    _local.conn = conn
+    try:
+        yield conn
+    finally:
+        _local.conn = None
+        pool.release(conn)
+
+def release_connection(exception=None):
+    """Return the request's connection to the pool (registered as an app teardown)."""
+    conn = g.pop('db_conn', None)
+    pool = g.pop('db_pool', None)
+    if conn is not None:
+        pool.release(conn)
+
+def init_app(app):
+    """Tie pooled connection checkout/return to the Flask application context."""
+    app.teardown_appcontext(release_connection)
+
+@contextmanager
+def transaction():
+    """
+    Yield a pooled connection with an open transaction.
+
+    The transaction commits when the block exits normally and rolls back if it
+    raises; SQLite errors are logged and re-raised like in query_db/execute_db.
+    """
+    with connection() as conn:
+        try:
+            yield conn
+            conn.commit()
+        except sqlite3.Error as e:
+            conn.rollback()
+            logger.error(f"Database transaction error: {e}")
+            raise Exception(f"Database transaction failed: {e}")
+        except BaseException:
+            conn.rollback()
+            raise
+
+_query_listeners = []
+
+def add_query_listener(listener):
+    """
+    Register ``listener(query, args, duration)`` to be called after every statement
+    run through query_db or execute_db; ``duration`` is in seconds and includes
+    fetching the rows.
+    """
+    _query_listeners.append(listener)
+
+def remove_query_listener(listener):
+    """Unregister a listener added with add_query_listener."""
+    if listener in _query_listeners:
+        _query_listeners.remove(listener)
+
+def _notify_query_listeners(query, args, start):
+    duration = time.perf_counter() - start
+    for listener in list(_query_listeners):
+        try:
+            listener(query, args, duration)
+        except Exception as e:
+            logger.warning(f"Query listener failed: {e}")
+
 def query_db(query, args=(), one=False):
     """Execute a query and fetch results."""
-    conn = None
-    try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-        cur.execute(query, args)
-        rv = cur.fetchall()
-        conn.commit()
-        return (dict(rv[0]) if rv else None) if one else [dict(x) for x in rv]
-    except sqlite3.Error as e:
-        if conn:
+    with connection() as conn:
+        start = time.perf_counter()
+        try:
+            cur = conn.cursor()
+            cur.execute(query, args)
+            rv = cur.fetchall()
+            conn.commit()
+            return (dict(rv[0]) if rv else None) if one else [dict(x) for x in rv]
+        except sqlite3.Error as e:
             conn.rollback()
-        logger.error(f"Database query error: {e}, Query: {query}, Args: {args}")
-        raise Exception(f"Database query failed: {e}")
-    finally:
-        if conn:
-            conn.close()
+            logger.error(f"Database query error: {e}, Query: {query}, Args: {args}")
+            raise Exception(f"Database query failed: {e}")
+        finally:
+            if _query_listeners:
+                _notify_query_listeners(query, args, start)
 
 def execute_db(query, args=()):
     """Execute a query without fetching results."""
-    conn = None
-    try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-        cur.execute(query, args)
-        last_id = cur.lastrowid
-        conn.commit()
-        return last_id
-    except sqlite3.Error as e:
-        if conn:
+    with connection() as conn:
+        start = time.perf_counter()
+        try:
+            cur = conn.cursor()
+            cur.execute(query, args)
+            last_id = cur.lastrowid
+            conn.commit()
+            return last_id
+        except sqlite3.Error as e:
             conn.rollback()
-        logger.error(f"Database execution error: {e}, Query: {query}, Args: {args}")
-        raise Exception(f"Database execution failed: {e}")
-    finally:
-        if conn:
-            conn.close()
+            logger.error(f"Database execution error: {e}, Query: {query}, Args: {args}")
+            raise Exception(f"Database execution failed: {e}")
+        finally:
+            if _query_listeners:
+                _notify_query_listeners(query, args, start)
 
 def init_db():
     """Initialize the database."""
     try:
-        if os.path.exists(Config.DATABASE_PATH):
-            os.remove(Config.DATABASE_PATH)
+        close_pool()
+        for path in (Config.DATABASE_PATH, Config.DATABASE_PATH + '-wal', Config.DATABASE_PATH + '-shm'):
+            if os.path.exists(path):
+                os.remove(path)
         conn = sqlite3.connect(Config.DATABASE_PATH)
         conn.close()
         logger.info(f"Database initialized at {Config.DATABASE_PATH}")
@@ -116,6 +353,51 @@ def run_migrations():
         if conn:
             conn.close()
 
+def clear_review_history(conn):
+    """
+    Delete every review item together with word_stats and session_stats.
+
+    Runs on ``conn`` inside the caller's transaction. The review_stats_paused row
+    turns the per-row delete trigger off for the wipe and is removed again before
+    commit, so other connections never see it.
+    """
+    conn.execute("INSERT INTO review_stats_paused (paused) VALUES (1)")
+    conn.execute("DELETE FROM word_review_items")
+    conn.execute("DELETE FROM word_stats")
+    conn.execute("DELETE FROM session_stats")
+    conn.execute("DELETE FROM review_stats_paused")
+
+def rebuild_review_stats():
+    """Recompute word_stats and session_stats from the full review history."""
+    conn = None
+    try:
+        conn = get_db_connection()
+        with conn:
+            conn.execute("DELETE FROM word_stats")
+            conn.execute("""
+                INSERT INTO word_stats (word_id, correct_count, wrong_count, last_reviewed_at)
+                SELECT word_id, SUM(correct = 1), SUM(correct = 0), MAX(created_at)
+                FROM word_review_items
+                GROUP BY word_id
+            """)
+            conn.execute("DELETE FROM session_stats")
+            conn.execute("""
+                INSERT INTO session_stats (study_session_id, correct_count, wrong_count, last_reviewed_at, distinct_words)
+                SELECT study_session_id, SUM(correct = 1), SUM(correct = 0), MAX(created_at), COUNT(DISTINCT word_id)
+                FROM word_review_items
+                GROUP BY study_session_id
+            """)
+            words = conn.execute("SELECT COUNT(*) FROM word_stats").fetchone()[0]
+            sessions = conn.execute("SELECT COUNT(*) FROM session_stats").fetchone()[0]
+        logger.info(f"Rebuilt review stats for {words} words and {sessions} sessions")
+        print(f"Rebuilt review stats for {words} words and {sessions} sessions")
+    except sqlite3.Error as e:
+        logger.error(f"Failed to rebuild review stats: {e}")
+        raise Exception(f"Failed to rebuild review stats: {e}")
+    finally:
+        if conn:
+            conn.close()
+
 def seed_data():
     """Seed the database with initial data."""
     conn = None
@@ -126,55 +408,62 @@ def seed_data():
             logger.warning(f"Seeds directory not found: {seeds_dir}")
             raise Exception(f"Seeds directory not found: {seeds_dir}")
         
-        # Seed study activities
-        try:
-            seed_study_activities(seeds_dir)
-        except Exception as e:
-            logger.error(f"Failed to seed study activities: {e}")
-            raise
-            
-        # Seed word groups and words
-        word_files = {
-            'verbs.json': 'Verbs',
-            'adjectives.json': 'Adjectives', 
-            'numbers.json': 'Numbers',
-            'adverbs.json': 'Adverbs'
-        }
-        
-        for file_name, group_name in word_files.items():
-            try:
-                seed_word_group(seeds_dir, file_name, group_name)
-            except Exception as e:
-                logger.error(f"Failed to seed word group '{group_name}' from {file_name}: {e}")
-                raise
-        
-        # Seed study sessions
-        if Config.isDemo:
+        # One connection for the whole load, with durability relaxed until it finishes
+        conn = get_db_connection()
+        with bulk_load_settings(conn):
+            # Seed study activities
             try:
-                seed_study_sessions(seeds_dir)
+                seed_study_activities(seeds_dir, conn)
             except Exception as e:
-                logger.error(f"Failed to seed study sessions: {e}")
+                logger.error(f"Failed to seed study activities: {e}")
                 raise
-        else:
-            logger.info("Skipping study sessions seeding (not in demo mode)")
-            print("Skipping study sessions seeding (not in demo mode)")
+                
+            # Seed word groups and words
+            word_files = {
+                'verbs.json': 'Verbs',
+                'adjectives.json': 'Adjectives', 
+                'numbers.json': 'Numbers',
+                'adverbs.json': 'Adverbs'
+            }
             
-        # Seed word review items
-        if Config.isDemo:
-            try:
-                seed_word_review_items(seeds_dir)
-            except Exception as e:
-                logger.error(f"Failed to seed word review items: {e}")
-                raise
-        else:
-            logger.info("Skipping word review items seeding (not in demo mode)")
-            print("Skipping word review items seeding (not in demo mode)")
+            for file_name, group_name in word_files.items():
+                try:
+                    seed_word_group(seeds_dir, file_name, group_name, conn)
+                except Exception as e:
+                    logger.error(f"Failed to seed word group '{group_name}' from {file_name}: {e}")
+                    raise
+            rebuild_group_word_counts(conn)
+            
+            # Seed study sessions
+            if Config.isDemo:
+                try:
+                    seed_study_sessions(seeds_dir, conn)
+                except Exception as e:
+                    logger.error(f"Failed to seed study sessions: {e}")
+                    raise
+            else:
+                logger.info("Skipping study sessions seeding (not in demo mode)")
+                print("Skipping study sessions seeding (not in demo mode)")
+                
+            # Seed word review items
+            if Config.isDemo:
+                try:
+                    seed_word_review_items(seeds_dir, conn)
+                except Exception as e:
+                    logger.error(f"Failed to seed word review items: {e}")
+                    raise
+            else:
+                logger.info("Skipping word review items seeding (not in demo mode)")
+                print("Skipping word review items seeding (not in demo mode)")
                 
     except Exception as e:
         logger.error(f"Seeding error: {e}")
         raise Exception(f"Seeding failed: {e}")
+    finally:
+        if conn:
+            conn.close()
 
-def seed_study_activities(seeds_dir):
+def seed_study_activities(seeds_dir, conn):
     """Seed study activities from a JSON file."""
     study_activities_file = os.path.join(seeds_dir, 'study_activities.json')
     if not os.path.exists(study_activities_file):
@@ -183,14 +472,13 @@ def seed_study_activities(seeds_dir):
         return
         
     try:
-        with open(study_activities_file, 'r') as f:
-            activities = json.load(f)
-            for activity in activities:
-                execute_db(
-                    "INSERT INTO study_activities (name, description, url, preview_url, release_date, average_duration, focus) VALUES (?, ?, ?, ?, ?, ?, ?)",
-                    (activity['name'], activity['description'], activity['url'], activity['preview_url'], 
-                     activity['release_date'], activity['average_duration'], activity['focus'])
-                )
+        load_rows(
+            conn, 'study_activities',
+            "INSERT INTO study_activities (name, description, url, preview_url, release_date, average_duration, focus) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            ((activity['name'], activity['description'], activity['url'], activity['preview_url'],
+              activity['release_date'], activity['average_duration'], activity['focus'])
+             for activity in iter_json_array(study_activities_file))
+        )
         logger.info("Seeded study activities")
         print("Seeded study activities")
     except json.JSONDecodeError as e:
@@ -203,50 +491,24 @@ def seed_study_activities(seeds_dir):
         logger.error(f"Missing required key in study activities data: {e}")
         raise Exception(f"Missing required key in study activities data: {e}")
 
-def seed_word_group(seeds_dir, file_name, group_name):
+def seed_word_group(seeds_dir, file_name, group_name, conn):
     """Seed a word group and its words from a JSON file."""
     file_path = os.path.join(seeds_dir, file_name)
     if not os.path.exists(file_path):
         logger.warning(f"Word file not found: {file_path}")
         print(f"Word file not found: {file_path}")
         return
-        
-    conn = None
+    
+    import_word_file(file_path, group_name, conn)
+
+def import_word_file(file_path, group_name, conn):
+    """Load a vocabulary file (seed or vocabulary-importer output) into a new group."""
+    file_name = os.path.basename(file_path)
     try:
-        conn = get_db_connection()
-        
-        # Create the group in a transaction
-        with conn:
-            cur = conn.cursor()
-            cur.execute("INSERT INTO groups (name) VALUES (?)", (group_name,))
-            group_id = cur.lastrowid
-            
-            # Add words from file
-            with open(file_path, 'r') as f:
-                words = json.load(f)
-                for word in words:
-                    parts_json = json.dumps(word['parts'])
-                    cur.execute(
-                        "INSERT INTO words (portuguese, kimbundu, english, parts) VALUES (?, ?, ?, ?)",
-                        (word['portuguese'], word['kimbundu'], word['english'], parts_json)
-                    )
-                    word_id = cur.lastrowid
-                    
-                    # Link word to group
-                    cur.execute(
-                        "INSERT INTO words_groups (word_id, group_id) VALUES (?, ?)",
-                        (word_id, group_id)
-                    )
-                
-                # Update word count for group
-                cur.execute(
-                    "UPDATE groups SET words_count = (SELECT COUNT(*) FROM words_groups WHERE group_id = ?) WHERE id = ?",
-                    (group_id, group_id)
-                )
-            
-        logger.info(f"Seeded {len(words)} words in group '{group_name}'")
-        print(f"Seeded {len(words)} words in group '{group_name}'")
-        
+        group_id, report = load_words(conn, file_path, group_name)
+        logger.info(f"Seeded {report.rows} words in group '{group_name}'")
+        print(f"Seeded {report.rows} words in group '{group_name}'")
+        return group_id, report
     except json.JSONDecodeError as e:
         logger.error(f"Invalid JSON in word file {file_name}: {e}")
         raise Exception(f"Invalid JSON in word file {file_name}: {e}")
@@ -257,15 +519,27 @@ def seed_word_group(seeds_dir, file_name, group_name):
         logger.error(f"Missing required key in word data from {file_name}: {e}")
         raise Exception(f"Missing required key in word data from {file_name}: {e}")
     except sqlite3.Error as e:
-        if conn:
-            conn.rollback()
         logger.error(f"Database error while seeding words from {file_name}: {e}")
         raise Exception(f"Database error while seeding words from {file_name}: {e}")
+
+def import_vocabulary(file_path, group_name):
+    """Bulk import an external vocabulary file as a new group."""
+    if not os.path.exists(file_path):
+        logger.error(f"Vocabulary file not found: {file_path}")
+        raise Exception(f"Vocabulary file not found: {file_path}")
+    
+    conn = None
+    try:
+        conn = get_db_connection()
+        with bulk_load_settings(conn):
+            group_id, report = import_word_file(file_path, group_name, conn)
+            rebuild_group_word_counts(conn)
+        return {'group_id': group_id, 'rows': report.rows, 'rows_per_second': round(report.rows_per_second)}
     finally:
         if conn:
             conn.close()
 
-def seed_study_sessions(seeds_dir):
+def seed_study_sessions(seeds_dir, conn):
     """Seed study sessions from a JSON file."""
     study_sessions_file = os.path.join(seeds_dir, 'study_sessions.json')
     if not os.path.exists(study_sessions_file):
@@ -274,13 +548,12 @@ def seed_study_sessions(seeds_dir):
         return
         
     try:
-        with open(study_sessions_file, 'r') as f:
-            sessions = json.load(f)
-            for session in sessions:
-                execute_db(
-                    "INSERT INTO study_sessions (id, group_id, study_activity_id, created_at) VALUES (?, ?, ?, ?)",
-                    (session['id'], session['group_id'], session['study_activity_id'], session['created_at'])
-                )
+        load_rows(
+            conn, 'study_sessions',
+            "INSERT INTO study_sessions (id, group_id, study_activity_id, created_at) VALUES (?, ?, ?, ?)",
+            ((session['id'], session['group_id'], session['study_activity_id'], session['created_at'])
+             for session in iter_json_array(study_sessions_file))
+        )
         logger.info("Seeded study sessions")
         print("Seeded study sessions")
     except json.JSONDecodeError as e:
@@ -293,7 +566,7 @@ def seed_study_sessions(seeds_dir):
         logger.error(f"Missing required key in study sessions data: {e}")
         raise Exception(f"Missing required key in study sessions data: {e}")
 
-def seed_word_review_items(seeds_dir):
+def seed_word_review_items(seeds_dir, conn):
     """Seed word review items from a JSON file."""
     word_review_items_file = os.path.join(seeds_dir, 'word_review_items.json')
     if not os.path.exists(word_review_items_file):
@@ -302,13 +575,12 @@ def seed_word_review_items(seeds_dir):
         return
         
     try:
-        with open(word_review_items_file, 'r') as f:
-            items = json.load(f)
-            for item in items:
-                execute_db(
-                    "INSERT INTO word_review_items (id, word_id, study_session_id, correct, created_at) VALUES (?, ?, ?, ?, ?)",
-                    (item['id'], item['word_id'], item['study_session_id'], item['correct'], item['created_at'])
-                )
+        load_rows(
+            conn, 'word_review_items',
+            "INSERT INTO word_review_items (id, word_id, study_session_id, correct, created_at) VALUES (?, ?, ?, ?, ?)",
+            ((item['id'], item['word_id'], item['study_session_id'], item['correct'], item['created_at'])
+             for item in iter_json_array(word_review_items_file))
+        )
         logger.info("Seeded word review items")
         print("Seeded word review items")
     except json.JSONDecodeError as e:
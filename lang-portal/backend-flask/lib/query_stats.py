@@ -0,0 +1,158 @@
+import re
+import bisect
+import logging
+import threading
+from functools import lru_cache
+from flask import g, has_request_context, request
+from config import Config
+from lib import db
+
+logger = logging.getLogger('db')
+slow_logger = logging.getLogger('db.slow')
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is open-ended
+BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+OTHER_FINGERPRINT = '(other)'
+
+_COMMENT = re.compile(r'--[^\n]*|/\*.*?\*/', re.S)
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'(?<![\w.])-?\d+(?:\.\d+)?(?![\w.])')
+_PLACEHOLDER_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_ROW_LIST = re.compile(r'\(\?\+\)(?:\s*,\s*\(\?\+\))+')
+
+@lru_cache(maxsize=1024)
+def fingerprint(query):
+    """
+    Normalize a statement so that executions differing only in literals, IN-list
+    length or number of VALUES rows share one fingerprint.
+    """
+    text = _COMMENT.sub(' ', query)
+    text = _STRING.sub('?', text)
+    text = _NUMBER.sub('?', text)
+    text = ' '.join(text.split())
+    text = _PLACEHOLDER_LIST.sub('(?+)', text)
+    text = _ROW_LIST.sub('(?+), ...', text)
+    return text
+
+class QueryStats:
+    """Per-fingerprint counters and latency histograms for one worker process."""
+
+    def __init__(self, max_fingerprints=500):
+        self.max_fingerprints = max_fingerprints
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._n_plus_one = {}
+
+    def record(self, query, duration):
+        key = fingerprint(query)
+        ms = duration * 1000
+        bucket = bisect.bisect_left(BUCKETS_MS, ms)
+        with self._lock:
+            entry = self._stats.get(key)
+            if entry is None:
+                if len(self._stats) >= self.max_fingerprints:
+                    key = OTHER_FINGERPRINT
+                entry = self._stats.setdefault(key, {
+                    'calls': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+                    'histogram': [0] * (len(BUCKETS_MS) + 1),
+                })
+            entry['calls'] += 1
+            entry['total_ms'] += ms
+            entry['max_ms'] = max(entry['max_ms'], ms)
+            entry['histogram'][bucket] += 1
+        return key
+
+    def record_n_plus_one(self, endpoint, key, count):
+        with self._lock:
+            entry = self._n_plus_one.setdefault((endpoint, key), {'requests': 0, 'max_per_request': 0})
+            entry['requests'] += 1
+            entry['max_per_request'] = max(entry['max_per_request'], count)
+
+    def top(self, limit=20, order_by='total_ms'):
+        """The ``limit`` fingerprints with the highest ``order_by`` value."""
+        with self._lock:
+            rows = [(key, dict(entry, histogram=list(entry['histogram']))) for key, entry in self._stats.items()]
+        rows.sort(key=lambda row: row[1][order_by], reverse=True)
+        return [self._summarize(key, entry) for key, entry in rows[:limit]]
+
+    def n_plus_one(self):
+        with self._lock:
+            items = list(self._n_plus_one.items())
+        return [
+            {'endpoint': endpoint, 'fingerprint': key, **entry}
+            for (endpoint, key), entry in sorted(items, key=lambda item: item[1]['requests'], reverse=True)
+        ]
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self._n_plus_one.clear()
+
+    @staticmethod
+    def _summarize(key, entry):
+        return {
+            'fingerprint': key,
+            'calls': entry['calls'],
+            'total_ms': round(entry['total_ms'], 3),
+            'avg_ms': round(entry['total_ms'] / entry['calls'], 3),
+            'max_ms': round(entry['max_ms'], 3),
+            'p50_ms': _histogram_percentile(entry['histogram'], entry['calls'], 50, entry['max_ms']),
+            'p95_ms': _histogram_percentile(entry['histogram'], entry['calls'], 95, entry['max_ms']),
+            'p99_ms': _histogram_percentile(entry['histogram'], entry['calls'], 99, entry['max_ms']),
+            'histogram': {
+                (f"le_{bound}" if i < len(BUCKETS_MS) else 'inf'): count
+                for i, (bound, count) in enumerate(zip(BUCKETS_MS + (None,), entry['histogram']))
+                if count
+            },
+        }
+
+def _histogram_percentile(histogram, calls, pct, max_ms):
+    """Upper bound of the bucket holding the pct-th percentile, capped at the observed max."""
+    rank = pct / 100 * calls
+    seen = 0
+    for i, count in enumerate(histogram):
+        seen += count
+        if seen >= rank:
+            bound = BUCKETS_MS[i] if i < len(BUCKETS_MS) else max_ms
+            return round(min(bound, max_ms), 3)
+    return round(max_ms, 3)
+
+query_stats = QueryStats(Config.QUERY_STATS_MAX_FINGERPRINTS)
+
+def _format_args(args, limit=500):
+    text = repr(args)
+    return text if len(text) <= limit else text[:limit] + '...'
+
+def _on_query(query, args, duration):
+    key = query_stats.record(query, duration)
+    if Config.SLOW_QUERY_MS > 0 and duration * 1000 >= Config.SLOW_QUERY_MS:
+        message = f"Slow query ({duration * 1000:.1f} ms): {' '.join(query.split())}"
+        if Config.SLOW_QUERY_LOG_ARGS:
+            message += f" Args: {_format_args(args)}"
+        slow_logger.warning(message)
+    if has_request_context():
+        counts = g.setdefault('query_counts', {})
+        counts[key] = counts.get(key, 0) + 1
+
+def _check_n_plus_one(exception=None):
+    """Flag fingerprints that ran more than N_PLUS_ONE_THRESHOLD times in one request."""
+    counts = g.pop('query_counts', None)
+    if not counts:
+        return
+    endpoint = request.url_rule.rule if request.url_rule else request.path
+    for key, count in counts.items():
+        if count > Config.N_PLUS_ONE_THRESHOLD:
+            query_stats.record_n_plus_one(endpoint, key, count)
+            logger.warning(f"Possible N+1 on {request.method} {endpoint}: {count} executions of {key}")
+
+def init_app(app):
+    """Instrument query_db/execute_db and check each request for repeated statements."""
+    if not Config.QUERY_STATS_ENABLED:
+        return
+    if Config.SLOW_QUERY_LOG and not slow_logger.handlers:
+        handler = logging.FileHandler(Config.SLOW_QUERY_LOG)
+        handler.setFormatter(logging.Formatter('%(asctime)s - %(message)s'))
+        slow_logger.addHandler(handler)
+    db.remove_query_listener(_on_query)
+    db.add_query_listener(_on_query)
+    app.teardown_request(_check_n_plus_one)
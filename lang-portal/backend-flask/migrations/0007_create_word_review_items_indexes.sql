@@ -0,0 +1,15 @@
+-- Covers the per-word correct/wrong counters used by word listings
+CREATE INDEX IF NOT EXISTS idx_word_review_items_word_correct
+    ON word_review_items (word_id, correct);
+
+-- Covers per-session counters, session word listings and end-time lookups
+CREATE INDEX IF NOT EXISTS idx_word_review_items_session_correct_created
+    ON word_review_items (study_session_id, correct, created_at);
+
+-- Lets the review stats triggers find a word's latest review without a scan
+CREATE INDEX IF NOT EXISTS idx_word_review_items_word_created
+    ON word_review_items (word_id, created_at);
+
+-- Lets the review stats triggers tell whether a word was already reviewed in a session
+CREATE INDEX IF NOT EXISTS idx_word_review_items_session_word
+    ON word_review_items (study_session_id, word_id);
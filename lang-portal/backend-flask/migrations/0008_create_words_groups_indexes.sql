@@ -0,0 +1,4 @@
+-- The UNIQUE (word_id, group_id) constraint only serves lookups by word;
+-- group word listings and group review counts seek by group first
+CREATE INDEX IF NOT EXISTS idx_words_groups_group_word
+    ON words_groups (group_id, word_id);
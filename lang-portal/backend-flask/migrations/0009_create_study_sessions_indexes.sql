@@ -0,0 +1,9 @@
+-- Session listings are ordered by most recent first, optionally filtered
+CREATE INDEX IF NOT EXISTS idx_study_sessions_created
+    ON study_sessions (created_at);
+
+CREATE INDEX IF NOT EXISTS idx_study_sessions_group_created
+    ON study_sessions (group_id, created_at);
+
+CREATE INDEX IF NOT EXISTS idx_study_sessions_activity_created
+    ON study_sessions (study_activity_id, created_at);
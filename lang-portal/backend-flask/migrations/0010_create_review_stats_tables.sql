@@ -0,0 +1,94 @@
+-- Materialized review counters, kept current by the triggers below so that
+-- listings never have to aggregate word_review_items at read time.
+CREATE TABLE IF NOT EXISTS word_stats (
+    word_id INTEGER PRIMARY KEY,
+    correct_count INTEGER NOT NULL DEFAULT 0,
+    wrong_count INTEGER NOT NULL DEFAULT 0,
+    last_reviewed_at TIMESTAMP NULL,
+    FOREIGN KEY (word_id) REFERENCES words (id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS session_stats (
+    study_session_id INTEGER PRIMARY KEY,
+    correct_count INTEGER NOT NULL DEFAULT 0,
+    wrong_count INTEGER NOT NULL DEFAULT 0,
+    last_reviewed_at TIMESTAMP NULL,
+    distinct_words INTEGER NOT NULL DEFAULT 0,
+    FOREIGN KEY (study_session_id) REFERENCES study_sessions (id) ON DELETE CASCADE
+);
+
+-- Holds a row while lib.db.clear_review_history wipes the whole history, so the
+-- delete trigger skips its per-row bookkeeping; it is always empty between transactions.
+CREATE TABLE IF NOT EXISTS review_stats_paused (
+    paused INTEGER PRIMARY KEY CHECK (paused = 1)
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_word_review_items_stats_insert
+AFTER INSERT ON word_review_items
+BEGIN
+    INSERT INTO word_stats (word_id, correct_count, wrong_count, last_reviewed_at)
+    VALUES (NEW.word_id, NEW.correct = 1, NEW.correct = 0, NEW.created_at)
+    ON CONFLICT (word_id) DO UPDATE SET
+        correct_count = correct_count + excluded.correct_count,
+        wrong_count = wrong_count + excluded.wrong_count,
+        last_reviewed_at = MAX(COALESCE(last_reviewed_at, excluded.last_reviewed_at), excluded.last_reviewed_at);
+
+    INSERT INTO session_stats (study_session_id, correct_count, wrong_count, last_reviewed_at, distinct_words)
+    VALUES (
+        NEW.study_session_id, NEW.correct = 1, NEW.correct = 0, NEW.created_at,
+        NOT EXISTS (SELECT 1 FROM word_review_items
+                    WHERE study_session_id = NEW.study_session_id AND word_id = NEW.word_id AND id != NEW.id)
+    )
+    ON CONFLICT (study_session_id) DO UPDATE SET
+        correct_count = correct_count + excluded.correct_count,
+        wrong_count = wrong_count + excluded.wrong_count,
+        last_reviewed_at = MAX(COALESCE(last_reviewed_at, excluded.last_reviewed_at), excluded.last_reviewed_at),
+        distinct_words = distinct_words + excluded.distinct_words;
+END;
+
+-- Recreated on every run so databases migrated before the WHEN guard pick it up
+DROP TRIGGER IF EXISTS trg_word_review_items_stats_delete;
+CREATE TRIGGER trg_word_review_items_stats_delete
+AFTER DELETE ON word_review_items
+WHEN NOT EXISTS (SELECT 1 FROM review_stats_paused)
+BEGIN
+    UPDATE word_stats SET
+        correct_count = correct_count - (OLD.correct = 1),
+        wrong_count = wrong_count - (OLD.correct = 0),
+        last_reviewed_at = (SELECT MAX(created_at) FROM word_review_items WHERE word_id = OLD.word_id)
+    WHERE word_id = OLD.word_id;
+
+    DELETE FROM word_stats
+    WHERE word_id = OLD.word_id AND correct_count + wrong_count <= 0;
+
+    UPDATE session_stats SET
+        correct_count = correct_count - (OLD.correct = 1),
+        wrong_count = wrong_count - (OLD.correct = 0),
+        last_reviewed_at = (SELECT MAX(created_at) FROM word_review_items WHERE study_session_id = OLD.study_session_id),
+        distinct_words = distinct_words - (NOT EXISTS (
+            SELECT 1 FROM word_review_items
+            WHERE study_session_id = OLD.study_session_id AND word_id = OLD.word_id
+        ))
+    WHERE study_session_id = OLD.study_session_id;
+
+    DELETE FROM session_stats
+    WHERE study_session_id = OLD.study_session_id AND correct_count + wrong_count <= 0;
+END;
+
+-- Backfill counters for review history recorded before this migration
+INSERT OR IGNORE INTO word_stats (word_id, correct_count, wrong_count, last_reviewed_at)
+SELECT word_id,
+       SUM(correct = 1),
+       SUM(correct = 0),
+       MAX(created_at)
+FROM word_review_items
+GROUP BY word_id;
+
+INSERT OR IGNORE INTO session_stats (study_session_id, correct_count, wrong_count, last_reviewed_at, distinct_words)
+SELECT study_session_id,
+       SUM(correct = 1),
+       SUM(correct = 0),
+       MAX(created_at),
+       COUNT(DISTINCT word_id)
+FROM word_review_items
+GROUP BY study_session_id;
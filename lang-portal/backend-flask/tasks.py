@@ -1,5 +1,5 @@
 from invoke import task
-from lib.db import init_db, run_migrations, seed_data
+from lib.db import init_db, run_migrations, seed_data, rebuild_review_stats, import_vocabulary
 
 @task
 def init_database(c):
@@ -19,6 +19,18 @@ def seed(c):
     seed_data()
     print("Database seeded successfully.")
 
+@task
+def import_vocab(c, path, group):
+    """Bulk import a vocabulary file (JSON array or JSON Lines) as a new word group."""
+    result = import_vocabulary(path, group)
+    print(f"Imported {result['rows']} words into group {result['group_id']} ({result['rows_per_second']} rows/sec).")
+
+@task
+def rebuild_stats(c):
+    """Rebuild the materialized word and session review counters."""
+    rebuild_review_stats()
+    print("Review stats rebuilt successfully.")
+
 @task
 def setup(c):
     """Initialize, migrate, and seed the database in one command."""
@@ -33,6 +33,30 @@ try:
 except ImportError:
     print("Warning: Could not import route registration function. Some tests may fail.")
 
+@pytest.fixture(scope='session')
+def bundled_db(tmp_path_factory):
+    """A migrated copy of the bundled words.db, so tests never modify the tracked file."""
+    import shutil
+    from config import Config
+    from lib import db
+    path = str(tmp_path_factory.mktemp('bundled') / 'words.db')
+    shutil.copyfile(Config.DATABASE_PATH, path)
+    original, Config.DATABASE_PATH = Config.DATABASE_PATH, path
+    try:
+        db.close_pool()
+        db.run_migrations()
+    finally:
+        Config.DATABASE_PATH = original
+        db.close_pool()
+    return path
+
+@pytest.fixture(autouse=True)
+def database(bundled_db, monkeypatch):
+    """Run every test against the migrated copy unless it sets up its own database."""
+    from config import Config
+    monkeypatch.setattr(Config, 'DATABASE_PATH', bundled_db)
+    return bundled_db
+
 @pytest.fixture
 def app():
     """Create a Flask app fixture for testing."""
@@ -57,3 +81,14 @@ def runner(app):
 def auth_headers():
     """Provide mock authentication headers for protected endpoints."""
     return {'Authorization': 'Bearer test_token'}
+
+@pytest.fixture
+def migrated_db(tmp_path, monkeypatch):
+    """Point the app at an empty, fully migrated throwaway database."""
+    from config import Config
+    from lib import db
+    monkeypatch.setattr(Config, 'DATABASE_PATH', str(tmp_path / 'test.db'))
+    db.close_pool()
+    db.run_migrations()
+    yield Config.DATABASE_PATH
+    db.close_pool()
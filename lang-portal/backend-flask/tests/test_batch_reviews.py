@@ -0,0 +1,51 @@
+import json
+import pytest
+from lib.db import execute_db, query_db
+
+@pytest.fixture
+def session(migrated_db):
+    """Session 1 studies group 1 (words 1-3); word 4 belongs to group 2 only."""
+    execute_db("INSERT INTO study_activities (id, name, description, url, preview_url) VALUES (1, 'a', 'a', 'a', 'a')")
+    execute_db("INSERT INTO groups (id, name) VALUES (1, 'g1'), (2, 'g2')")
+    for word_id, group_id in ((1, 1), (2, 1), (3, 1), (4, 2)):
+        execute_db("INSERT INTO words (id, portuguese, kimbundu, english, parts) VALUES (?, 'p', 'k', 'e', '{}')", (word_id,))
+        execute_db("INSERT INTO words_groups (word_id, group_id) VALUES (?, ?)", (word_id, group_id))
+    execute_db("INSERT INTO study_sessions (id, group_id, study_activity_id) VALUES (1, 1, 1)")
+    return 1
+
+def post_reviews(client, session_id, payload):
+    return client.post(f'/api/study_sessions/{session_id}/reviews',
+                       data=json.dumps(payload), content_type='application/json')
+
+def test_batch_insert_returns_created_rows(client, session):
+    reviews = [{'word_id': 1, 'correct': True}, {'word_id': 2, 'correct': False}, {'word_id': 1, 'correct': False}]
+    response = post_reviews(client, session, reviews)
+    assert response.status_code == 200
+
+    data = json.loads(response.data)
+    assert data['count'] == 3
+    assert [(i['word_id'], i['correct']) for i in data['items']] == [(1, True), (2, False), (1, False)]
+    assert all(i['id'] and i['created_at'] and i['study_session_id'] == session for i in data['items'])
+
+    stats = query_db("SELECT correct_count, wrong_count, distinct_words FROM session_stats WHERE study_session_id = ?",
+                     (session,), one=True)
+    assert stats == {'correct_count': 1, 'wrong_count': 2, 'distinct_words': 2}
+
+def test_batch_larger_than_one_statement(client, session):
+    reviews = [{'word_id': 1 + i % 3, 'correct': i % 2 == 0} for i in range(1000)]
+    data = json.loads(post_reviews(client, session, reviews).data)
+    assert data['count'] == 1000
+    assert len({i['id'] for i in data['items']}) == 1000
+
+def test_words_outside_group_reject_whole_batch(client, session):
+    response = post_reviews(client, session, [{'word_id': 1, 'correct': True}, {'word_id': 4, 'correct': True}])
+    assert response.status_code == 400
+    assert '4' in json.loads(response.data)['error']
+    assert query_db("SELECT COUNT(*) as count FROM word_review_items", one=True)['count'] == 0
+
+def test_unknown_session(client, session):
+    assert post_reviews(client, 999, [{'word_id': 1, 'correct': True}]).status_code == 404
+
+@pytest.mark.parametrize('payload', [[], {'test_key': 'test_value'}, [{'correct': True}], [{'word_id': '1', 'correct': True}]])
+def test_malformed_payload(client, session, payload):
+    assert post_reviews(client, session, payload).status_code == 400
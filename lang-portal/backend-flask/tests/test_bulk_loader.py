@@ -0,0 +1,71 @@
+import json
+import pytest
+from lib import db
+from lib.bulk import iter_json_array
+
+def vocabulary(count):
+    """Words in the vocabulary-importer output format."""
+    return [{
+        'portuguese': f"palavra {i}",
+        'kimbundu': f"dizwi {i}",
+        'english': f'word "{i}" [{i}]',
+        'parts': [{'portuguese': 'pal', 'kimbundu': ['di'], 'english': 'word'}]
+    } for i in range(count)]
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 1 << 16])
+def test_iter_json_array_streams_elements(tmp_path, chunk_size):
+    words = vocabulary(50)
+    path = tmp_path / 'words.json'
+    path.write_text(json.dumps(words, indent=2))
+    assert list(iter_json_array(str(path), chunk_size=chunk_size)) == words
+
+def test_iter_json_array_reads_json_lines(tmp_path):
+    words = vocabulary(10)
+    path = tmp_path / 'words.jsonl'
+    path.write_text('\n'.join(json.dumps(w) for w in words) + '\n')
+    assert list(iter_json_array(str(path), chunk_size=16)) == words
+
+def test_iter_json_array_rejects_truncated_file(tmp_path):
+    path = tmp_path / 'broken.json'
+    path.write_text(json.dumps(vocabulary(3))[:-20])
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_json_array(str(path), chunk_size=8))
+
+def test_import_vocabulary(tmp_path, migrated_db):
+    path = tmp_path / 'vocabulary.json'
+    path.write_text(json.dumps(vocabulary(12000)))
+
+    result = db.import_vocabulary(str(path), 'Imported')
+    assert result['rows'] == 12000
+
+    group = db.query_db("SELECT * FROM groups WHERE id = ?", (result['group_id'],), one=True)
+    assert group['name'] == 'Imported'
+    assert group['words_count'] == 12000
+    assert db.query_db("SELECT COUNT(*) as count FROM words", one=True)['count'] == 12000
+    assert json.loads(db.query_db("SELECT parts FROM words WHERE id = 1", one=True)['parts'])[0]['kimbundu'] == ['di']
+
+    # A second import continues the word ids instead of colliding
+    second = db.import_vocabulary(str(path), 'Imported again')
+    assert db.query_db("SELECT MAX(id) as id FROM words", one=True)['id'] == 24000
+    assert db.query_db("SELECT words_count FROM groups WHERE id = ?", (second['group_id'],), one=True)['words_count'] == 12000
+
+def test_failed_import_leaves_no_partial_group(tmp_path, migrated_db):
+    words = vocabulary(10)
+    del words[7]['kimbundu']
+    path = tmp_path / 'vocabulary.json'
+    path.write_text(json.dumps(words))
+
+    with pytest.raises(Exception, match=r'kimbundu \(word 8\)'):
+        db.import_vocabulary(str(path), 'Broken')
+    assert db.query_db("SELECT COUNT(*) as count FROM groups", one=True)['count'] == 0
+    assert db.query_db("SELECT COUNT(*) as count FROM words", one=True)['count'] == 0
+
+def test_import_requires_parts(tmp_path, migrated_db):
+    words = vocabulary(3)
+    del words[2]['parts']
+    path = tmp_path / 'vocabulary.json'
+    path.write_text(json.dumps(words))
+
+    with pytest.raises(Exception, match=r'parts \(word 3\)'):
+        db.import_vocabulary(str(path), 'Broken')
+    assert db.query_db("SELECT COUNT(*) as count FROM words", one=True)['count'] == 0
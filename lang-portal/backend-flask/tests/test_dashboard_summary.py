@@ -0,0 +1,58 @@
+import datetime
+import json
+import pytest
+from app.cache import bump_data_version
+from app.models import Dashboard, StudySession
+from lib.db import execute_db
+
+@pytest.fixture
+def dataset(migrated_db):
+    """Sessions on each of the last three days; the latest one introduces word 3."""
+    execute_db("INSERT INTO study_activities (id, name, description, url, preview_url) VALUES (1, 'Quiz', 'a', 'a', 'a')")
+    execute_db("INSERT INTO groups (id, name, words_count) VALUES (1, 'Verbs', 3)")
+    for word_id in (1, 2, 3):
+        execute_db("INSERT INTO words (id, portuguese, kimbundu, english, parts) VALUES (?, 'p', 'k', 'e', '{}')", (word_id,))
+    today = datetime.date.today()
+    for session_id, days_ago in ((1, 3), (2, 2), (3, 1)):
+        created_at = f"{today - datetime.timedelta(days=days_ago)} 10:00:00"
+        execute_db("INSERT INTO study_sessions (id, group_id, study_activity_id, created_at) VALUES (?, 1, 1, ?)",
+                   (session_id, created_at))
+    reviews = [(1, 1, 1), (2, 1, 0), (1, 2, 1), (2, 2, 1), (3, 3, 1), (1, 3, 0)]
+    for word_id, session_id, correct in reviews:
+        execute_db("INSERT INTO word_review_items (word_id, study_session_id, correct) VALUES (?, ?, ?)",
+                   (word_id, session_id, correct))
+    # Direct inserts bypass the models, so invalidate cached results by hand
+    bump_data_version()
+
+def test_summary_metrics(client, dataset):
+    data = json.loads(client.get('/api/dashboard/summary').data)
+
+    assert data['last_study_session']['id'] == 3
+    assert data['last_study_session']['correct_count'] == 1
+    assert data['last_study_session']['wrong_count'] == 1
+
+    assert data['study_progress'] == {'total_words': 3, 'studied_words': 3, 'studied_words_trend': 33.3}
+
+    quick_stats = data['quick_stats']
+    assert quick_stats['success_rate'] == round(4 / 6 * 100, 1)
+    assert quick_stats['success_rate_trend'] == round(50 - 75, 1)
+    assert quick_stats['total_study_sessions'] == 3
+    assert quick_stats['total_active_groups'] == 1
+    assert quick_stats['study_streak_days'] == 3
+
+def test_dashboard_endpoints_match_summary(client, dataset):
+    summary = json.loads(client.get('/api/dashboard/summary').data)
+    for name in ('last_study_session', 'study_progress', 'quick_stats'):
+        assert json.loads(client.get(f'/api/dashboard/{name}').data) == summary[name]
+
+def test_summary_cached_until_write(dataset):
+    before = Dashboard.get_summary()
+
+    # A write that bypasses the models does not bump the data version
+    execute_db("INSERT INTO study_sessions (group_id, study_activity_id) VALUES (1, 1)")
+    assert Dashboard.get_summary() is before
+
+    StudySession.record_word_review(3, 2, True)
+    after = Dashboard.get_summary()
+    assert after is not before
+    assert after['quick_stats']['total_study_sessions'] == 4
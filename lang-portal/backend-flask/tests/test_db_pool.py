@@ -0,0 +1,90 @@
+import threading
+import pytest
+from config import Config
+from lib import db
+
+@pytest.fixture
+def temp_db(tmp_path, monkeypatch):
+    """Point the pool at a throwaway database file."""
+    monkeypatch.setattr(Config, 'DATABASE_PATH', str(tmp_path / 'pool.db'))
+    db.close_pool()
+    db.execute_db("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)")
+    yield
+    db.close_pool()
+
+def test_pragmas_applied_once_per_connection(temp_db):
+    """Pooled connections carry the configured PRAGMAs."""
+    assert db.query_db("PRAGMA journal_mode", one=True)['journal_mode'].lower() == 'wal'
+    assert db.query_db("PRAGMA synchronous", one=True)['synchronous'] == 1  # NORMAL
+    assert db.query_db("PRAGMA foreign_keys", one=True)['foreign_keys'] == 1
+
+def test_connections_are_reused(temp_db):
+    """Sequential queries reuse the same long-lived connection."""
+    for i in range(10):
+        db.execute_db("INSERT INTO items (name) VALUES (?)", (f"item{i}",))
+    stats = db.get_pool_stats()
+    assert stats['connections_open'] == 1
+    assert stats['connections_in_use'] == 0
+    assert stats['checkouts'] >= 11
+
+def test_one_checkout_per_request(temp_db, app):
+    """All queries made within one app context share a single checkout."""
+    before = db.get_pool_stats()['checkouts']
+    with app.app_context():
+        db.query_db("SELECT * FROM items")
+        db.query_db("SELECT COUNT(*) AS count FROM items", one=True)
+        assert db.get_pool_stats()['connections_in_use'] == 1
+    stats = db.get_pool_stats()
+    assert stats['checkouts'] == before + 1
+    assert stats['connections_in_use'] == 0
+
+def test_pool_times_out_when_exhausted(temp_db):
+    """Checkout fails once every connection is held and the timeout expires."""
+    pool = db.ConnectionPool(size=1, timeout=0.05)
+    conn = pool.acquire()
+    with pytest.raises(Exception, match="Timed out"):
+        pool.acquire()
+    pool.release(conn)
+    assert pool.stats()['timeouts'] == 1
+    pool.close()
+
+def test_concurrent_threads_share_bounded_pool(temp_db):
+    """Concurrent workers never open more connections than the pool size."""
+    errors = []
+
+    def worker():
+        try:
+            for _ in range(20):
+                db.query_db("SELECT COUNT(*) AS count FROM items", one=True)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert not errors
+    stats = db.get_pool_stats()
+    assert stats['connections_open'] <= Config.DB_POOL_SIZE
+    assert stats['connections_in_use'] == 0
+
+def test_query_listeners_receive_timings(temp_db):
+    """Registered listeners see every statement with its duration; removed ones stop."""
+    seen = []
+
+    def listener(query, args, duration):
+        seen.append((query, args, duration))
+
+    db.add_query_listener(listener)
+    try:
+        db.execute_db("INSERT INTO items (name) VALUES (?)", ("a",))
+        db.query_db("SELECT * FROM items WHERE name = ?", ("a",))
+    finally:
+        db.remove_query_listener(listener)
+    db.query_db("SELECT * FROM items")
+
+    assert [q for q, _, _ in seen] == ["INSERT INTO items (name) VALUES (?)", "SELECT * FROM items WHERE name = ?"]
+    assert seen[1][1] == ("a",)
+    assert all(duration >= 0 for _, _, duration in seen)
@@ -0,0 +1,63 @@
+import json
+import pytest
+from app.http_cache import ResponseCache, response_cache
+from app.models import StudySession
+from lib.db import execute_db
+
+@pytest.fixture
+def dataset(migrated_db):
+    execute_db("INSERT INTO study_activities (id, name, description, url, preview_url) VALUES (1, 'Quiz', 'a', 'a', 'a')")
+    execute_db("INSERT INTO groups (id, name, words_count) VALUES (1, 'Verbs', 2)")
+    for word_id in (1, 2):
+        execute_db("INSERT INTO words (id, portuguese, kimbundu, english, parts) VALUES (?, 'p', 'k', 'e', '{}')", (word_id,))
+        execute_db("INSERT INTO words_groups (word_id, group_id) VALUES (?, 1)", (word_id,))
+    execute_db("INSERT INTO study_sessions (id, group_id, study_activity_id) VALUES (1, 1, 1)")
+
+def test_conditional_get_returns_304(client, dataset):
+    first = client.get('/api/words')
+    assert first.status_code == 200
+    etag = first.headers['ETag']
+    assert not etag.startswith('W/')
+
+    second = client.get('/api/words', headers={'If-None-Match': etag})
+    assert second.status_code == 304
+    assert second.data == b''
+
+    assert client.get('/api/words', headers={'If-None-Match': '"stale"'}).status_code == 200
+
+def test_cached_body_served_without_database(client, dataset):
+    body = client.get('/api/study_activities').data
+    # Bypassing the models does not invalidate the cache
+    execute_db("UPDATE study_activities SET name = 'Renamed' WHERE id = 1")
+    assert client.get('/api/study_activities').data == body
+
+def test_model_writes_invalidate_affected_routes(client, dataset):
+    words_etag = client.get('/api/words').headers['ETag']
+    activities_etag = client.get('/api/study_activities').headers['ETag']
+
+    StudySession.record_word_review(1, 1, True)
+
+    response = client.get('/api/words', headers={'If-None-Match': words_etag})
+    assert response.status_code == 200
+    assert json.loads(response.data)['items'][0]['correct_count'] == 1
+    assert client.get('/api/study_activities', headers={'If-None-Match': activities_etag}).status_code == 304
+
+def test_errors_are_not_cached(client, dataset):
+    assert client.get('/api/words/999').status_code == 404
+    assert all('/api/words/999' not in key[1] for key in response_cache._entries)
+
+def test_lru_evicts_by_size():
+    cache = ResponseCache(max_bytes=100, ttl=60)
+    cache.set('a', ('words',), (0,), 'ea', b'x' * 40)
+    cache.set('b', ('words',), (0,), 'eb', b'x' * 40)
+    assert cache.get('a', (0,)) is not None  # 'a' becomes most recently used
+    cache.set('c', ('groups',), (0,), 'ec', b'x' * 40)
+
+    assert cache.get('b', (0,)) is None
+    assert cache.get('a', (0,)) == ('ea', b'x' * 40)
+    assert cache.stats()['bytes'] == 80
+    assert cache.stats()['evictions'] == 1
+
+    cache.invalidate(['groups'])
+    assert cache.get('c', (0,)) is None
+    assert cache.get('a', (1,)) is None  # version moved on
@@ -0,0 +1,69 @@
+import json
+import pytest
+from lib.db import execute_db
+
+@pytest.fixture
+def dataset(migrated_db):
+    """25 words in one group and 12 sessions, several sharing a timestamp."""
+    execute_db("INSERT INTO study_activities (id, name, description, url, preview_url) VALUES (1, 'a', 'a', 'a', 'a')")
+    execute_db("INSERT INTO groups (id, name, words_count) VALUES (1, 'g', 25)")
+    for word_id in range(1, 26):
+        execute_db("INSERT INTO words (id, portuguese, kimbundu, english, parts) VALUES (?, 'p', 'k', 'e', '{}')", (word_id,))
+        execute_db("INSERT INTO words_groups (word_id, group_id) VALUES (?, 1)", (word_id,))
+    for session_id in range(1, 13):
+        created_at = f"2025-03-{session_id // 3 + 1:02d} 10:00:00"
+        execute_db("INSERT INTO study_sessions (id, group_id, study_activity_id, created_at) VALUES (?, 1, 1, ?)",
+                   (session_id, created_at))
+    for word_id in range(1, 11):
+        execute_db("INSERT INTO word_review_items (word_id, study_session_id, correct) VALUES (?, 1, 1)", (word_id,))
+
+def walk(client, url, per_page):
+    """Follow next_cursor until exhausted and return all items in order."""
+    items, cursor = [], ''
+    while True:
+        response = client.get(f"{url}?cursor={cursor}&per_page={per_page}&include_total=false")
+        assert response.status_code == 200
+        data = json.loads(response.data)
+        assert data['pagination']['total'] is None
+        assert len(data['items']) <= per_page
+        items.extend(data['items'])
+        cursor = data['pagination']['next_cursor']
+        if not cursor:
+            assert data['pagination']['has_more'] is False
+            return items
+
+@pytest.mark.parametrize('url, per_page', [
+    ('/api/words', 7),
+    ('/api/groups', 1),
+    ('/api/groups/1/words', 10),
+    ('/api/study_sessions', 5),
+    ('/api/groups/1/study_sessions', 4),
+    ('/api/study_activities/1/study_sessions', 12),
+    ('/api/study_sessions/1/words', 3),
+])
+def test_cursor_walk_matches_offset_listing(client, dataset, url, per_page):
+    offset_ids = {i['id'] for i in json.loads(client.get(f"{url}?per_page=1000").data)['items']}
+    keyset_ids = [i['id'] for i in walk(client, url, per_page)]
+    assert len(keyset_ids) == len(set(keyset_ids)), "cursor pages overlap"
+    assert set(keyset_ids) == offset_ids
+
+def test_sessions_seek_breaks_timestamp_ties_by_id(client, dataset):
+    items = walk(client, '/api/study_sessions', 2)
+    assert [(i['created_at'], i['id']) for i in items] == sorted(
+        [(i['created_at'], i['id']) for i in items], reverse=True)
+    assert len({i['id'] for i in items}) == 12
+
+def test_include_total_with_cursor(client, dataset):
+    data = json.loads(client.get('/api/words?cursor=&per_page=10').data)
+    assert data['pagination']['total'] == 25
+    assert data['pagination']['has_more'] is True
+
+def test_offset_mode_can_skip_total(client, dataset):
+    data = json.loads(client.get('/api/words?page=2&per_page=10&include_total=false').data)
+    assert data['pagination']['total'] is None
+    assert len(data['items']) == 10
+
+def test_invalid_cursor_is_rejected(client, dataset):
+    response = client.get('/api/words?cursor=not-a-cursor')
+    assert response.status_code == 400
+    assert 'error' in json.loads(response.data)
@@ -0,0 +1,102 @@
+import logging
+import pytest
+from config import Config
+from lib import db
+from lib.query_stats import fingerprint, query_stats, QueryStats, _check_n_plus_one, _on_query
+
+@pytest.fixture
+def debug_app(monkeypatch):
+    """An app created with the debug routes and query instrumentation turned on."""
+    from app import create_app
+    monkeypatch.setattr(Config, 'DEBUG_ENDPOINTS', True)
+    monkeypatch.setattr(Config, 'QUERY_STATS_ENABLED', True)
+    app = create_app()
+    app.config['TESTING'] = True
+    yield app
+    db.remove_query_listener(_on_query)
+
+def test_fingerprint_normalizes_literals_and_lists():
+    """Statements differing only in literals, whitespace or list length share a fingerprint."""
+    assert fingerprint("SELECT * FROM words WHERE id = 5") == fingerprint("SELECT * FROM words\n  WHERE id = 12")
+    assert fingerprint("SELECT * FROM words WHERE english = 'it''s'") == "SELECT * FROM words WHERE english = ?"
+    assert fingerprint("SELECT * FROM words WHERE id IN (?, ?, ?)") == fingerprint("SELECT * FROM words WHERE id IN (?,?)")
+    assert fingerprint("INSERT INTO t (a, b) VALUES (?, ?), (?, ?)") == fingerprint("INSERT INTO t (a, b) VALUES (?, ?), (?, ?), (?, ?)")
+
+def test_top_orders_by_total_time_with_percentiles():
+    """Per-fingerprint counters aggregate calls and expose histogram percentiles."""
+    stats = QueryStats()
+    for _ in range(9):
+        stats.record("SELECT * FROM words WHERE id = ?", 0.0004)
+    stats.record("SELECT * FROM words WHERE id = ?", 0.2)
+    stats.record("SELECT COUNT(*) FROM words", 0.001)
+
+    top = stats.top(limit=1)
+    assert len(top) == 1
+    assert top[0]['fingerprint'] == "SELECT * FROM words WHERE id = ?"
+    assert top[0]['calls'] == 10
+    assert top[0]['p50_ms'] == 0.5
+    assert top[0]['p99_ms'] == 200
+    assert stats.top(order_by='calls')[1]['fingerprint'] == "SELECT COUNT(*) FROM words"
+
+def test_fingerprints_are_bounded():
+    """Fingerprints beyond the cap are folded into a single bucket."""
+    stats = QueryStats(max_fingerprints=2)
+    for table in ('a', 'b', 'c', 'd'):
+        stats.record(f"SELECT * FROM {table}", 0.001)
+    assert sorted(row['fingerprint'] for row in stats.top()) == ['(other)', 'SELECT * FROM a', 'SELECT * FROM b']
+
+def test_slow_queries_are_logged(migrated_db, debug_app, monkeypatch, caplog):
+    """Statements at or above SLOW_QUERY_MS go to the db.slow logger, with bind arguments only on request."""
+    monkeypatch.setattr(Config, 'SLOW_QUERY_MS', 0.000001)
+    with caplog.at_level(logging.WARNING, logger='db.slow'):
+        db.query_db("SELECT * FROM words WHERE id = ?", (42,))
+    slow = [r.message for r in caplog.records if "SELECT * FROM words WHERE id = ?" in r.message]
+    assert slow and not any("(42,)" in message for message in slow)
+
+    caplog.clear()
+    monkeypatch.setattr(Config, 'SLOW_QUERY_LOG_ARGS', True)
+    with caplog.at_level(logging.WARNING, logger='db.slow'):
+        db.query_db("SELECT * FROM words WHERE id = ?", (42,))
+    assert any("SELECT * FROM words WHERE id = ?" in r.message and "(42,)" in r.message for r in caplog.records)
+
+def test_n_plus_one_is_flagged_per_request(migrated_db, debug_app, monkeypatch):
+    """A fingerprint repeated more than N_PLUS_ONE_THRESHOLD times in one request is reported."""
+    monkeypatch.setattr(Config, 'N_PLUS_ONE_THRESHOLD', 3)
+    query_stats.reset()
+    with debug_app.test_request_context('/api/words'):
+        for word_id in range(5):
+            db.query_db("SELECT * FROM words WHERE id = ?", (word_id,))
+        db.query_db("SELECT COUNT(*) AS count FROM words")
+        _check_n_plus_one()
+
+    flagged = query_stats.n_plus_one()
+    assert flagged == [{
+        'endpoint': '/api/words',
+        'fingerprint': "SELECT * FROM words WHERE id = ?",
+        'requests': 1,
+        'max_per_request': 5,
+    }]
+
+def test_debug_routes_are_off_by_default(monkeypatch):
+    """Without DEBUG_ENDPOINTS the debug routes are not registered."""
+    from app import create_app
+    monkeypatch.setattr(Config, 'DEBUG_ENDPOINTS', False)
+    client = create_app().test_client()
+    for path in ('/api/debug/pool', '/api/debug/http_cache', '/api/debug/queries'):
+        assert client.get(path).status_code == 404
+    assert client.delete('/api/debug/queries').status_code in (404, 405)
+
+def test_debug_queries_endpoint(migrated_db, debug_app):
+    """The debug endpoint lists collected statements and can be reset."""
+    client = debug_app.test_client()
+    query_stats.reset()
+    client.get('/api/words')
+    response = client.get('/api/debug/queries?limit=5')
+    assert response.status_code == 200
+    data = response.get_json()
+    assert 0 < len(data['queries']) <= 5
+    assert {'fingerprint', 'calls', 'total_ms', 'p95_ms', 'histogram'} <= set(data['queries'][0])
+    assert client.get('/api/debug/queries?order_by=bogus').status_code == 400
+
+    assert client.delete('/api/debug/queries').status_code == 200
+    assert client.get('/api/debug/queries').get_json()['queries'] == []
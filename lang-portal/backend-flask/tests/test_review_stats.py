@@ -0,0 +1,122 @@
+import pytest
+from config import Config
+from lib import db
+
+AGGREGATE_WORD_STATS = """
+    SELECT word_id, SUM(correct = 1) AS correct_count, SUM(correct = 0) AS wrong_count,
+           MAX(created_at) AS last_reviewed_at
+    FROM word_review_items GROUP BY word_id ORDER BY word_id
+"""
+
+AGGREGATE_SESSION_STATS = """
+    SELECT study_session_id, SUM(correct = 1) AS correct_count, SUM(correct = 0) AS wrong_count,
+           MAX(created_at) AS last_reviewed_at, COUNT(DISTINCT word_id) AS distinct_words
+    FROM word_review_items GROUP BY study_session_id ORDER BY study_session_id
+"""
+
+@pytest.fixture
+def stats_db(tmp_path, monkeypatch):
+    """A migrated throwaway database with two words and two sessions."""
+    monkeypatch.setattr(Config, 'DATABASE_PATH', str(tmp_path / 'stats.db'))
+    db.close_pool()
+    db.run_migrations()
+    db.execute_db("INSERT INTO study_activities (id, name, description, url, preview_url) VALUES (1, 'a', 'a', 'a', 'a')")
+    db.execute_db("INSERT INTO groups (id, name) VALUES (1, 'g')")
+    for word_id in (1, 2):
+        db.execute_db("INSERT INTO words (id, portuguese, kimbundu, english, parts) VALUES (?, 'p', 'k', 'e', '{}')", (word_id,))
+    for session_id in (1, 2):
+        db.execute_db("INSERT INTO study_sessions (id, group_id, study_activity_id) VALUES (?, 1, 1)", (session_id,))
+    yield
+    db.close_pool()
+
+def review(review_id, word_id, session_id, correct, created_at):
+    db.execute_db(
+        "INSERT INTO word_review_items (id, word_id, study_session_id, correct, created_at) VALUES (?, ?, ?, ?, ?)",
+        (review_id, word_id, session_id, correct, created_at)
+    )
+
+def assert_stats_match_history():
+    assert db.query_db("SELECT * FROM word_stats ORDER BY word_id") == db.query_db(AGGREGATE_WORD_STATS)
+    assert db.query_db("SELECT * FROM session_stats ORDER BY study_session_id") == db.query_db(AGGREGATE_SESSION_STATS)
+
+def test_insert_trigger_maintains_counters(stats_db):
+    review(1, 1, 1, 1, '2025-03-01 10:00:00')
+    review(2, 1, 1, 0, '2025-03-01 10:05:00')
+    review(3, 2, 1, 1, '2025-03-01 10:02:00')
+    review(4, 1, 2, 1, '2025-03-02 09:00:00')
+    assert_stats_match_history()
+
+    session = db.query_db("SELECT * FROM session_stats WHERE study_session_id = 1", one=True)
+    assert session['distinct_words'] == 2
+    assert session['last_reviewed_at'] == '2025-03-01 10:05:00'
+
+def test_delete_trigger_maintains_counters(stats_db):
+    review(1, 1, 1, 1, '2025-03-01 10:00:00')
+    review(2, 1, 1, 0, '2025-03-01 10:05:00')
+    review(3, 2, 2, 1, '2025-03-02 09:00:00')
+
+    db.execute_db("DELETE FROM word_review_items WHERE id = 2")
+    assert_stats_match_history()
+
+    db.execute_db("DELETE FROM study_sessions WHERE id = 2")
+    assert_stats_match_history()
+    assert db.query_db("SELECT * FROM word_stats WHERE word_id = 2") == []
+
+def test_rebuild_review_stats(stats_db):
+    review(1, 1, 1, 1, '2025-03-01 10:00:00')
+    review(2, 2, 1, 0, '2025-03-01 10:05:00')
+    db.execute_db("UPDATE word_stats SET correct_count = 99")
+    db.execute_db("DELETE FROM session_stats")
+
+    db.rebuild_review_stats()
+    assert_stats_match_history()
+
+def test_performance_graph_counts_sessions_without_reviews(stats_db):
+    from app.models import Dashboard
+    review(1, 1, 1, 1, '2025-03-01 10:00:00')
+    db.execute_db("UPDATE study_sessions SET created_at = CURRENT_TIMESTAMP")
+
+    graph = {row['id']: row for row in Dashboard.get_performance_graph()}
+    assert (graph[1]['correct_count'], graph[1]['wrong_count'], graph[1]['review_items_count']) == (1, 0, 1)
+    assert (graph[2]['correct_count'], graph[2]['wrong_count'], graph[2]['review_items_count']) == (0, 0, 0)
+
+def add_history(reviews):
+    """``reviews`` review items spread over both words and both sessions, in one transaction."""
+    with db.transaction() as conn:
+        conn.executemany(
+            "INSERT INTO word_review_items (word_id, study_session_id, correct, created_at) VALUES (?, ?, ?, ?)",
+            [(i % 2 + 1, i // 2 % 2 + 1, i % 3 == 0, f'2025-03-01 10:{i // 60 % 60:02d}:{i % 60:02d}')
+             for i in range(reviews)]
+        )
+    assert_stats_match_history()
+
+def test_reset_history_clears_counters(stats_db):
+    from app.models import StudySession
+    add_history(5000)
+
+    StudySession.reset_history()
+    for table in ('word_review_items', 'study_sessions', 'word_stats', 'session_stats', 'review_stats_paused'):
+        assert db.query_db(f"SELECT COUNT(*) AS n FROM {table}", one=True)['n'] == 0
+
+    # the triggers keep counting once the reset is over
+    db.execute_db("INSERT INTO study_sessions (id, group_id, study_activity_id) VALUES (3, 1, 1)")
+    review(1, 1, 3, 1, '2025-03-03 10:00:00')
+    review(2, 2, 3, 0, '2025-03-03 10:01:00')
+    db.execute_db("DELETE FROM word_review_items WHERE id = 2")
+    assert_stats_match_history()
+
+def test_full_reset_clears_counters(stats_db):
+    from app.models import Dashboard
+    add_history(5000)
+
+    Dashboard.full_reset()
+    for table in ('word_review_items', 'words', 'study_sessions', 'word_stats', 'session_stats', 'review_stats_paused'):
+        assert db.query_db(f"SELECT COUNT(*) AS n FROM {table}", one=True)['n'] == 0
+
+@pytest.mark.parametrize('query', [
+    "SELECT MAX(created_at) FROM word_review_items WHERE word_id = 1",
+    "SELECT 1 FROM word_review_items WHERE study_session_id = 1 AND word_id = 1",
+])
+def test_trigger_lookups_use_an_index(stats_db, query):
+    plan = ' '.join(row['detail'] for row in db.query_db(f"EXPLAIN QUERY PLAN {query}"))
+    assert 'COVERING INDEX' in plan
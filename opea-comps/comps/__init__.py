@@ -48,7 +48,7 @@ from comps.cores.mega.constants import MegaServiceEndpoint, ServiceRoleType, Ser
 # Microservice
 from comps.cores.mega.orchestrator import ServiceOrchestrator
 from comps.cores.mega.orchestrator_with_yaml import ServiceOrchestratorWithYaml
-from comps.cores.mega.micro_service import MicroService, register_microservice, opea_microservices
+from comps.cores.mega.micro_service import MicroService, register_microservice, register_batch_infer, opea_microservices
 
 # Telemetry
 from comps.cores.telemetry.opea_telemetry import opea_telemetry
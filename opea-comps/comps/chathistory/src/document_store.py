@@ -7,6 +7,7 @@ from bson.objectid import ObjectId
 
 from comps.chathistory.src.integrations.mongo.config import COLLECTION_NAME
 from comps.chathistory.src.integrations.mongo.mongo_conn import MongoClient
+from comps.cores.common.mongo import build_projection, create_indexes, iter_documents
 
 
 class DocumentStore:
@@ -21,6 +22,11 @@ class DocumentStore:
         self.db_client = MongoClient.get_db_client()
         self.collection = self.db_client[COLLECTION_NAME]
 
+    @staticmethod
+    async def create_indexes() -> None:
+        """Creates the indexes the per-user queries rely on; run once at startup."""
+        await create_indexes(MongoClient.get_db_client()[COLLECTION_NAME], [[("data.user", 1), ("_id", 1)]])
+
     async def save_document(self, document):
         """Stores a new document into the storage.
 
@@ -77,24 +83,41 @@ class DocumentStore:
             print(e)
             raise Exception(e)
 
-    async def get_all_documents_of_user(self) -> list[dict]:
-        """Retrieves all documents of a specific user from the collection.
+    def iter_documents_of_user(self, limit=None, after=None, fields=None):
+        """Yields the documents of a specific user in creation order, as they are read.
+
+        Takes the same arguments as get_all_documents_of_user.
+
+        Raises:
+            KeyError: If ``after`` is not a valid document ID.
+            ValueError: If a field name is invalid.
+        """
+        try:
+            return iter_documents(
+                self.collection, {"data.user": self.user}, build_projection(fields, {"data": 0}), limit, after
+            )
+        except BsonError.InvalidId as e:
+            print(e)
+            raise KeyError(e)
+
+    async def get_all_documents_of_user(self, limit=None, after=None, fields=None) -> list[dict]:
+        """Retrieves documents of a specific user from the collection, oldest first.
+
+        Args:
+            limit (int, optional): Return at most this many documents.
+            after (str, optional): ID of the last document of the previous page.
+            fields (list[str], optional): Fields to return. Defaults to all but ``data``.
 
         Returns:
             A list of dictionaries representing the conversation documents.
         Raises:
             Exception: If there is an error while retrieving the documents.
         """
-        conversation_list: list = []
         try:
-            cursor = self.collection.find({"data.user": self.user}, {"data": 0})
-
-            async for document in cursor:
-                document["id"] = str(document["_id"])
-                del document["_id"]
-                conversation_list.append(document)
-            return conversation_list
+            return [document async for document in self.iter_documents_of_user(limit, after, fields)]
 
+        except KeyError:
+            raise
         except Exception as e:
             print(e)
             raise Exception(e)
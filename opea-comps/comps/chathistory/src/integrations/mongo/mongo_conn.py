@@ -3,9 +3,8 @@
 
 from typing import Any
 
-import motor.motor_asyncio as motor
-
 from comps.chathistory.src.integrations.mongo.config import DB_NAME, MONGO_HOST, MONGO_PORT
+from comps.cores.common.mongo import get_motor_client
 
 
 class MongoClient:
@@ -14,7 +13,8 @@ class MongoClient:
     @staticmethod
     def get_db_client() -> Any:
         try:
-            client = motor.AsyncIOMotorClient(MongoClient.conn_url)
+            # shared by all requests of this process
+            client = get_motor_client(MongoClient.conn_url)
             db = client[DB_NAME]
             return db
 
@@ -1,13 +1,15 @@
 # Copyright (C) 2024 Intel Corporation
 # SPDX-License-Identifier: Apache-2.0
 import os
-from typing import Optional
+from typing import List, Optional
 
 from fastapi import HTTPException
-from pydantic import BaseModel
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
 
 from comps import CustomLogger
 from comps.chathistory.src.document_store import DocumentStore
+from comps.cores.common.mongo import ndjson
 from comps.cores.mega.micro_service import opea_microservices, register_microservice
 from comps.cores.proto.api_protocol import ChatCompletionRequest
 
@@ -24,6 +26,11 @@ class ChatMessage(BaseModel):
 class ChatId(BaseModel):
     user: str
     id: Optional[str] = None
+    # listing only: page size, id of the last document of the previous page, fields to return, NDJSON stream
+    limit: Optional[int] = Field(None, gt=0)
+    after: Optional[str] = None
+    fields: Optional[List[str]] = None
+    stream: bool = False
 
 
 def get_first_string(value):
@@ -99,7 +106,10 @@ async def get_documents(document: ChatId):
         store = DocumentStore(document.user)
         store.initialize_storage()
         if document.id is None:
-            res = await store.get_all_documents_of_user()
+            if document.stream:
+                documents = store.iter_documents_of_user(document.limit, document.after, document.fields)
+                return StreamingResponse(ndjson(documents), media_type="application/x-ndjson")
+            res = await store.get_all_documents_of_user(document.limit, document.after, document.fields)
         else:
             res = await store.get_user_documents_by_id(document.id)
         if logflag:
@@ -146,4 +156,5 @@ async def delete_documents(document: ChatId):
 
 
 if __name__ == "__main__":
+    opea_microservices["opea_service@chathistory_mongo"].add_startup_event(DocumentStore.create_indexes())
     opea_microservices["opea_service@chathistory_mongo"].start()
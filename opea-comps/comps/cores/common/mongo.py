@@ -0,0 +1,180 @@
+# Copyright (C) 2024 Intel Corporation
+# SPDX-License-Identifier: Apache-2.0
+
+import json
+import os
+import threading
+from typing import Any, AsyncIterator, Iterable, List, Optional
+
+import motor.motor_asyncio as motor
+from bson.objectid import ObjectId
+from prometheus_client import Counter, Gauge, Histogram
+from pymongo import monitoring
+
+from ..mega.logger import CustomLogger
+
+logger = CustomLogger("opea_mongo")
+
+# Connection pool of the process-wide client
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", 100))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", 5))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", 300000))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", 30000))
+
+pool_open_connections = Gauge("opea_mongo_pool_open_connections", "Open MongoDB connections", ["address"])
+pool_checked_out_connections = Gauge(
+    "opea_mongo_pool_checked_out_connections", "MongoDB connections currently in use", ["address"]
+)
+pool_checkout_failures = Counter(
+    "opea_mongo_pool_checkout_failures", "Failed MongoDB connection checkouts", ["address", "reason"]
+)
+command_duration = Histogram(
+    "opea_mongo_command_duration_seconds",
+    "MongoDB command latency",
+    ["command"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+command_failures = Counter("opea_mongo_command_failures", "Failed MongoDB commands", ["command"])
+
+
+def _address(event) -> str:
+    host, port = event.address
+    return f"{host}:{port}"
+
+
+class _CommandMetrics(monitoring.CommandListener):
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        command_duration.labels(event.command_name).observe(event.duration_micros / 1e6)
+
+    def failed(self, event):
+        command_duration.labels(event.command_name).observe(event.duration_micros / 1e6)
+        command_failures.labels(event.command_name).inc()
+
+
+class _PoolMetrics(monitoring.ConnectionPoolListener):
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        pool_open_connections.labels(_address(event)).inc()
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        pool_open_connections.labels(_address(event)).dec()
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        pool_checkout_failures.labels(_address(event), str(event.reason)).inc()
+
+    def connection_checked_out(self, event):
+        pool_checked_out_connections.labels(_address(event)).inc()
+
+    def connection_checked_in(self, event):
+        pool_checked_out_connections.labels(_address(event)).dec()
+
+
+_clients = {}  # connection url => AsyncIOMotorClient
+_clients_lock = threading.Lock()
+
+
+def get_motor_client(url: str) -> Any:
+    """The process-wide Motor client for ``url``, created on first use.
+
+    Motor clients own a connection pool and are safe to share, so every request
+    reuses the same pool instead of opening connections of its own.
+    """
+    client = _clients.get(url)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(url)
+            if client is None:
+                client = motor.AsyncIOMotorClient(
+                    url,
+                    maxPoolSize=MONGO_MAX_POOL_SIZE,
+                    minPoolSize=MONGO_MIN_POOL_SIZE,
+                    maxIdleTimeMS=MONGO_MAX_IDLE_TIME_MS,
+                    serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+                    event_listeners=[_CommandMetrics(), _PoolMetrics()],
+                )
+                _clients[url] = client
+    return client
+
+
+async def create_indexes(collection, indexes: Iterable) -> None:
+    """Create ``indexes`` on ``collection``; indexes that already exist are left as they are.
+
+    Each entry is a key specification accepted by ``create_index``.
+    """
+    for keys in indexes:
+        try:
+            name = await collection.create_index(keys)
+            logger.info(f"Index {name} is ready on {collection.name}")
+        except Exception as e:
+            logger.error(f"Failed to create index {keys} on {collection.name}: {e}")
+
+
+def build_projection(fields: Optional[List[str]], default: dict) -> dict:
+    """Projection returning only ``fields`` (dotted paths allowed), or ``default`` when none are given."""
+    if not fields:
+        return default
+    for field in fields:
+        if not field or field.startswith("$"):
+            raise ValueError(f"Invalid field name: {field!r}")
+    return {field: 1 for field in fields}
+
+
+def iter_documents(
+    collection,
+    query: dict,
+    projection: dict,
+    limit: Optional[int] = None,
+    after: Optional[str] = None,
+    id_field: str = "id",
+) -> AsyncIterator[dict]:
+    """Documents matching ``query`` in ``_id`` order, starting after the document with id ``after``.
+
+    Pages seek on ``_id`` instead of skipping, so with a compound index on the
+    query field and ``_id`` every page costs the same however deep it is. The
+    ``_id`` of each document is returned as a string under ``id_field``. Raises
+    ``bson.errors.InvalidId`` right away for a malformed ``after``, before any
+    document is read.
+    """
+    if after is not None:
+        query = {**query, "_id": {"$gt": ObjectId(after)}}
+    cursor = collection.find(query, projection).sort("_id", 1)
+    if limit:
+        cursor = cursor.limit(limit)
+
+    async def documents():
+        async for document in cursor:
+            document[id_field] = str(document.pop("_id"))
+            yield document
+
+    return documents()
+
+
+async def ndjson(documents: AsyncIterator[dict]) -> AsyncIterator[str]:
+    """Serialize documents as newline-delimited JSON while they come off the cursor."""
+    try:
+        async for document in documents:
+            yield json.dumps(document, default=str) + "\n"
+    except Exception as e:
+        # the status line has already been sent; the client sees a truncated stream
+        logger.error(f"Streaming documents failed: {e}")
+        raise
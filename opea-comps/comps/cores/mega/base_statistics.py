@@ -1,76 +1,313 @@
 # Copyright (C) 2024 Intel Corporation
 # SPDX-License-Identifier: Apache-2.0
 
-import numpy as np
+import inspect
+import math
+import threading
+import time
+from functools import wraps
+
+from fastapi import HTTPException
 
 # name => statistic dict
 statistics_dict = {}
 
+# sliding windows reported by /v1/statistics, in seconds
+DEFAULT_WINDOWS = {"1m": 60, "5m": 300, "1h": 3600}
+
+
+class DDSketch:
+    """Mergeable quantile sketch with bounded relative error (DDSketch).
+
+    Values are counted in logarithmic buckets, so any quantile is answered within
+    ``relative_accuracy`` of the true value using at most ``max_bins`` counters.
+    Sketches with the same accuracy can be merged losslessly, which makes them
+    suitable for combining workers and replicas.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01, max_bins: int = 2048):
+        self.relative_accuracy = relative_accuracy
+        self.max_bins = max_bins
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.bins = {}  # bucket index => count
+        self.zero_count = 0  # values too small to be bucketed, e.g. 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def _index(self, value: float) -> int:
+        return math.ceil(math.log(value) / self._log_gamma)
+
+    def _value(self, index: int) -> float:
+        return 2 * self.gamma**index / (self.gamma + 1)
+
+    def add(self, value: float) -> None:
+        if value <= 1e-9:
+            self.zero_count += 1
+        else:
+            index = self._index(value)
+            self.bins[index] = self.bins.get(index, 0) + 1
+            if len(self.bins) > self.max_bins:
+                self._collapse()
+        self.count += 1
+        self.sum += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def _collapse(self) -> None:
+        # fold the lowest buckets together; high quantiles keep their accuracy
+        indexes = sorted(self.bins)
+        excess = len(indexes) - self.max_bins + 1
+        target = indexes[excess]
+        self.bins[target] += sum(self.bins.pop(index) for index in indexes[:excess])
+
+    def merge(self, other: "DDSketch") -> "DDSketch":
+        if other.gamma != self.gamma:
+            raise ValueError("Cannot merge sketches with different relative accuracy")
+        for index, count in other.bins.items():
+            self.bins[index] = self.bins.get(index, 0) + count
+        if len(self.bins) > self.max_bins:
+            self._collapse()
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def quantile(self, q: float):
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return self.min
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if seen > rank:
+                return min(max(self._value(index), self.min), self.max)
+        return self.max
+
+    @property
+    def average(self):
+        return self.sum / self.count if self.count else None
+
+    def to_dict(self) -> dict:
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "bins": {str(index): count for index, count in self.bins.items()},
+            "zero_count": self.zero_count,
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict, max_bins: int = 2048) -> "DDSketch":
+        sketch = cls(data["relative_accuracy"], max_bins)
+        sketch.bins = {int(index): count for index, count in data["bins"].items()}
+        sketch.zero_count = data["zero_count"]
+        sketch.count = data["count"]
+        sketch.sum = data["sum"]
+        if sketch.count:
+            sketch.min = data["min"]
+            sketch.max = data["max"]
+        return sketch
+
+
+class _Slot:
+    """Everything recorded during one time slot."""
+
+    def __init__(self, relative_accuracy: float):
+        self.latency = DDSketch(relative_accuracy)
+        self.first_token = DDSketch(relative_accuracy)
+        self.errors = 0
+
+    def merge(self, other: "_Slot") -> "_Slot":
+        self.latency.merge(other.latency)
+        self.first_token.merge(other.first_token)
+        self.errors += other.errors
+        return self
+
 
 class BaseStatistics:
-    """Base class to store in-memory statistics of an entity for measurement in one service."""
+    """Base class to store in-memory statistics of an entity for measurement in one service.
+
+    Latencies go into quantile sketches, so memory stays bounded however long the
+    service runs: one lifetime sketch plus one sketch per ``slot_seconds`` slot
+    for the longest sliding window. Slots are aligned to wall-clock time, so the
+    output of ``export()`` from several workers or replicas can be combined with
+    ``merge()``.
+    """
 
     def __init__(
         self,
+        windows: dict = None,
+        slot_seconds: int = 10,
+        relative_accuracy: float = 0.01,
     ):
-        self.response_times = []  # store responses time for all requests
-        self.first_token_latencies = []  # store first token latencies for all requests
+        self.windows = windows or DEFAULT_WINDOWS
+        self.slot_seconds = slot_seconds
+        self.relative_accuracy = relative_accuracy
+        self.total = _Slot(relative_accuracy)
+        self.slots = {}  # slot start (epoch seconds) => _Slot
+        self._lock = threading.Lock()
 
-    def append_latency(self, latency, first_token_latency=None):
-        self.response_times.append(latency)
-        if first_token_latency:
-            self.first_token_latencies.append(first_token_latency)
+    def _current_slot(self, now: float) -> _Slot:
+        start = int(now // self.slot_seconds) * self.slot_seconds
+        slot = self.slots.get(start)
+        if slot is None:
+            slot = self.slots[start] = _Slot(self.relative_accuracy)
+            self._expire(now)
+        return slot
 
-    def calculate_statistics(self):
-        if not self.response_times:
-            return {
-                "p50_latency": None,
-                "p99_latency": None,
-                "average_latency": None,
-            }
-        # Calculate the P50 (median)
-        p50 = np.percentile(self.response_times, 50)
+    def _expire(self, now: float) -> None:
+        oldest = now - max(self.windows.values()) - self.slot_seconds
+        for start in [start for start in self.slots if start < oldest]:
+            del self.slots[start]
 
-        # Calculate the P99
-        p99 = np.percentile(self.response_times, 99)
+    def append_latency(self, latency, first_token_latency=None):
+        with self._lock:
+            slot = self._current_slot(time.time())
+            for target in (self.total, slot):
+                target.latency.add(latency)
+                if first_token_latency:
+                    target.first_token.add(first_token_latency)
+
+    def append_error(self):
+        """Count a failed request towards the error rate."""
+        with self._lock:
+            self.total.errors += 1
+            self._current_slot(time.time()).errors += 1
 
-        avg = np.average(self.response_times)
+    def _snapshot_total(self) -> _Slot:
+        # copy under the lock; handlers running in the threadpool keep adding to the live sketches
+        with self._lock:
+            return _Slot(self.relative_accuracy).merge(self.total)
 
+    def calculate_statistics(self):
+        latency = self._snapshot_total().latency
         return {
-            "p50_latency": p50,
-            "p99_latency": p99,
-            "average_latency": avg,
+            "p50_latency": latency.quantile(0.5),
+            "p99_latency": latency.quantile(0.99),
+            "average_latency": latency.average,
         }
 
     def calculate_first_token_statistics(self):
-        if not self.first_token_latencies:
+        first_token = self._snapshot_total().first_token
+        return {
+            "p50_latency_first_token": first_token.quantile(0.5),
+            "p99_latency_first_token": first_token.quantile(0.99),
+            "average_latency_first_token": first_token.average,
+        }
+
+    def calculate_window_statistics(self, now: float = None):
+        """p50/p90/p99 latency, throughput (requests/s) and error rate for every sliding window."""
+        now = time.time() if now is None else now
+        windows = {}
+        with self._lock:
+            self._expire(now)
+            for name, seconds in self.windows.items():
+                window = windows[name] = _Slot(self.relative_accuracy)
+                for start, slot in self.slots.items():
+                    if start + self.slot_seconds > now - seconds:
+                        window.merge(slot)
+        results = {}
+        for name, seconds in self.windows.items():
+            window = windows[name]
+            requests = window.latency.count
+            attempts = requests + window.errors
+            results[name] = {
+                "requests": requests,
+                "throughput": requests / seconds,
+                "error_rate": window.errors / attempts if attempts else None,
+                "p50_latency": window.latency.quantile(0.5),
+                "p90_latency": window.latency.quantile(0.9),
+                "p99_latency": window.latency.quantile(0.99),
+                "p50_latency_first_token": window.first_token.quantile(0.5),
+                "p99_latency_first_token": window.first_token.quantile(0.99),
+            }
+        return results
+
+    def export(self) -> dict:
+        """Serializable snapshot of the sketches, for merging across workers and replicas."""
+
+        def slot_dict(slot):
+            return {"latency": slot.latency.to_dict(), "first_token": slot.first_token.to_dict(), "errors": slot.errors}
+
+        with self._lock:
             return {
-                "p50_latency_first_token": None,
-                "p99_latency_first_token": None,
-                "average_latency_first_token": None,
+                "slot_seconds": self.slot_seconds,
+                "total": slot_dict(self.total),
+                "slots": {str(start): slot_dict(slot) for start, slot in self.slots.items()},
             }
-        # Calculate the P50 (median)
-        p50 = np.percentile(self.first_token_latencies, 50)
 
-        # Calculate the P99
-        p99 = np.percentile(self.first_token_latencies, 99)
+    def merge(self, exported: dict) -> "BaseStatistics":
+        """Fold the ``export()`` output of another worker or replica into this one."""
+        if exported["slot_seconds"] != self.slot_seconds:
+            raise ValueError("Cannot merge statistics with different slot sizes")
 
-        avg = np.average(self.first_token_latencies)
+        def slot_from(data):
+            slot = _Slot(self.relative_accuracy)
+            slot.latency = DDSketch.from_dict(data["latency"])
+            slot.first_token = DDSketch.from_dict(data["first_token"])
+            slot.errors = data["errors"]
+            return slot
 
-        return {
-            "p50_latency_first_token": p50,
-            "p99_latency_first_token": p99,
-            "average_latency_first_token": avg,
-        }
+        with self._lock:
+            self.total.merge(slot_from(exported["total"]))
+            for start, data in exported["slots"].items():
+                start = int(start)
+                if start in self.slots:
+                    self.slots[start].merge(slot_from(data))
+                else:
+                    self.slots[start] = slot_from(data)
+        return self
 
 
 def register_statistics(
     names,
 ):
+    """Create the statistics of ``names`` and count the handler's failures as errors.
+
+    Every exception counts except an ``HTTPException`` with a 4xx status, which
+    reports bad client input rather than a failure of the service.
+    """
+
     def decorator(func):
         for name in names:
             statistics_dict[name] = BaseStatistics()
-        return func
+
+        def record_error(error):
+            if isinstance(error, HTTPException) and error.status_code < 500:
+                return
+            for name in names:
+                statistics_dict[name].append_error()
+
+        if inspect.iscoroutinefunction(func):
+
+            @wraps(func)
+            async def wrapper(*args, **kwargs):
+                try:
+                    return await func(*args, **kwargs)
+                except Exception as e:
+                    record_error(e)
+                    raise
+
+        else:
+
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                try:
+                    return func(*args, **kwargs)
+                except Exception as e:
+                    record_error(e)
+                    raise
+
+        return wrapper
 
     return decorator
 
@@ -81,5 +318,6 @@ def collect_all_statistics():
         for name, statistic in statistics_dict.items():
             tmp_dict = statistic.calculate_statistics()
             tmp_dict.update(statistic.calculate_first_token_statistics())
+            tmp_dict["windows"] = statistic.calculate_window_statistics()
             results.update({name: tmp_dict})
     return results
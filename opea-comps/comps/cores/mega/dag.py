@@ -2,18 +2,55 @@
 # SPDX-License-Identifier: Apache-2.0
 
 from collections import OrderedDict, defaultdict
-from copy import deepcopy
+
+
+class ExecutionPlan(object):
+    """Immutable snapshot of a DAG, compiled once and shared by every request.
+
+    Holds the topological order, per-node successor and predecessor tuples and the
+    in-degree of every node, so a scheduler only needs a cheap copy of the
+    in-degree counters and of the adjacency sets per run.
+    """
+
+    def __init__(self, graph):
+        self.nodes = tuple(graph.keys())
+        self.successors = {node: tuple(graph[node]) for node in self.nodes}
+        predecessors = {node: [] for node in self.nodes}
+        for node in self.nodes:
+            for successor in self.successors[node]:
+                predecessors[successor].append(node)
+        self.predecessors = {node: tuple(preds) for node, preds in predecessors.items()}
+        self.in_degree = {node: len(preds) for node, preds in self.predecessors.items()}
+        self.ind_nodes = tuple(node for node in self.nodes if not self.in_degree[node])
+        self.order = tuple(DAG().topological_sort(graph))
+
+    def new_in_degree(self):
+        """Per-run countdown of unfinished predecessors."""
+        return dict(self.in_degree)
+
+    def new_graph(self):
+        """Per-run copy of the adjacency sets, safe to prune without touching the plan."""
+        dag = DAG()
+        dag.graph = OrderedDict((node, set(successors)) for node, successors in self.successors.items())
+        return dag
 
 
 class DAG(object):
     def __init__(self):
         self.reset_graph()
 
+    def compile(self) -> ExecutionPlan:
+        """Return the execution plan of the current graph, building it on first use."""
+        if self._plan is None:
+            self._plan = ExecutionPlan(self.graph)
+        return self._plan
+
     def add_node(self, node_name: str):
         graph = self.graph
         if node_name in graph:
             raise KeyError("node %s already exists" % node_name)
         graph[node_name] = set()
+        self._plan = None
 
     def add_node_if_not_exists(self, node_name):
         try:
@@ -30,6 +67,7 @@ class DAG(object):
         for node, edges in graph.items():
             if node_name in edges:
                 edges.remove(node_name)
+        self._plan = None
 
     def delete_node_if_exists(self, node_name):
         try:
@@ -41,19 +79,31 @@ class DAG(object):
         graph = self.graph
         if ind_node not in graph or dep_node not in graph:
             raise KeyError("one or more nodes do not exist in graph")
-        test_graph = deepcopy(graph)
-        test_graph[ind_node].add(dep_node)
-        is_valid = self.validate(test_graph)
-        if is_valid:
-            graph[ind_node].add(dep_node)
-        else:
+        # the new edge closes a cycle iff ind_node is already reachable from dep_node
+        if ind_node == dep_node or self._reachable(dep_node, ind_node):
             raise Exception("validation error!")
+        graph[ind_node].add(dep_node)
+        self._plan = None
+
+    def _reachable(self, start, target):
+        graph = self.graph
+        stack = [start]
+        seen = {start}
+        while stack:
+            for node in graph[stack.pop()]:
+                if node == target:
+                    return True
+                if node not in seen:
+                    seen.add(node)
+                    stack.append(node)
+        return False
 
     def delete_edge(self, ind_node, dep_node):
         graph = self.graph
         if dep_node not in graph.get(ind_node, []):
             raise KeyError("this edge does not exist in graph")
         graph[ind_node].remove(dep_node)
+        self._plan = None
 
     def predecessors(self, node):
         graph = self.graph
@@ -95,6 +145,7 @@ class DAG(object):
 
     def reset_graph(self):
         self.graph = OrderedDict()
+        self._plan = None
 
     def ind_nodes(self, graph=None):
         graph = graph if graph is not None else self.graph
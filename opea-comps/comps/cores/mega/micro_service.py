@@ -3,10 +3,13 @@
 
 import asyncio
 import os
-from collections import defaultdict, deque
+import time
 from enum import Enum
 from typing import Any, List, Optional, Type
 
+from fastapi import HTTPException
+from prometheus_client import Histogram
+
 from ..proto.docarray import TextDoc
 from .constants import ServiceRoleType, ServiceType
 from .http_service import HTTPService
@@ -18,6 +21,19 @@ opea_microservices = {}
 logger = CustomLogger("micro_service")
 logflag = os.getenv("LOGFLAG", False)
 
+batch_size_histogram = Histogram(
+    "opea_dynamic_batch_size",
+    "Number of requests per dynamic batch (histogram)",
+    ["service", "service_type"],
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256),
+)
+batch_queue_wait_histogram = Histogram(
+    "opea_dynamic_batch_queue_wait_seconds",
+    "Time a request waits in the dynamic batching queue before its batch runs (histogram)",
+    ["service", "service_type"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+
 
 class MicroService(HTTPService):
     """MicroService class to create a microservice."""
@@ -40,10 +56,19 @@ class MicroService(HTTPService):
         use_remote_service: Optional[bool] = False,
         description: Optional[str] = None,
         dynamic_batching: bool = False,
-        dynamic_batching_timeout: int = 1,
+        dynamic_batching_timeout: float = 0.01,
         dynamic_batching_max_batch_size: int = 32,
+        dynamic_batching_max_queue_size: int = 1024,
     ):
-        """Init the microservice."""
+        """Init the microservice.
+
+        With ``dynamic_batching``, requests passed to ``enqueue_request`` are grouped per
+        service type and handed to ``dynamic_batching_infer``. A batch runs as soon as it
+        holds ``dynamic_batching_max_batch_size`` requests or its oldest request has waited
+        ``dynamic_batching_timeout`` seconds (fractions allowed, e.g. 0.005). At most
+        ``dynamic_batching_max_queue_size`` requests may wait per service type; beyond
+        that new requests are rejected with HTTP 503.
+        """
         self.service_role = service_role
         self.service_type = service_type
         self.protocol = protocol
@@ -57,6 +82,10 @@ class MicroService(HTTPService):
         self.dynamic_batching = dynamic_batching
         self.dynamic_batching_timeout = dynamic_batching_timeout
         self.dynamic_batching_max_batch_size = dynamic_batching_max_batch_size
+        self.dynamic_batching_max_queue_size = dynamic_batching_max_queue_size
+        self.batch_queues = {}  # service type => asyncio.Queue of pending requests
+        self._batch_workers = {}
+        self._batch_infer = None
         self.uvicorn_kwargs = {}
 
         if ssl_keyfile:
@@ -85,47 +114,86 @@ class MicroService(HTTPService):
 
             super().__init__(uvicorn_kwargs=self.uvicorn_kwargs, runtime_args=runtime_args)
 
-            # create a batch request processor loop if using dynamic batching
-            if self.dynamic_batching:
-                self.buffer_lock = asyncio.Lock()
-                self.request_buffer = defaultdict(deque)
-                self.add_startup_event(self._dynamic_batch_processor())
-
             self._async_setup()
 
         # overwrite name
         self.name = f"{name}/{self.__class__.__name__}" if name else self.__class__.__name__
 
-    async def _dynamic_batch_processor(self):
+    async def enqueue_request(self, request: Any, service_type: Optional[Enum] = None) -> Any:
+        """Queue ``request`` for the next dynamic batch of ``service_type`` and wait for its result."""
+        if not self.dynamic_batching:
+            raise RuntimeError(f"Dynamic batching is not enabled for {self.name}")
+        service_type = service_type or self.service_type
+        queue = self.batch_queues.get(service_type)
+        if queue is None:
+            queue = self.batch_queues[service_type] = asyncio.Queue(maxsize=self.dynamic_batching_max_queue_size)
+            self._batch_workers[service_type] = asyncio.create_task(self._dynamic_batch_processor(service_type))
+
+        response = asyncio.get_running_loop().create_future()
+        try:
+            queue.put_nowait({"request": request, "response": response, "enqueued_at": time.perf_counter()})
+        except asyncio.QueueFull:
+            raise HTTPException(status_code=503, detail="Dynamic batching queue is full, retry later")
+        return await response
+
+    async def _next_batch(self, queue: asyncio.Queue) -> list[dict]:
+        """Wait for a request, then collect more until the batch is full or the oldest one's deadline passes."""
+        batch = [await queue.get()]
+        deadline = batch[0]["enqueued_at"] + self.dynamic_batching_timeout
+        while len(batch) < self.dynamic_batching_max_batch_size:
+            if not queue.empty():
+                batch.append(queue.get_nowait())
+                continue
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _dynamic_batch_processor(self, service_type: Enum):
         if logflag:
-            logger.info("dynamic batch processor looping...")
+            logger.info(f"dynamic batch processor for {service_type} looping...")
+        queue = self.batch_queues[service_type]
+        labels = (self.name, getattr(service_type, "name", str(service_type)))
         while True:
-            await asyncio.sleep(self.dynamic_batching_timeout)
-            runtime_batch: dict[Enum, list[dict]] = {}  # {ServiceType.Embedding: [{"request": xx, "response": yy}, {}]}
-
-            async with self.buffer_lock:
-                # prepare the runtime batch, access to buffer is locked
-                if self.request_buffer:
-                    for service_type, request_lst in self.request_buffer.items():
-                        batch = []
-                        # grab min(MAX_BATCH_SIZE, REQUEST_SIZE) requests from buffer
-                        for _ in range(min(self.dynamic_batching_max_batch_size, len(request_lst))):
-                            batch.append(request_lst.popleft())
-
-                        runtime_batch[service_type] = batch
-
-            # Run batched inference on the batch and set results
-            for service_type, batch in runtime_batch.items():
-                if not batch:
-                    continue
+            batch = await self._next_batch(queue)
+            # requests whose caller went away no longer need an answer
+            batch = [req for req in batch if not req["response"].done()]
+            if not batch:
+                continue
+
+            started = time.perf_counter()
+            batch_size_histogram.labels(*labels).observe(len(batch))
+            for req in batch:
+                batch_queue_wait_histogram.labels(*labels).observe(started - req["enqueued_at"])
+
+            try:
                 results = await self.dynamic_batching_infer(service_type, batch)
+                if len(results) != len(batch):
+                    raise RuntimeError(f"Dynamic batching returned {len(results)} results for {len(batch)} requests")
+            except Exception as e:
+                logger.error(f"Dynamic batching inference failed: {e}")
+                results = [e] * len(batch)
 
-                for req, result in zip(batch, results):
+            for req, result in zip(batch, results):
+                if req["response"].done():
+                    continue
+                if isinstance(result, Exception):
+                    req["response"].set_exception(result)
+                else:
                     req["response"].set_result(result)
 
     async def dynamic_batching_infer(self, service_type: Enum, batch: list[dict]):
-        """Need to implement."""
-        raise NotImplementedError("Unimplemented dynamic batching inference!")
+        """Run one batch; ``batch`` holds ``{"request": ...}`` dicts and one result (or exception) is returned per item.
+
+        Override this method, or set a handler with ``register_batch_infer``.
+        """
+        if self._batch_infer is None:
+            raise NotImplementedError("Unimplemented dynamic batching inference!")
+        return await self._batch_infer(service_type, batch)
 
     def _validate_env(self):
         """Check whether to use the microservice locally."""
@@ -156,8 +224,9 @@ def register_microservice(
     provider_endpoint: Optional[str] = None,
     methods: List[str] = ["POST"],
     dynamic_batching: bool = False,
-    dynamic_batching_timeout: int = 1,
+    dynamic_batching_timeout: float = 0.01,
     dynamic_batching_max_batch_size: int = 32,
+    dynamic_batching_max_queue_size: int = 1024,
 ):
     def decorator(func):
         if name not in opea_microservices:
@@ -178,6 +247,7 @@ def register_microservice(
                 dynamic_batching=dynamic_batching,
                 dynamic_batching_timeout=dynamic_batching_timeout,
                 dynamic_batching_max_batch_size=dynamic_batching_max_batch_size,
+                dynamic_batching_max_queue_size=dynamic_batching_max_queue_size,
             )
             opea_microservices[name] = micro_service
         opea_microservices[name].app.router.add_api_route(endpoint, func, methods=methods)
@@ -185,3 +255,16 @@ def register_microservice(
         return func
 
     return decorator
+
+
+def register_batch_infer(name: str):
+    """Use the decorated ``async func(service_type, batch)`` as the dynamic batching handler of microservice ``name``.
+
+    The microservice must already be registered with ``dynamic_batching=True``.
+    """
+
+    def decorator(func):
+        opea_microservices[name]._batch_infer = func
+        return func
+
+    return decorator
@@ -3,18 +3,18 @@
 
 import asyncio
 import contextlib
-import copy
-import json
+import functools
 import os
 import re
 import threading
 import time
-from typing import Dict, List
+from collections import deque
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
 
 import aiohttp
-import requests
 from fastapi.responses import StreamingResponse
-from prometheus_client import Gauge, Histogram
+from prometheus_client import Counter, Gauge, Histogram
 from pydantic import BaseModel
 
 from ..proto.docarray import LLMParams
@@ -27,6 +27,16 @@ logger = CustomLogger("comps-core-orchestrator")
 LOGFLAG = os.getenv("LOGFLAG", False)
 ENABLE_OPEA_TELEMETRY = bool(os.environ.get("TELEMETRY_ENDPOINT"))
 
+# Upstream connection pool settings shared by all requests of one orchestrator
+ORCHESTRATOR_REQUEST_TIMEOUT = float(os.getenv("ORCHESTRATOR_REQUEST_TIMEOUT", 1000))
+ORCHESTRATOR_MAX_CONNECTIONS = int(os.getenv("ORCHESTRATOR_MAX_CONNECTIONS", 100))
+ORCHESTRATOR_MAX_CONNECTIONS_PER_HOST = int(os.getenv("ORCHESTRATOR_MAX_CONNECTIONS_PER_HOST", 0))
+ORCHESTRATOR_KEEPALIVE_TIMEOUT = float(os.getenv("ORCHESTRATOR_KEEPALIVE_TIMEOUT", 60))
+ORCHESTRATOR_DNS_CACHE_TTL = int(os.getenv("ORCHESTRATOR_DNS_CACHE_TTL", 300))
+ORCHESTRATOR_HTTP2 = os.getenv("ORCHESTRATOR_HTTP2", "false").lower() in ("true", "1", "yes")
+# microservices are reached directly; set to honour HTTP_PROXY/HTTPS_PROXY/NO_PROXY for them
+ORCHESTRATOR_TRUST_ENV = os.getenv("ORCHESTRATOR_TRUST_ENV", "false").lower() in ("true", "1", "yes")
+
 
 class OrchestratorMetrics:
     # Need an static class-level ID for metric prefix because:
@@ -42,6 +52,28 @@ class OrchestratorMetrics:
 
         self.request_pending = Gauge(f"{self._prefix}_request_pending", "Count of currently pending requests (gauge)")
 
+        # Upstream connection pool metrics, labelled by downstream host:port
+        self.upstream_inflight = Gauge(
+            f"{self._prefix}_upstream_requests_inflight",
+            "Count of requests in flight to downstream services (gauge)",
+            ["upstream"],
+        )
+        self.upstream_connections_created = Counter(
+            f"{self._prefix}_upstream_connections_created",
+            "Count of new connections opened to downstream services",
+            ["upstream"],
+        )
+        self.upstream_connections_reused = Counter(
+            f"{self._prefix}_upstream_connections_reused",
+            "Count of requests served over a kept-alive connection",
+            ["upstream"],
+        )
+        self.upstream_wait_time = Histogram(
+            f"{self._prefix}_upstream_connection_wait",
+            "Time spent waiting for a free connection to a downstream service (histogram)",
+            ["upstream"],
+        )
+
         # locking for latency metric creation / method change
         self._lock = threading.Lock()
 
@@ -95,23 +127,277 @@ class OrchestratorMetrics:
         else:
             self.request_pending.dec()
 
+    def upstream_update(self, upstream: str, increase: bool) -> None:
+        if increase:
+            self.upstream_inflight.labels(upstream).inc()
+        else:
+            self.upstream_inflight.labels(upstream).dec()
+
+
+def _upstream_label(url) -> str:
+    parts = urlsplit(str(url))
+    return parts.netloc or str(url)
+
+
+@functools.lru_cache(maxsize=256)
+def _compile_pattern(pattern: str) -> re.Pattern:
+    return re.compile(pattern)
+
+
+class UpstreamSessionManager:
+    """Own the HTTP clients an orchestrator uses to reach its downstream services.
+
+    One pooled client is kept per event loop and reused across requests, so TCP
+    connections, keep-alive state and DNS lookups survive between requests to the
+    same embedding, retriever or reranker. Per-service connection limits are
+    enforced with semaphores on top of the pool-wide limits of the connector.
+
+    With ``http2=True`` the non-streaming path uses an ``httpx`` client with
+    HTTP/2 enabled instead of aiohttp (requires ``httpx[http2]``).
+
+    Proxy environment variables are ignored unless ``trust_env`` is set, so
+    calls between microservices never go through ``HTTP_PROXY``.
+    """
+
+    def __init__(
+        self,
+        metrics: OrchestratorMetrics,
+        timeout: float = ORCHESTRATOR_REQUEST_TIMEOUT,
+        max_connections: int = ORCHESTRATOR_MAX_CONNECTIONS,
+        max_connections_per_host: int = ORCHESTRATOR_MAX_CONNECTIONS_PER_HOST,
+        keepalive_timeout: float = ORCHESTRATOR_KEEPALIVE_TIMEOUT,
+        dns_cache_ttl: int = ORCHESTRATOR_DNS_CACHE_TTL,
+        http2: bool = ORCHESTRATOR_HTTP2,
+        trust_env: bool = ORCHESTRATOR_TRUST_ENV,
+    ) -> None:
+        self.metrics = metrics
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.max_connections_per_host = max_connections_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_cache_ttl = dns_cache_ttl
+        self.http2 = http2
+        self.trust_env = trust_env
+        self.service_limits = {}  # service name -> max concurrent requests
+
+        self._loop = None
+        self._client = None
+        self._semaphores = {}
+
+    def set_limit(self, service_name: str, max_connections: Optional[int]) -> None:
+        if max_connections:
+            self.service_limits[service_name] = max_connections
+        else:
+            self.service_limits.pop(service_name, None)
+        self._semaphores.pop(service_name, None)
+
+    def _trace_config(self) -> aiohttp.TraceConfig:
+        metrics = self.metrics
+        trace_config = aiohttp.TraceConfig()
+
+        async def on_request_start(session, ctx, params):
+            ctx.upstream = _upstream_label(params.url)
+            ctx.queued_at = time.perf_counter()
+
+        async def on_connection_queued_end(session, ctx, params):
+            metrics.upstream_wait_time.labels(ctx.upstream).observe(time.perf_counter() - ctx.queued_at)
+
+        async def on_connection_create_end(session, ctx, params):
+            metrics.upstream_connections_created.labels(ctx.upstream).inc()
+
+        async def on_connection_reuseconn(session, ctx, params):
+            metrics.upstream_connections_reused.labels(ctx.upstream).inc()
+
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_connection_queued_end.append(on_connection_queued_end)
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+        return trace_config
+
+    def _create_client(self):
+        if self.http2:
+            try:
+                import httpx
+            except ImportError as e:
+                raise RuntimeError("ORCHESTRATOR_HTTP2 requires 'httpx[http2]' to be installed") from e
+            return httpx.AsyncClient(
+                http2=True,
+                trust_env=self.trust_env,
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections or None,
+                    max_keepalive_connections=self.max_connections or None,
+                    keepalive_expiry=self.keepalive_timeout,
+                ),
+            )
+        connector = aiohttp.TCPConnector(
+            limit=self.max_connections,
+            limit_per_host=self.max_connections_per_host,
+            keepalive_timeout=self.keepalive_timeout,
+            ttl_dns_cache=self.dns_cache_ttl,
+        )
+        return aiohttp.ClientSession(
+            connector=connector,
+            trust_env=self.trust_env,
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            trace_configs=[self._trace_config()],
+        )
+
+    def _client_closed(self) -> bool:
+        if self._client is None:
+            return True
+        return self._client.is_closed if self.http2 else self._client.closed
+
+    def get_client(self):
+        """Return the pooled async client for the running event loop, creating it on first use."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._client_closed():
+            # a client is bound to the loop it was created on
+            if self._loop is not loop and not self._client_closed():
+                self._close_on_loop(self._client, self._loop)
+            self._loop = loop
+            self._client = self._create_client()
+            self._semaphores = {}
+        return self._client
+
+    def _semaphore(self, service_name: str) -> Optional[asyncio.Semaphore]:
+        limit = self.service_limits.get(service_name)
+        if not limit:
+            return None
+        if service_name not in self._semaphores:
+            self._semaphores[service_name] = asyncio.Semaphore(limit)
+        return self._semaphores[service_name]
+
+    async def post(self, service_name: str, url: str, payload: Dict):
+        """POST ``payload`` as JSON; return ``(content_type, data)``.
+
+        ``data`` is the raw body for ``audio/wav`` responses and the decoded JSON
+        otherwise. The body is read in full so the connection goes back to the pool.
+        """
+        client = self.get_client()
+        semaphore = self._semaphore(service_name)
+        upstream = _upstream_label(url)
+        if semaphore:
+            await semaphore.acquire()
+        self.metrics.upstream_update(upstream, True)
+        try:
+            if self.http2:
+                response = await client.post(url, json=payload)
+                content_type = response.headers.get("content-type", "").split(";")[0].strip()
+                return content_type, response.content if content_type == "audio/wav" else response.json()
+            async with client.post(url, json=payload) as response:
+                if response.content_type == "audio/wav":
+                    return response.content_type, await response.read()
+                return response.content_type, await response.json()
+        finally:
+            self.metrics.upstream_update(upstream, False)
+            if semaphore:
+                semaphore.release()
+
+    async def open_stream(self, service_name: str, url: str, payload: Dict) -> "UpstreamStream":
+        """POST ``payload`` as JSON and return the response once its headers arrive.
+
+        The body is consumed through the returned stream, which holds the service's
+        connection slot until it is closed.
+        """
+        client = self.get_client()
+        semaphore = self._semaphore(service_name)
+        upstream = _upstream_label(url)
+        if semaphore:
+            await semaphore.acquire()
+        self.metrics.upstream_update(upstream, True)
+
+        def release():
+            self.metrics.upstream_update(upstream, False)
+            if semaphore:
+                semaphore.release()
+
+        try:
+            if self.http2:
+                response = await client.send(client.build_request("POST", url, json=payload), stream=True)
+            else:
+                response = await client.post(url, json=payload)
+        except BaseException:
+            release()
+            raise
+        return UpstreamStream(response, self.http2, release)
+
+    def _close_on_loop(self, client, loop) -> None:
+        """Close a client left behind on another event loop, from that loop."""
+        if loop.is_closed():
+            # the loop no longer holds its transports, so garbage collection closes the sockets
+            return
+        if loop.is_running():  # in another thread
+            asyncio.run_coroutine_threadsafe(self._close_client(client), loop)
+            return
+        # an idle loop can't run here while this thread's loop is running
+        closer = threading.Thread(target=loop.run_until_complete, args=(self._close_client(client),))
+        closer.start()
+        closer.join()
+
+    async def _close_client(self, client) -> None:
+        if self.http2:
+            await client.aclose()
+        else:
+            await client.close()
+
+    async def close(self) -> None:
+        client, self._client, self._loop = self._client, None, None
+        if client is not None:
+            await self._close_client(client)
+
+
+class UpstreamStream:
+    """A streamed response from a downstream service; iterate it for raw chunks and always close it."""
+
+    def __init__(self, response, http2: bool, on_close) -> None:
+        self.response = response
+        self.http2 = http2
+        self.ok = response.is_success if http2 else response.ok
+        self._on_close = on_close
+        self._closed = False
+
+    async def __aiter__(self):
+        chunks = self.response.aiter_raw() if self.http2 else self.response.content.iter_any()
+        async for chunk in chunks:
+            yield chunk
+
+    async def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            if self.http2:
+                await self.response.aclose()
+            else:
+                self.response.release()
+        finally:
+            self._on_close()
+
 
 class ServiceOrchestrator(DAG):
     """Manage 1 or N micro services in a DAG through Python API."""
 
     def __init__(self) -> None:
         self.metrics = OrchestratorMetrics()
+        self.sessions = UpstreamSessionManager(self.metrics)
         self.services = {}  # all services, id -> service
         super().__init__()
 
-    def add(self, service):
+    def add(self, service, max_connections: Optional[int] = None):
+        """Add a service; ``max_connections`` caps concurrent requests the orchestrator sends to it."""
         if service.name not in self.services:
             self.services[service.name] = service
             self.add_node_if_not_exists(service.name)
+            self.sessions.set_limit(service.name, max_connections)
         else:
             raise Exception(f"Service {service.name} already exists!")
         return self
 
+    async def close(self):
+        """Close the pooled upstream connections; register it with ``HTTPService.add_shutdown_event``."""
+        await self.sessions.close()
+
     def flow_to(self, from_service, to_service):
         try:
             self.add_edge(from_service.name, to_service.name)
@@ -126,73 +412,80 @@ class ServiceOrchestrator(DAG):
         self.metrics.pending_update(True)
 
         result_dict = {}
-        runtime_graph = DAG()
-        runtime_graph.graph = copy.deepcopy(self.graph)
+        # the plan is compiled once per graph; each run only copies the adjacency sets and in-degrees
+        plan = self.compile()
+        runtime_graph = plan.new_graph()
+        waiting_on = plan.new_in_degree()
         if LOGFLAG:
             logger.info(initial_inputs)
 
-        timeout = aiohttp.ClientTimeout(total=1000)
-        async with aiohttp.ClientSession(trust_env=True, timeout=timeout) as session:
-            pending = {
-                asyncio.create_task(
-                    self.execute(session, req_start, node, initial_inputs, runtime_graph, llm_parameters, **kwargs)
-                )
-                for node in self.ind_nodes()
-            }
-            ind_nodes = self.ind_nodes()
-
-            while pending:
-                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
-                for done_task in done:
-                    response, node = await done_task
-                    result_dict[node] = response
-
-                    # traverse the current node's downstream nodes and execute if all one's predecessors are finished
-                    downstreams = runtime_graph.downstream(node)
-
-                    # remove all the black nodes that are skipped to be forwarded to
-                    if not isinstance(response, StreamingResponse) and "downstream_black_list" in response:
-                        for black_node in response["downstream_black_list"]:
-                            for downstream in reversed(downstreams):
-                                try:
-                                    if re.findall(black_node, downstream):
-                                        if LOGFLAG:
-                                            logger.info(f"skip forwardding to {downstream}...")
-                                        runtime_graph.delete_edge(node, downstream)
-                                        downstreams.remove(downstream)
-                                except re.error as e:
-                                    logger.error("Pattern invalid! Operation cancelled.")
-                            if len(downstreams) == 0 and llm_parameters.stream:
-                                # turn the response to a StreamingResponse
-                                # to make the response uniform to UI
-                                def fake_stream(text):
-                                    yield "data: b'" + text + "'\n\n"
-                                    yield "data: [DONE]\n\n"
-
-                                result_dict[node] = StreamingResponse(
-                                    fake_stream(response["text"]), media_type="text/event-stream"
-                                )
+        session = self.sessions
+        pending = {
+            asyncio.create_task(
+                self.execute(session, req_start, node, initial_inputs, runtime_graph, llm_parameters, **kwargs)
+            )
+            for node in plan.ind_nodes
+        }
+
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for done_task in done:
+                response, node = await done_task
+                result_dict[node] = response
+
+                # traverse the current node's downstream nodes and execute if all one's predecessors are finished
+                downstreams = runtime_graph.downstream(node)
+
+                # remove all the black nodes that are skipped to be forwarded to
+                if not isinstance(response, StreamingResponse) and "downstream_black_list" in response:
+                    for black_node in response["downstream_black_list"]:
+                        for downstream in reversed(downstreams):
+                            try:
+                                if _compile_pattern(black_node).search(downstream):
+                                    if LOGFLAG:
+                                        logger.info(f"skip forwardding to {downstream}...")
+                                    runtime_graph.delete_edge(node, downstream)
+                                    downstreams.remove(downstream)
+                            except re.error as e:
+                                logger.error("Pattern invalid! Operation cancelled.")
+                        if len(downstreams) == 0 and llm_parameters.stream:
+                            # turn the response to a StreamingResponse
+                            # to make the response uniform to UI
+                            def fake_stream(text):
+                                yield "data: b'" + text + "'\n\n"
+                                yield "data: [DONE]\n\n"
+
+                            result_dict[node] = StreamingResponse(
+                                fake_stream(response["text"]), media_type="text/event-stream"
+                            )
 
-                    for d_node in downstreams:
-                        if all(i in result_dict for i in runtime_graph.predecessors(d_node)):
-                            inputs = self.process_outputs(runtime_graph.predecessors(d_node), result_dict)
-                            pending.add(
-                                asyncio.create_task(
-                                    self.execute(
-                                        session, req_start, d_node, inputs, runtime_graph, llm_parameters, **kwargs
-                                    )
+                # a skipped edge no longer holds its target back, so count down every original successor
+                for successor in plan.successors[node]:
+                    waiting_on[successor] -= 1
+
+                for d_node in downstreams:
+                    if not waiting_on[d_node]:
+                        prev_nodes = [i for i in plan.predecessors[d_node] if d_node in runtime_graph.graph[i]]
+                        inputs = self.process_outputs(prev_nodes, result_dict)
+                        pending.add(
+                            asyncio.create_task(
+                                self.execute(
+                                    session, req_start, d_node, inputs, runtime_graph, llm_parameters, **kwargs
                                 )
                             )
-        nodes_to_keep = []
-        for i in ind_nodes:
-            nodes_to_keep.append(i)
-            nodes_to_keep.extend(runtime_graph.all_downstreams(i))
-
-        all_nodes = list(runtime_graph.graph.keys())
-
-        for node in all_nodes:
-            if node not in nodes_to_keep:
-                runtime_graph.delete_node_if_exists(node)
+                        )
+
+        # drop the nodes that are no longer reachable once skipped edges are removed
+        reachable = set(plan.ind_nodes)
+        stack = list(plan.ind_nodes)
+        while stack:
+            for d_node in runtime_graph.graph[stack.pop()]:
+                if d_node not in reachable:
+                    reachable.add(d_node)
+                    stack.append(d_node)
+        if len(reachable) < len(runtime_graph.graph):
+            for node in [node for node in runtime_graph.graph if node not in reachable]:
+                del runtime_graph.graph[node]
 
         if not llm_parameters.stream:
             self.metrics.pending_update(False)
@@ -207,9 +500,10 @@ class ServiceOrchestrator(DAG):
             all_outputs.update(result_dict[prev_node])
         return all_outputs
 
-    def wrap_iterable(self, iterable, is_first=True):
+    async def wrap_iterable(self, iterable, is_first=True):
 
         with tracer.start_as_current_span("llm_generate_stream") if ENABLE_OPEA_TELEMETRY else contextlib.nullcontext():
+            iterator = iterable.__aiter__()
             while True:
                 with (
                     tracer.start_as_current_span("llm_generate_stream_first_token")
@@ -217,19 +511,17 @@ class ServiceOrchestrator(DAG):
                     else contextlib.nullcontext()
                 ):  #  else tracer.start_as_current_span(f"llm_generate_stream_next_token")
                     try:
-                        token = next(iterable)
-                        yield token
-                        is_first = False
-                    except StopIteration:
+                        token = await iterator.__anext__()
+                    except StopAsyncIteration:
                         # Exiting the iterable loop cleanly
                         break
-                    except Exception as e:
-                        raise e
+                    yield token
+                    is_first = False
 
     @opea_telemetry
     async def execute(
         self,
-        session: aiohttp.client.ClientSession,
+        session: UpstreamSessionManager,
         req_start: float,
         cur_node: str,
         inputs: Dict,
@@ -251,7 +543,6 @@ class ServiceOrchestrator(DAG):
         inputs = self.align_inputs(inputs, cur_node, runtime_graph, llm_parameters_dict, **kwargs)
 
         if is_llm_vlm and llm_parameters.stream:
-            # Still leave to sync requests.post for StreamingResponse
             if LOGFLAG:
                 logger.info(inputs)
             with (
@@ -259,14 +550,7 @@ class ServiceOrchestrator(DAG):
                 if ENABLE_OPEA_TELEMETRY
                 else contextlib.nullcontext()
             ):
-                response = requests.post(
-                    url=endpoint,
-                    data=json.dumps(inputs),
-                    headers={"Content-type": "application/json"},
-                    proxies={"http": None},
-                    stream=True,
-                    timeout=1000,
-                )
+                response = await session.open_stream(cur_node, endpoint, inputs)
             downstream = runtime_graph.downstream(cur_node)
             if downstream:
                 assert len(downstream) == 1, "Not supported multiple stream downstreams yet!"
@@ -274,42 +558,59 @@ class ServiceOrchestrator(DAG):
                 hitted_ends = [".", "?", "!", "。", "，", "！"]
                 downstream_endpoint = self.services[downstream[0]].endpoint_path
 
-            def generate():
+            async def post_sentence(text):
+                _, res_json = await session.post(cur_node, downstream_endpoint, {"text": text})
+                if "text" in res_json:
+                    return res_json["text"]
+                raise Exception("Other response types not supported yet!")
+
+            async def generate():
                 token_start = req_start
-                if response:
-                    # response.elapsed = time until first headers received
-                    buffered_chunk_str = ""
-                    is_first = True
-                    for chunk in self.wrap_iterable(response.iter_content(chunk_size=None)):
-                        if chunk:
-                            if downstream:
-                                chunk = chunk.decode("utf-8")
-                                buffered_chunk_str += self.extract_chunk_str(chunk)
-                                is_last = chunk.endswith("[DONE]\n\n")
-                                if (buffered_chunk_str and buffered_chunk_str[-1] in hitted_ends) or is_last:
-                                    res = requests.post(
-                                        url=downstream_endpoint,
-                                        data=json.dumps({"text": buffered_chunk_str}),
-                                        proxies={"http": None},
-                                    )
-                                    res_json = res.json()
-                                    if "text" in res_json:
-                                        res_txt = res_json["text"]
-                                    else:
-                                        raise Exception("Other response types not supported yet!")
-                                    buffered_chunk_str = ""  # clear
-                                    yield from self.token_generator(
-                                        res_txt, token_start, is_first=is_first, is_last=is_last
-                                    )
-                                    token_start = time.time()
+                # sentences already sent downstream, in order; each is posted as soon as it is
+                # complete so downstream work overlaps further token generation
+                sentences = deque()
+                try:
+                    if response.ok:
+                        buffered_chunk_str = ""
+                        is_first = True
+                        async for chunk in self.wrap_iterable(response):
+                            if chunk:
+                                if downstream:
+                                    chunk = chunk.decode("utf-8")
+                                    buffered_chunk_str += self.extract_chunk_str(chunk)
+                                    is_last = chunk.endswith("[DONE]\n\n")
+                                    if (buffered_chunk_str and buffered_chunk_str[-1] in hitted_ends) or is_last:
+                                        sentences.append((asyncio.create_task(post_sentence(buffered_chunk_str)), is_last))
+                                        buffered_chunk_str = ""  # clear
+                                    while sentences and sentences[0][0].done():
+                                        task, sentence_is_last = sentences.popleft()
+                                        for token in self.token_generator(
+                                            task.result(), token_start, is_first=is_first, is_last=sentence_is_last
+                                        ):
+                                            yield token
+                                        token_start = time.time()
+                                        is_first = False
+                                else:
+                                    token_start = self.metrics.token_update(token_start, is_first)
                                     is_first = False
-                            else:
-                                token_start = self.metrics.token_update(token_start, is_first)
-                                is_first = False
-                                yield chunk
-
-                    self.metrics.request_update(req_start)
-                    self.metrics.pending_update(False)
+                                    yield chunk
+
+                        while sentences:
+                            task, sentence_is_last = sentences.popleft()
+                            res_txt = await task
+                            for token in self.token_generator(
+                                res_txt, token_start, is_first=is_first, is_last=sentence_is_last
+                            ):
+                                yield token
+                            token_start = time.time()
+                            is_first = False
+
+                        self.metrics.request_update(req_start)
+                        self.metrics.pending_update(False)
+                finally:
+                    for task, _ in sentences:
+                        task.cancel()
+                    await response.close()
 
             return (
                 StreamingResponse(self.align_generator(generate(), **kwargs), media_type="text/event-stream"),
@@ -330,16 +631,10 @@ class ServiceOrchestrator(DAG):
                 if ENABLE_OPEA_TELEMETRY
                 else contextlib.nullcontext()
             ):
-                response = await session.post(endpoint, json=input_data)
+                _, data = await session.post(cur_node, endpoint, input_data)
 
-            if response.content_type == "audio/wav":
-                audio_data = await response.read()
-                data = self.align_outputs(audio_data, cur_node, inputs, runtime_graph, llm_parameters_dict, **kwargs)
-            else:
-                # Parse as JSON
-                data = await response.json()
-                # post process
-                data = self.align_outputs(data, cur_node, inputs, runtime_graph, llm_parameters_dict, **kwargs)
+            # post process; audio/wav responses are passed on as raw bytes, everything else as parsed JSON
+            data = self.align_outputs(data, cur_node, inputs, runtime_graph, llm_parameters_dict, **kwargs)
 
             return data, cur_node
 
@@ -352,7 +647,11 @@ class ServiceOrchestrator(DAG):
         return data
 
     def align_generator(self, gen, *args, **kwargs):
-        """Override this method in megaservice definition."""
+        """Override this method in megaservice definition.
+
+        ``gen`` is an async generator of SSE chunks; overrides should return an
+        async iterable as well.
+        """
         return gen
 
     def get_all_final_outputs(self, result_dict, runtime_graph):
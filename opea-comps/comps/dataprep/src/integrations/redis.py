@@ -4,8 +4,11 @@
 
 
 import asyncio
+import datetime
+import hashlib
 import json
 import os
+import uuid
 from pathlib import Path
 from typing import List, Optional, Union
 
@@ -13,6 +16,7 @@ import redis
 from fastapi import Body, File, Form, HTTPException, UploadFile
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_community.embeddings import HuggingFaceBgeEmbeddings, HuggingFaceInferenceAPIEmbeddings
+from langchain_community.utilities.redis import _array_to_buffer
 from langchain_community.vectorstores import Redis
 from langchain_text_splitters import HTMLHeaderTextSplitter
 from redis import asyncio as aioredis
@@ -22,16 +26,18 @@ from redis.commands.search.indexDefinition import IndexDefinition, IndexType
 from comps import CustomLogger, DocPath, OpeaComponent, OpeaComponentRegistry, ServiceType
 from comps.dataprep.src.utils import (
     create_upload_folder,
-    document_loader,
     encode_filename,
     format_search_results,
     get_separators,
     get_tables_result,
+    iter_document,
     parse_html_new,
     remove_folder_with_ignore,
     save_content_to_local_disk,
 )
 
+from .utils.ingest_pipeline import IngestPipeline
+
 logger = CustomLogger("redis_dataprep")
 logflag = os.getenv("LOGFLAG", False)
 upload_folder = "./uploaded_files/"
@@ -50,6 +56,13 @@ KEY_INDEX_NAME = os.getenv("KEY_INDEX_NAME", "file-keys")
 TIMEOUT_SECONDS = int(os.getenv("TIMEOUT_SECONDS", 600))
 SEARCH_BATCH_SIZE = int(os.getenv("SEARCH_BATCH_SIZE", 10))
 
+# Ingestion pipeline: chunks per embedding/write batch and workers per stage
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", 32))
+INGEST_PARSE_CONCURRENCY = int(os.getenv("INGEST_PARSE_CONCURRENCY", 4))
+INGEST_EMBED_CONCURRENCY = int(os.getenv("INGEST_EMBED_CONCURRENCY", 4))
+INGEST_WRITE_CONCURRENCY = int(os.getenv("INGEST_WRITE_CONCURRENCY", 2))
+INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", 16))
+
 # Redis Connection Information
 REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
 REDIS_PORT = int(os.getenv("REDIS_PORT", 6379))
@@ -100,6 +113,8 @@ def format_redis_conn_from_env():
 
 REDIS_URL = format_redis_conn_from_env()
 redis_pool = redis.ConnectionPool.from_url(REDIS_URL)
+# Re-uploads of an ingested file only embed its changed chunks; when false they are rejected
+INGEST_INCREMENTAL = get_boolean_env_var("INGEST_INCREMENTAL", True)
 
 
 async def check_index_existance(client):
@@ -131,11 +146,11 @@ async def create_index(client, index_name: str = KEY_INDEX_NAME):
     return True
 
 
-async def store_by_id(client, key, value):
+async def store_by_id(client, key, value, **fields):
     if logflag:
         logger.info(f"[ store by id ] storing ids of {key}")
     try:
-        await client.add_document(doc_id="file:" + key, file_name=key, key_ids=value)
+        await client.add_document(doc_id="file:" + key, replace=True, file_name=key, key_ids=value, **fields)
         if logflag:
             logger.info(f"[ store by id ] store document success. id: file:{key}")
     except Exception as e:
@@ -145,6 +160,21 @@ async def store_by_id(client, key, value):
     return True
 
 
+async def get_file_record(client, doc_id):
+    """The file-keys entry of ``doc_id``, or None if the file has not been ingested."""
+    try:
+        record = await client.load_document(doc_id)
+    except Exception as e:
+        if logflag:
+            logger.info(f"[ get file record ] fail to load {doc_id}: {e}")
+        return None
+    return record if getattr(record, "key_ids", None) is not None else None
+
+
+def chunk_hash(text) -> str:
+    return hashlib.sha256(str(text).encode("utf-8")).hexdigest()
+
+
 def search_by_id(client, doc_id):
     if logflag:
         logger.info(f"[ search by id ] searching docs of {doc_id}")
@@ -185,55 +215,60 @@ def delete_by_id(client, id):
     return True
 
 
-async def ingest_chunks_to_redis(file_name: str, chunks: List, embedder):
-    if logflag:
-        logger.info(f"[ redis ingest chunks ] file name: {file_name}")
+class RedisVectorWriter:
+    """Writes embedded chunks into INDEX_NAME with pipelined HSETs.
 
-    # Batch size
-    batch_size = 32
-    num_chunks = len(chunks)
+    Hashes use the key prefix and field layout of langchain's Redis vector store,
+    so retrievers reading the index through langchain see the same documents.
+    """
 
-    file_ids = []
-    for i in range(0, num_chunks, batch_size):
-        if logflag:
-            logger.info(f"[ redis ingest chunks ] Current batch: {i}")
-        batch_chunks = chunks[i : i + batch_size]
-        batch_texts = batch_chunks
-
-        _, keys = await asyncio.to_thread(
-            Redis.from_texts_return_keys,
-            texts=batch_texts,
-            embedding=embedder,
-            index_name=INDEX_NAME,
-            redis_url=REDIS_URL,
-        )
+    def __init__(self, embedder):
+        self.embedder = embedder
+        self.vectorstore = None
+        self.client = None
+        self._lock = asyncio.Lock()
+
+    async def _initialize(self, dim: int) -> None:
+        async with self._lock:
+            if self.vectorstore is not None:
+                return
+            vectorstore = await asyncio.to_thread(
+                Redis, redis_url=REDIS_URL, index_name=INDEX_NAME, embedding=self.embedder
+            )
+            await asyncio.to_thread(vectorstore._create_index_if_not_exist, dim=dim)
+            self.client = await aioredis.from_url(REDIS_URL)
+            self.vectorstore = vectorstore
+
+    async def write(self, texts: List[str], vectors: List[List[float]]) -> List[str]:
+        if self.vectorstore is None:
+            await self._initialize(len(vectors[0]))
+        schema = self.vectorstore._schema
+        keys = [f"{self.vectorstore.key_prefix}:{uuid.uuid4().hex}" for _ in texts]
+        async with self.client.pipeline(transaction=False) as pipe:
+            for key, text, vector in zip(keys, texts, vectors):
+                pipe.hset(
+                    key,
+                    mapping={
+                        schema.content_key: text,
+                        schema.content_vector_key: _array_to_buffer(vector, schema.vector_dtype),
+                    },
+                )
+            await pipe.execute()
         if logflag:
             logger.info(f"[ redis ingest chunks ] keys: {keys}")
-        file_ids.extend(keys)
-        if logflag:
-            logger.info(f"[ redis ingest chunks ] Processed batch {i//batch_size + 1}/{(num_chunks-1)//batch_size + 1}")
+        return keys
 
-    # store file_ids into index file-keys
-    r = await aioredis.from_url(REDIS_URL)
-    client = r.ft(KEY_INDEX_NAME)
-    if not await check_index_existance(client):
-        await create_index(client)
 
-    try:
-        await store_by_id(client, key=file_name, value="#".join(file_ids))
-    except Exception as e:
-        if logflag:
-            logger.info(f"[ redis ingest chunks ] {e}. Fail to store chunks of file {file_name}.")
-        raise HTTPException(status_code=500, detail=f"Fail to store chunks of file {file_name}.")
-    return True
+async def load_document(doc_path: DocPath):
+    """Start parsing a document; returns an async iterator over its pages, slides or sheets."""
+    if logflag:
+        logger.info(f"[ redis ingest data ] Parsing document {doc_path.path}.")
+    return await iter_document(doc_path.path)
 
 
-async def ingest_data_to_redis(doc_path: DocPath, embedder):
-    """Ingest document to Redis."""
+async def split_document(doc_path: DocPath, content) -> List:
+    """Split the parts yielded by ``load_document`` into chunks, adding PDF tables when requested."""
     path = doc_path.path
-    if logflag:
-        logger.info(f"[ redis ingest data ] Parsing document {path}.")
-
     if path.endswith(".html"):
         headers_to_split_on = [
             ("h1", "Header 1"),
@@ -249,27 +284,145 @@ async def ingest_data_to_redis(doc_path: DocPath, embedder):
             separators=get_separators(),
         )
 
-    content = await document_loader(path)
-    if logflag:
-        logger.info("[ redis ingest data ] file content loaded")
-
     structured_types = [".xlsx", ".csv", ".json", "jsonl"]
     _, ext = os.path.splitext(path)
 
-    if ext in structured_types:
-        chunks = content
-    else:
-        chunks = await asyncio.to_thread(text_splitter.split_text, content)
+    # split each page, slide or sheet as soon as it is parsed
+    chunks = []
+    async for part in content:
+        if ext in structured_types or isinstance(part, list):
+            chunks.extend(part)
+        elif part:
+            chunks.extend(await asyncio.to_thread(text_splitter.split_text, part))
 
     ### Specially processing for the table content in PDFs
     if doc_path.process_table and path.endswith(".pdf"):
-        table_chunks = get_tables_result(path, doc_path.table_strategy)
+        table_chunks = await asyncio.to_thread(get_tables_result, path, doc_path.table_strategy)
         chunks = chunks + table_chunks
     if logflag:
         logger.info(f"[ redis ingest data ] Done preprocessing. Created {len(chunks)} chunks of the given file.")
+    return chunks
+
+
+async def ingest_documents_to_redis(
+    documents: List,
+    embedder,
+    parse=load_document,
+    chunk=split_document,
+    file_name=lambda doc_path: doc_path.path.split("/")[-1],
+) -> dict:
+    """Ingest documents through the pipelined parse/chunk/embed/write stages.
+
+    Every chunk is identified by its content hash. When a document was ingested
+    before, only chunks whose hash is not in its file-keys entry are embedded and
+    written, and keys of chunks that no longer occur are deleted afterwards. The
+    entry stores the chunk keys, their hashes and a manifest of what changed.
 
-    file_name = doc_path.path.split("/")[-1]
-    return await ingest_chunks_to_redis(file_name, chunks, embedder)
+    Returns:
+        dict: ``{"stages": per-stage statistics, "manifest": file name => manifest}``.
+    """
+    r = await aioredis.from_url(REDIS_URL)
+    client = r.ft(KEY_INDEX_NAME)
+    if not await check_index_existance(client):
+        await create_index(client)
+    writer = RedisVectorWriter(embedder)
+    plans = {}  # file name => chunk hashes, reused key per chunk (None when new) and stale keys
+    manifests = {}
+
+    async def plan_chunks(doc, content):
+        chunks = await chunk(doc, content)
+        name = file_name(doc)
+        hashes = [chunk_hash(text) for text in chunks]
+        previous, stale = {}, []
+        record = await get_file_record(client, "file:" + name)
+        if record is not None:
+            old_keys = record.key_ids.split("#") if record.key_ids else []
+            old_hashes = getattr(record, "chunk_hashes", None)
+            old_hashes = old_hashes.split("#") if old_hashes else []
+            if len(old_hashes) == len(old_keys):
+                for old_hash, old_key in zip(old_hashes, old_keys):
+                    previous.setdefault(old_hash, []).append(old_key)
+            else:
+                # ingested before chunk hashes were recorded
+                stale.extend(old_keys)
+        keys = [previous[h].pop(0) if previous.get(h) else None for h in hashes]
+        stale.extend(key for unused in previous.values() for key in unused)
+        plans[name] = {"hashes": hashes, "keys": keys, "stale": stale, "existed": record is not None}
+        return [text for text, key in zip(chunks, keys) if key is None]
+
+    async def embed(texts):
+        return await asyncio.to_thread(embedder.embed_documents, texts)
+
+    async def finish(doc, new_keys):
+        name = file_name(doc)
+        plan = plans.pop(name)
+        fresh = iter(new_keys)
+        keys = [key if key is not None else next(fresh) for key in plan["keys"]]
+        manifest = {
+            "ingested_at": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+            "chunks": len(keys),
+            "added": len(new_keys),
+            "unchanged": len(keys) - len(new_keys),
+            "removed": len(plan["stale"]),
+            "reingested": plan["existed"],
+        }
+        if not await store_by_id(
+            client,
+            key=name,
+            value="#".join(keys),
+            chunk_hashes="#".join(plan["hashes"]),
+            manifest=json.dumps(manifest),
+        ):
+            if logflag:
+                logger.info(f"[ redis ingest chunks ] Fail to store chunks of file {name}.")
+            # no file record points at the new chunks, so nothing could delete them later
+            if new_keys:
+                await r.delete(*new_keys)
+            raise HTTPException(status_code=500, detail=f"Fail to store chunks of file {name}.")
+        # stale chunks are dropped only after the entry points at their replacements
+        if plan["stale"]:
+            await r.delete(*plan["stale"])
+        manifests[name] = manifest
+        logger.info(f"[ redis ingest chunks ] {name}: {manifest}")
+
+    async def discard(keys):
+        await r.delete(*keys)
+
+    pipeline = IngestPipeline(
+        parse,
+        plan_chunks,
+        embed,
+        writer.write,
+        finish,
+        discard,
+        batch_size=INGEST_BATCH_SIZE,
+        parse_concurrency=INGEST_PARSE_CONCURRENCY,
+        embed_concurrency=INGEST_EMBED_CONCURRENCY,
+        write_concurrency=INGEST_WRITE_CONCURRENCY,
+        queue_size=INGEST_QUEUE_SIZE,
+    )
+    stages = await pipeline.run(documents)
+    return {"stages": stages, "manifest": manifests}
+
+
+async def ingest_chunks_to_redis(file_name: str, chunks: List, embedder):
+    if logflag:
+        logger.info(f"[ redis ingest chunks ] file name: {file_name}")
+
+    async def parse(name):
+        return chunks
+
+    async def chunk(name, content):
+        return content
+
+    await ingest_documents_to_redis([file_name], embedder, parse=parse, chunk=chunk, file_name=lambda name: name)
+    return True
+
+
+async def ingest_data_to_redis(doc_path: DocPath, embedder):
+    """Ingest document to Redis."""
+    await ingest_documents_to_redis([doc_path], embedder)
+    return True
 
 
 @OpeaComponentRegistry.register("OPEA_DATAPREP_REDIS")
@@ -386,15 +539,11 @@ class OpeaRedisDataprep(OpeaComponent):
                 if logflag:
                     logger.info(f"[ redis ingest ] processing file {doc_id}")
 
-                # check whether the file already exists
-                key_ids = None
-                try:
-                    key_ids = search_by_id(self.key_index_client, doc_id).key_ids
-                    if logflag:
-                        logger.info(f"[ redis ingest] File {file.filename} already exists.")
-                except Exception as e:
-                    logger.info(f"[ redis ingest] File {file.filename} does not exist.")
-                if key_ids:
+                # check whether the file already exists; if so it is updated incrementally
+                record = await get_file_record(self.key_index_client, doc_id)
+                if record is not None and logflag:
+                    logger.info(f"[ redis ingest] File {file.filename} already exists.")
+                if record is not None and not INGEST_INCREMENTAL:
                     raise HTTPException(
                         status_code=400,
                         detail=f"Uploaded file {file.filename} already exists. Please change file name.",
@@ -402,21 +551,22 @@ class OpeaRedisDataprep(OpeaComponent):
 
                 save_path = upload_folder + encode_file
                 await save_content_to_local_disk(save_path, file)
-                await ingest_data_to_redis(
+                uploaded_files.append(
                     DocPath(
                         path=save_path,
                         chunk_size=chunk_size,
                         chunk_overlap=chunk_overlap,
                         process_table=process_table,
                         table_strategy=table_strategy,
-                    ),
-                    self.embedder,
+                    )
                 )
-                uploaded_files.append(save_path)
-                if logflag:
-                    logger.info(f"[ redis ingest] Successfully saved file {save_path}")
 
-            result = {"status": 200, "message": "Data preparation succeeded"}
+            # parse, embed and write all files through one pipeline
+            ingested = await ingest_documents_to_redis(uploaded_files, self.embedder)
+            if logflag:
+                logger.info(f"[ redis ingest] Successfully saved files {[doc.path for doc in uploaded_files]}")
+
+            result = {"status": 200, "message": "Data preparation succeeded", "manifest": ingested["manifest"]}
             if logflag:
                 logger.info(result)
             return result
@@ -425,41 +575,50 @@ class OpeaRedisDataprep(OpeaComponent):
             link_list = json.loads(link_list)  # Parse JSON string to list
             if not isinstance(link_list, list):
                 raise HTTPException(status_code=400, detail=f"Link_list {link_list} should be a list.")
+            links = {}  # save path => link
             for link in link_list:
                 encoded_link = encode_filename(link)
                 doc_id = "file:" + encoded_link + ".txt"
                 if logflag:
                     logger.info(f"[ redis ingest] processing link {doc_id}")
 
-                # check whether the link file already exists
-                key_ids = None
-                try:
-                    key_ids = search_by_id(self.key_index_client, doc_id).key_ids
-                    if logflag:
-                        logger.info(f"[ redis ingest] Link {link} already exists.")
-                except Exception as e:
-                    logger.info(f"[ redis ingest] Link {link} does not exist. Keep storing.")
-                if key_ids:
+                # check whether the link file already exists; if so it is updated incrementally
+                record = await get_file_record(self.key_index_client, doc_id)
+                if record is not None and logflag:
+                    logger.info(f"[ redis ingest] Link {link} already exists.")
+                if record is not None and not INGEST_INCREMENTAL:
                     raise HTTPException(
                         status_code=400, detail=f"Uploaded link {link} already exists. Please change another link."
                     )
 
                 save_path = upload_folder + encoded_link + ".txt"
-                content = parse_html_new([link], chunk_size=chunk_size, chunk_overlap=chunk_overlap)
-                await save_content_to_local_disk(save_path, content)
-                await ingest_data_to_redis(
+                links[save_path] = link
+
+            async def fetch_link(doc_path: DocPath):
+                content = await asyncio.to_thread(
+                    parse_html_new, [links[doc_path.path]], chunk_size=chunk_size, chunk_overlap=chunk_overlap
+                )
+                await save_content_to_local_disk(doc_path.path, content)
+                return await load_document(doc_path)
+
+            # crawl, embed and write all links through one pipeline
+            ingested = await ingest_documents_to_redis(
+                [
                     DocPath(
                         path=save_path,
                         chunk_size=chunk_size,
                         chunk_overlap=chunk_overlap,
                         process_table=process_table,
                         table_strategy=table_strategy,
-                    ),
-                    self.embedder,
-                )
+                    )
+                    for save_path in links
+                ],
+                self.embedder,
+                parse=fetch_link,
+            )
             if logflag:
                 logger.info(f"[ redis ingest] Successfully saved link list {link_list}")
-            return {"status": 200, "message": "Data preparation succeeded"}
+            return {"status": 200, "message": "Data preparation succeeded", "manifest": ingested["manifest"]}
 
         raise HTTPException(status_code=400, detail="Must provide either a file or a string list.")
 
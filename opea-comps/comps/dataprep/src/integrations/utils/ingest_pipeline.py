@@ -0,0 +1,227 @@
+# Copyright (C) 2024 Intel Corporation
+# SPDX-License-Identifier: Apache-2.0
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Iterable, List, Optional
+
+from comps import CustomLogger
+
+logger = CustomLogger("ingest_pipeline")
+
+_DONE = object()
+
+STAGES = ("parse", "chunk", "embed", "write")
+
+
+class StageStats:
+    """Work done by one pipeline stage during a run."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.items = 0
+        self.texts = 0
+        self.busy = 0.0  # summed handler time over all workers
+        self.first_start = None
+        self.last_end = None
+
+    def record(self, start: float, end: float, texts: int = 0) -> None:
+        self.items += 1
+        self.texts += texts
+        self.busy += end - start
+        self.first_start = start if self.first_start is None else min(self.first_start, start)
+        self.last_end = end if self.last_end is None else max(self.last_end, end)
+
+    def to_dict(self) -> dict:
+        active = (self.last_end - self.first_start) if self.items else 0.0
+        return {
+            "items": self.items,
+            "texts": self.texts,
+            "busy_seconds": round(self.busy, 3),
+            "active_seconds": round(active, 3),
+            "items_per_second": round(self.items / active, 2) if active else None,
+            "texts_per_second": round(self.texts / active, 2) if active and self.texts else None,
+        }
+
+
+class IngestPipeline:
+    """Runs documents through parse, chunk, embed and write stages that overlap in time.
+
+    Stages are connected by bounded queues, so a slow stage applies backpressure
+    instead of buffering a whole corpus, and each stage runs its own number of
+    workers. Chunks are embedded and written in batches of ``batch_size``; once all
+    batches of a document are written, ``finish`` is called with the keys of its
+    chunks in order. The first error cancels the run and is re-raised; chunks already
+    written for documents that never reached ``finish`` are then passed to ``discard``,
+    so a failed run leaves no chunks without a file record behind.
+
+    Callables:
+        parse(doc) -> content
+        chunk(doc, content) -> list of texts
+        embed(texts) -> list of vectors
+        write(texts, vectors) -> list of keys
+        finish(doc, keys) -> None
+        discard(keys) -> None
+    """
+
+    def __init__(
+        self,
+        parse: Callable[[Any], Awaitable[Any]],
+        chunk: Callable[[Any, Any], Awaitable[List[str]]],
+        embed: Callable[[List[str]], Awaitable[List[List[float]]]],
+        write: Callable[[List[str], List[List[float]]], Awaitable[List[str]]],
+        finish: Optional[Callable[[Any, List[str]], Awaitable[None]]] = None,
+        discard: Optional[Callable[[List[str]], Awaitable[None]]] = None,
+        batch_size: int = 32,
+        parse_concurrency: int = 4,
+        embed_concurrency: int = 4,
+        write_concurrency: int = 2,
+        queue_size: int = 16,
+    ):
+        self.parse = parse
+        self.chunk = chunk
+        self.embed = embed
+        self.write = write
+        self.finish = finish
+        self.discard = discard
+        self.batch_size = batch_size
+        self.concurrency = {
+            "parse": parse_concurrency,
+            "chunk": parse_concurrency,
+            "embed": embed_concurrency,
+            "write": write_concurrency,
+        }
+        self.queue_size = queue_size
+        self.stats = {}
+
+    async def run(self, documents: Iterable[Any]) -> dict:
+        """Ingest ``documents`` and return per-stage statistics."""
+        self.stats = {name: StageStats(name) for name in STAGES}
+        self._documents = {}  # document index => {"doc", "keys": [per batch], "pending", "finished"}
+        self._writes = set()  # write calls still running
+        started = time.perf_counter()
+        queues = {name: asyncio.Queue(self.queue_size) for name in STAGES}
+
+        async def feed():
+            for index, doc in enumerate(documents):
+                await queues["parse"].put((index, doc))
+            for _ in range(self.concurrency["parse"]):
+                await queues["parse"].put(_DONE)
+
+        handlers = {
+            "parse": self._parse,
+            "chunk": self._chunk,
+            "embed": self._embed,
+            "write": self._write,
+        }
+        tasks = [asyncio.ensure_future(feed())]
+        for position, name in enumerate(STAGES):
+            downstream = STAGES[position + 1] if position + 1 < len(STAGES) else None
+            tasks.append(
+                asyncio.ensure_future(
+                    self._stage(name, queues[name], queues[downstream] if downstream else None, downstream, handlers[name])
+                )
+            )
+
+        completed = False
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                if task.exception() is not None:
+                    raise task.exception()
+            completed = True
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if not completed:
+                await self._discard_unfinished()
+
+        report = {name: stats.to_dict() for name, stats in self.stats.items()}
+        report["total_seconds"] = round(time.perf_counter() - started, 3)
+        logger.info(f"[ ingest pipeline ] {len(self._documents)} documents ingested: {report}")
+        return report
+
+    async def _stage(self, name, inbox, outbox, downstream, handler) -> None:
+        async def worker():
+            while True:
+                item = await inbox.get()
+                if item is _DONE:
+                    return
+                start = time.perf_counter()
+                outputs, texts = await handler(*item)
+                self.stats[name].record(start, time.perf_counter(), texts)
+                for output in outputs:
+                    await outbox.put(output)
+
+        # a failing worker must not leave its siblings blocked on the inbox
+        workers = [asyncio.ensure_future(worker()) for _ in range(self.concurrency[name])]
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+        if outbox is not None:
+            for _ in range(self.concurrency[downstream]):
+                await outbox.put(_DONE)
+
+    async def _parse(self, index, doc):
+        content = await self.parse(doc)
+        return [(index, doc, content)], 0
+
+    async def _chunk(self, index, doc, content):
+        texts = await self.chunk(doc, content)
+        batches = [texts[start : start + self.batch_size] for start in range(0, len(texts), self.batch_size)]
+        document = {"doc": doc, "keys": [None] * len(batches), "pending": len(batches), "finished": False}
+        self._documents[index] = document
+        if not batches:
+            document["finished"] = True
+            if self.finish is not None:
+                await self.finish(doc, [])
+        return [(index, batch_index, batch) for batch_index, batch in enumerate(batches)], len(texts)
+
+    async def _embed(self, index, batch_index, texts):
+        vectors = await self.embed(texts)
+        return [(index, batch_index, texts, vectors)], len(texts)
+
+    async def _write(self, index, batch_index, texts, vectors):
+        document = self._documents[index]
+
+        def written(write):
+            if not write.cancelled() and write.exception() is None:
+                document["keys"][batch_index] = write.result()
+
+        # shielded, so a cancelled run still learns the keys of a write that was already sent
+        write = asyncio.ensure_future(self.write(texts, vectors))
+        write.add_done_callback(written)
+        self._writes.add(write)
+        write.add_done_callback(self._writes.discard)
+        await asyncio.shield(write)
+        document["pending"] -= 1
+        if document["pending"] == 0:
+            # from here on the chunks belong to ``finish``, which cleans up after its own failures
+            document["finished"] = True
+            if self.finish is not None:
+                await self.finish(document["doc"], [key for keys in document["keys"] for key in keys])
+        return [], len(texts)
+
+    async def _discard_unfinished(self) -> None:
+        """Hand the keys written for documents that never reached ``finish`` to ``discard``."""
+        await asyncio.gather(*self._writes, return_exceptions=True)
+        keys = [
+            key
+            for document in self._documents.values()
+            if not document["finished"]
+            for batch in document["keys"]
+            if batch
+            for key in batch
+        ]
+        if not keys or self.discard is None:
+            return
+        try:
+            await self.discard(keys)
+        except Exception as e:
+            logger.error(f"[ ingest pipeline ] Failed to delete {len(keys)} chunks of unfinished documents: {e}")
+        else:
+            logger.info(f"[ ingest pipeline ] Deleted {len(keys)} chunks of unfinished documents")
@@ -33,11 +33,8 @@ logflag = os.getenv("LOGFLAG", False)
 upload_folder = "./uploaded_files/"
 
 dataprep_component_name = os.getenv("DATAPREP_COMPONENT_NAME", "OPEA_DATAPREP_REDIS")
-# Initialize OpeaComponentLoader
-loader = OpeaDataprepLoader(
-    dataprep_component_name,
-    description=f"OPEA DATAPREP Component: {dataprep_component_name}",
-)
+# OpeaComponentLoader, created in __main__ so that document parse workers, which import this script, do not build it
+loader = None
 
 
 @register_microservice(
@@ -137,5 +134,9 @@ async def delete_files(file_path: str = Body(..., embed=True)):
 
 if __name__ == "__main__":
     logger.info("OPEA Dataprep Microservice is starting...")
+    loader = OpeaDataprepLoader(
+        dataprep_component_name,
+        description=f"OPEA DATAPREP Component: {dataprep_component_name}",
+    )
     create_upload_folder(upload_folder)
     opea_microservices["opea_service@dataprep"].start()
@@ -13,16 +13,17 @@ import shutil
 import signal
 import subprocess
 import tempfile
+import threading
 import timeit
 import unicodedata
 import urllib.parse
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
 from typing import Dict, List, Union
 from urllib.parse import urlparse, urlunparse
 
 import aiofiles
-import aiohttp
 import cairosvg
 import cv2
 import docx
@@ -49,6 +50,14 @@ from comps import CustomLogger
 logger = CustomLogger("prepare_doc_util")
 logflag = os.getenv("LOGFLAG", False)
 
+# Document parsing process pool, off by default; DATAPREP_PARSE_WORKERS=0 parses in threads
+DATAPREP_PARSE_WORKERS = int(os.getenv("DATAPREP_PARSE_WORKERS", 0))
+DATAPREP_PARSE_PAGES_PER_TASK = int(os.getenv("DATAPREP_PARSE_PAGES_PER_TASK", 4))
+DATAPREP_PARSE_MAX_TASKS_PER_WORKER = int(os.getenv("DATAPREP_PARSE_MAX_TASKS_PER_WORKER", 200))
+DATAPREP_PARSE_WORKER_MEMORY_MB = int(os.getenv("DATAPREP_PARSE_WORKER_MEMORY_MB", 0))
+# forking the service itself copies the locks of its event loop, client and OpenMP threads
+DATAPREP_PARSE_START_METHOD = os.getenv("DATAPREP_PARSE_START_METHOD", "forkserver")
+
 
 class TimeoutError(Exception):
     pass
@@ -97,6 +106,120 @@ class Timer:
             print(f'{"  " * Timer.level}{self.name} took {timeit.default_timer() - self.start} sec')
 
 
+def _init_parse_worker(memory_limit_mb):
+    """Cap the address space a parse worker may add on top of what it inherited."""
+    if memory_limit_mb > 0:
+        import resource
+
+        with open("/proc/self/statm") as f:
+            inherited = int(f.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+        limit = inherited + memory_limit_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+class ParseExecutor:
+    """Process pool for the CPU-bound parts of parsing: PDF pages, OCR, slides and sheets.
+
+    The pool is replaced once it has run ``max_tasks_per_worker`` tasks per worker,
+    which returns memory fragmented by large documents, and each worker may grow by
+    at most ``memory_limit_mb`` so a pathological page fails with MemoryError
+    instead of exhausting the host. A pool broken by a crashed worker is replaced
+    on the next submission. With ``workers=0`` tasks run in threads.
+
+    Workers start with ``forkserver`` by default: they fork from a single-threaded
+    server that has this module imported, never from the service process. Like
+    ``spawn``, each worker still imports the service's main script, so that
+    script must not build its components at import time.
+    """
+
+    def __init__(
+        self, workers: int, max_tasks_per_worker: int = 200, memory_limit_mb: int = 0, start_method="forkserver"
+    ):
+        self.workers = workers
+        self.max_tasks_per_worker = max_tasks_per_worker
+        self.memory_limit_mb = memory_limit_mb
+        self.start_method = start_method
+        self._pool = None
+        self._tasks = 0
+        self._lock = threading.Lock()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is not None and self.max_tasks_per_worker and self._tasks >= self.max_tasks_per_worker * self.workers:
+                # running and queued tasks still complete before the old workers exit
+                self._pool.shutdown(wait=False)
+                self._pool = None
+            if self._pool is None:
+                context = multiprocessing.get_context(self.start_method)
+                if self.start_method == "forkserver":
+                    # the parsing libraries are imported once in the server, not in every worker
+                    context.set_forkserver_preload([__name__])
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=context,
+                    initializer=_init_parse_worker,
+                    initargs=(self.memory_limit_mb,),
+                )
+                self._tasks = 0
+            self._tasks += 1
+            return self._pool
+
+    def _discard(self, pool: ProcessPoolExecutor) -> None:
+        with self._lock:
+            if self._pool is pool:
+                self._pool = None
+        pool.shutdown(wait=False)
+
+    async def _await(self, pool, future):
+        try:
+            return await future
+        except BrokenProcessPool:
+            logger.error("Document parsing worker died; restarting the parse pool.")
+            self._discard(pool)
+            raise
+
+    def submit(self, fn, *args) -> asyncio.Future:
+        """Schedule ``fn(*args)``; ``fn`` and its arguments must be picklable."""
+        loop = asyncio.get_running_loop()
+        call = functools.partial(fn, *args)
+        if self.workers <= 0:
+            return loop.run_in_executor(None, call)
+        pool = self._get_pool()
+        return asyncio.ensure_future(self._await(pool, loop.run_in_executor(pool, call)))
+
+    async def run(self, fn, *args):
+        return await self.submit(fn, *args)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+parse_executor = ParseExecutor(
+    DATAPREP_PARSE_WORKERS,
+    DATAPREP_PARSE_MAX_TASKS_PER_WORKER,
+    DATAPREP_PARSE_WORKER_MEMORY_MB,
+    DATAPREP_PARSE_START_METHOD,
+)
+
+
+async def _iter_results(futures, flatten=False):
+    """Yield the results of ``futures`` in submission order, as soon as each is ready."""
+    try:
+        for future in futures:
+            result = await future
+            if flatten:
+                for item in result:
+                    yield item
+            else:
+                yield result
+    finally:
+        for future in futures:
+            future.cancel()
+
+
 def get_separators():
     separators = [
         "\n\n",
@@ -139,19 +262,37 @@ def process_page(doc, idx):
 
 def load_pdf(pdf_path):
     doc = fitz.open(pdf_path)
-    results = []
 
     with ThreadPoolExecutor(max_workers=4) as executor:
-        futures = [executor.submit(process_page, doc, i) for i in range(doc.page_count)]
-        for future in as_completed(futures):
-            results.append(future.result())
+        results = list(executor.map(lambda i: process_page(doc, i), range(doc.page_count)))
 
     combined_result = "".join(results)
     return combined_result
 
 
+def _pdf_page_count(pdf_path):
+    with fitz.open(pdf_path) as doc:
+        return doc.page_count
+
+
+def _parse_pdf_pages(pdf_path, start, stop):
+    with fitz.open(pdf_path) as doc:
+        return [process_page(doc, idx) for idx in range(start, stop)]
+
+
+async def iter_pdf_pages(pdf_path):
+    """Start parsing every page of a PDF in the parse pool; yields page texts in order."""
+    page_count = await asyncio.to_thread(_pdf_page_count, pdf_path)
+    step = max(DATAPREP_PARSE_PAGES_PER_TASK, 1)
+    futures = [
+        parse_executor.submit(_parse_pdf_pages, pdf_path, start, min(start + step, page_count))
+        for start in range(0, page_count, step)
+    ]
+    return _iter_results(futures, flatten=True)
+
+
 async def load_pdf_async(pdf_path):
-    return await asyncio.to_thread(load_pdf, pdf_path)
+    return "".join([page async for page in await iter_pdf_pages(pdf_path)])
 
 
 def load_html(html_path):
@@ -217,7 +358,7 @@ async def load_docx(docx_path):
             for rid in rid2img:
                 if rid in paragraph._p.xml:
                     img_path = os.path.join(save_path, rid2img[rid])
-                    image_tasks.append(load_image(img_path))
+                    image_tasks.append(parse_executor.run(_image_to_text, img_path))
     image_texts = await asyncio.gather(*image_tasks)
 
     for img_text in image_texts:
@@ -253,35 +394,57 @@ async def load_ppt(ppt_path):
     return text
 
 
-async def load_pptx(pptx_path):
-    """Load pptx file."""
+def _slide_text(slide):
     text = ""
-    prs = pptx.Presentation(pptx_path)
-    for slide in prs.slides:
-        for shape in sorted(slide.shapes, key=lambda shape: (shape.top, shape.left)):
-            if shape.has_text_frame:
-                if shape.text:
-                    text += shape.text + "\n"
-            if shape.has_table:
-                table_contents = "\n".join(
-                    [
-                        "\t".join([(cell.text if hasattr(cell, "text") else "") for cell in row.cells])
-                        for row in shape.table.rows
-                        if hasattr(row, "cells")
-                    ]
-                )
-                if table_contents:
-                    text += table_contents + "\n"
-            if hasattr(shape, "image") and hasattr(shape.image, "blob"):
-                with tempfile.NamedTemporaryFile() as f:
-                    f.write(shape.image.blob)
-                    f.flush()
-                    img_text = await load_image(f.name)
-                    if img_text:
-                        text += img_text + "\n"
+    for shape in sorted(slide.shapes, key=lambda shape: (shape.top, shape.left)):
+        if shape.has_text_frame:
+            if shape.text:
+                text += shape.text + "\n"
+        if shape.has_table:
+            table_contents = "\n".join(
+                [
+                    "\t".join([(cell.text if hasattr(cell, "text") else "") for cell in row.cells])
+                    for row in shape.table.rows
+                    if hasattr(row, "cells")
+                ]
+            )
+            if table_contents:
+                text += table_contents + "\n"
+        if hasattr(shape, "image") and hasattr(shape.image, "blob"):
+            with tempfile.NamedTemporaryFile() as f:
+                f.write(shape.image.blob)
+                f.flush()
+                img_text = _image_to_text(f.name)
+                if img_text:
+                    text += img_text + "\n"
     return text
 
 
+def _slide_count(pptx_path):
+    return len(pptx.Presentation(pptx_path).slides)
+
+
+def _parse_pptx_slides(pptx_path, start, stop):
+    slides = pptx.Presentation(pptx_path).slides
+    return [_slide_text(slides[idx]) for idx in range(start, stop)]
+
+
+async def iter_pptx_slides(pptx_path):
+    """Start parsing every slide of a presentation in the parse pool; yields slide texts in order."""
+    slide_count = await asyncio.to_thread(_slide_count, pptx_path)
+    step = max(DATAPREP_PARSE_PAGES_PER_TASK, 1)
+    futures = [
+        parse_executor.submit(_parse_pptx_slides, pptx_path, start, min(start + step, slide_count))
+        for start in range(0, slide_count, step)
+    ]
+    return _iter_results(futures, flatten=True)
+
+
+async def load_pptx(pptx_path):
+    """Load pptx file."""
+    return "".join([slide async for slide in await iter_pptx_slides(pptx_path)])
+
+
 async def load_md(md_path):
     """Asynchronously load and process Markdown file."""
 
@@ -328,14 +491,27 @@ async def load_yaml(yaml_path):
     return yaml.dump(data)
 
 
-async def load_xlsx(input_path):
-    """Asynchronously load and process an xlsx file."""
+def _sheet_names(input_path):
+    with pd.ExcelFile(input_path) as workbook:
+        return workbook.sheet_names
 
-    def process_xlsx():
-        df = pd.read_excel(input_path)
-        return df.apply(lambda row: ", ".join(row.astype(str)), axis=1).tolist()
 
-    return await asyncio.to_thread(process_xlsx)
+def _parse_xlsx_sheet(input_path, sheet_name):
+    df = pd.read_excel(input_path, sheet_name=sheet_name)
+    if df.empty:
+        return []
+    return df.apply(lambda row: ", ".join(row.astype(str)), axis=1).tolist()
+
+
+async def iter_xlsx_sheets(input_path):
+    """Start parsing every sheet of a workbook in the parse pool; yields the rows of each sheet in order."""
+    sheet_names = await asyncio.to_thread(_sheet_names, input_path)
+    return _iter_results([parse_executor.submit(_parse_xlsx_sheet, input_path, name) for name in sheet_names])
+
+
+async def load_xlsx(input_path):
+    """Asynchronously load and process an xlsx file."""
+    return [row async for rows in await iter_xlsx_sheets(input_path) for row in rows]
 
 
 async def load_csv(input_path):
@@ -348,39 +524,63 @@ async def load_csv(input_path):
     return await asyncio.to_thread(process_csv)
 
 
-async def load_image(image_path):
-    """Load the image file."""
-
-    async def read_image_async(image_path):
-        return await asyncio.to_thread(lambda: open(image_path, "rb").read())
-
+def _image_to_text(image_path):
+    """OCR an image, or summarize it with the LVM service when SUMMARIZE_IMAGE_VIA_LVM=1."""
     if os.getenv("SUMMARIZE_IMAGE_VIA_LVM", None) == "1":
         query = "Please summarize this image."
-        image_b64_str = base64.b64encode(await read_image_async(image_path)).decode()
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                url="http://localhost:9399/v1/lvm",
-                json={"image": image_b64_str, "prompt": query},
-                headers={"Content-Type": "application/json"},
-            ) as response:
-                json_data = await response.json()
-        return json_data["text"].strip()
-
-    def load_text_from_image():
-        loader = UnstructuredImageLoader(image_path)
-        return loader.load()[0].page_content.strip()
-
-    text = await asyncio.to_thread(load_text_from_image)
-    return text
+        with open(image_path, "rb") as f:
+            image_b64_str = base64.b64encode(f.read()).decode()
+        response = requests.post(
+            url="http://localhost:9399/v1/lvm",
+            json={"image": image_b64_str, "prompt": query},
+            headers={"Content-Type": "application/json"},
+        )
+        return response.json()["text"].strip()
 
+    loader = UnstructuredImageLoader(image_path)
+    return loader.load()[0].page_content.strip()
 
-async def load_svg(svg_path):
-    """Load the svg file."""
+
+def _svg_to_text(svg_path):
     png_path = svg_path.replace(".svg", ".png")
     cairosvg.svg2png(url=svg_path, write_to=png_path)
-    text = await load_image(png_path)
-    os.remove(png_path)
-    return text
+    try:
+        return _image_to_text(png_path)
+    finally:
+        os.remove(png_path)
+
+
+async def load_image(image_path):
+    """Load the image file."""
+    return await parse_executor.run(_image_to_text, image_path)
+
+
+async def load_svg(svg_path):
+    """Load the svg file."""
+    return await parse_executor.run(_svg_to_text, svg_path)
+
+
+async def iter_document(doc_path):
+    """Start parsing a document and return an async iterator over its parts in order.
+
+    PDF pages, slides and sheets are parsed in parallel in the parse pool and yielded
+    as they become available, so chunking can start before the whole document is
+    parsed. Parts are strings, except for sheets which yield lists of rows. Other
+    formats yield their whole content as one part.
+    """
+    if doc_path.endswith(".pdf"):
+        return await iter_pdf_pages(doc_path)
+    elif doc_path.endswith(".pptx"):
+        return await iter_pptx_slides(doc_path)
+    elif doc_path.endswith(".xlsx") or doc_path.endswith(".xls"):
+        return await iter_xlsx_sheets(doc_path)
+
+    content = await document_loader(doc_path)
+
+    async def single():
+        yield content
+
+    return single()
 
 
 async def document_loader(doc_path):
@@ -0,0 +1,252 @@
+# Copyright (C) 2024 Intel Corporation
+# SPDX-License-Identifier: Apache-2.0
+
+import asyncio
+import fcntl
+import hashlib
+import os
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from prometheus_client import Counter, Gauge
+
+from comps import CustomLogger
+
+logger = CustomLogger("opea_embedding_cache")
+
+cache_hits = Counter("opea_embedding_cache_hits", "Embedding cache hits per tier", ["tier"])
+cache_misses = Counter("opea_embedding_cache_misses", "Texts that had to be embedded by the server")
+cache_bytes = Gauge("opea_embedding_cache_bytes", "Bytes held by the embedding cache per tier", ["tier"])
+
+
+def normalize_text(text: str) -> str:
+    """Canonical form of a text for cache lookups (NFC, newlines already replaced by the caller)."""
+    return unicodedata.normalize("NFC", text)
+
+
+def cache_key(namespace: str, text: str) -> bytes:
+    """Content address of ``text`` embedded by the model identified by ``namespace``."""
+    return hashlib.sha256(f"{namespace}\x00{normalize_text(text)}".encode("utf-8")).digest()
+
+
+class MemoryTier:
+    """LRU of float32 vectors bounded by a byte budget."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._entries = OrderedDict()
+
+    def get(self, key: bytes) -> Optional[np.ndarray]:
+        vector = self._entries.get(key)
+        if vector is not None:
+            self._entries.move_to_end(key)
+        return vector
+
+    def put(self, key: bytes, vector: np.ndarray) -> None:
+        size = vector.nbytes + len(key)
+        if size > self.max_bytes:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.bytes -= old.nbytes + len(key)
+        self._entries[key] = vector
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            evicted_key, evicted = self._entries.popitem(last=False)
+            self.bytes -= evicted.nbytes + len(evicted_key)
+
+
+class DiskTier:
+    """Append-only, memory-mapped vector store.
+
+    Each (namespace, dimension) gets a ``.vec`` file of fixed-size rows in ``dtype``
+    and a ``.keys`` file holding the 32-byte key of every row in the same order,
+    so the index is rebuilt on start-up by reading the keys only. Writes stop once
+    ``max_bytes`` is reached; the directory can be deleted to reset the tier.
+
+    Several processes may share a directory: appends hold an exclusive ``flock``
+    on the ``.keys`` file and first index the rows other processes appended, so
+    keys and rows stay aligned. The directory must be on a local filesystem
+    where ``flock`` works across processes (not NFS). ``get_many`` and ``put_many``
+    block on file I/O and locks, so async callers run them on a worker thread.
+    """
+
+    def __init__(self, directory: str, dtype: str = "float16", max_bytes: Optional[int] = None):
+        self.directory = directory
+        self.dtype = np.dtype(dtype)
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._stores = {}  # (namespace hash, dim) => store state
+        self._lock = threading.Lock()  # worker threads share the store state
+        os.makedirs(directory, exist_ok=True)
+        for name in os.listdir(directory):
+            if name.endswith(".keys"):
+                prefix, dim = name[: -len(".keys")].rsplit("-", 1)
+                store = self._open(prefix, int(dim))
+                self._refresh_shared(store)
+
+    def _open(self, prefix: str, dim: int) -> dict:
+        store = self._stores.get((prefix, dim))
+        if store is None:
+            base = os.path.join(self.directory, f"{prefix}-{dim}")
+            store = {"base": base, "dim": dim, "index": {}, "rows": 0, "mmap": None, "mapped_rows": 0}
+            self._stores[(prefix, dim)] = store
+        return store
+
+    def _row_bytes(self, store: dict) -> int:
+        return store["dim"] * self.dtype.itemsize
+
+    def _refresh(self, store: dict, keys_file) -> None:
+        """Index the rows appended since the last refresh; the caller holds a lock on ``keys_file``."""
+        keys_file.seek(store["rows"] * 32)
+        keys = keys_file.read()
+        vec = store["base"] + ".vec"
+        vec_rows = os.path.getsize(vec) // self._row_bytes(store) if os.path.exists(vec) else 0
+        # a crash between the two appends leaves a row without a key (or vice versa); trust the shorter one
+        rows = min(store["rows"] + len(keys) // 32, vec_rows)
+        for row in range(store["rows"], rows):
+            offset = (row - store["rows"]) * 32
+            store["index"][keys[offset : offset + 32]] = row
+        self.bytes += (rows - store["rows"]) * self._row_bytes(store)
+        store["rows"] = rows
+
+    def _refresh_shared(self, store: dict) -> None:
+        keys = store["base"] + ".keys"
+        if not os.path.exists(keys) or os.path.getsize(keys) <= store["rows"] * 32:
+            return
+        with open(keys, "rb") as keys_file:
+            fcntl.flock(keys_file, fcntl.LOCK_SH)
+            self._refresh(store, keys_file)
+
+    @staticmethod
+    def _prefix(namespace: str) -> str:
+        return hashlib.sha1(namespace.encode("utf-8")).hexdigest()[:16]
+
+    def get(self, namespace: str, key: bytes) -> Optional[np.ndarray]:
+        prefix = self._prefix(namespace)
+        for (store_prefix, _), store in self._stores.items():
+            if store_prefix != prefix:
+                continue
+            row = store["index"].get(key)
+            if row is None:
+                # another process may have written it since
+                self._refresh_shared(store)
+                row = store["index"].get(key)
+                if row is None:
+                    continue
+            if row >= store["mapped_rows"]:
+                store["mmap"] = np.memmap(
+                    store["base"] + ".vec", dtype=self.dtype, mode="r", shape=(store["rows"], store["dim"])
+                )
+                store["mapped_rows"] = store["rows"]
+            return np.asarray(store["mmap"][row], dtype=np.float32)
+        return None
+
+    def get_many(self, namespace: str, keys: List[bytes]) -> List[Optional[np.ndarray]]:
+        with self._lock:
+            return [self.get(namespace, key) for key in keys]
+
+    def put_many(self, namespace: str, entries: List[Tuple[bytes, np.ndarray]]) -> None:
+        with self._lock:
+            for key, vector in entries:
+                self.put(namespace, key, vector)
+
+    def put(self, namespace: str, key: bytes, vector: np.ndarray) -> None:
+        store = self._open(self._prefix(namespace), vector.shape[0])
+        if key in store["index"]:
+            return
+        row_bytes = self._row_bytes(store)
+        with open(store["base"] + ".keys", "a+b") as keys_file:
+            fcntl.flock(keys_file, fcntl.LOCK_EX)  # released when the file is closed
+            self._refresh(store, keys_file)
+            if key in store["index"]:
+                return
+            if self.max_bytes is not None and self.bytes + row_bytes > self.max_bytes:
+                return
+            rows = store["rows"]
+            with open(store["base"] + ".vec", "a+b") as vec_file:
+                # drop a half-written row of an earlier crash so the next row lands at ``rows``
+                vec_file.truncate(rows * row_bytes)
+                vec_file.write(vector.astype(self.dtype).tobytes())
+            keys_file.truncate(rows * 32)
+            keys_file.write(key)
+            keys_file.flush()
+        store["index"][key] = rows
+        store["rows"] = rows + 1
+        self.bytes += row_bytes
+
+
+class EmbeddingCache:
+    """Content-addressed embedding cache: an in-process LRU tier backed by an optional on-disk tier.
+
+    Keys are the SHA-256 of the model namespace plus the normalized text, so the
+    same text embedded by another model never collides.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 256 * 1024 * 1024,
+        disk_dir: Optional[str] = None,
+        disk_dtype: str = "float16",
+        disk_max_bytes: Optional[int] = None,
+    ):
+        self.memory = MemoryTier(max_bytes)
+        self.disk = DiskTier(disk_dir, disk_dtype, disk_max_bytes) if disk_dir else None
+        self._lock = threading.Lock()
+        cache_bytes.labels("memory").set(0)
+        if self.disk:
+            cache_bytes.labels("disk").set(self.disk.bytes)
+
+    async def get_many(self, namespace: str, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """Cached vectors for ``texts`` in order, ``None`` where the text has not been embedded yet.
+
+        The memory tier is looked up inline; misses go to the disk tier on a worker
+        thread, so file I/O and ``flock`` waits never block the event loop.
+        """
+        keys = [cache_key(namespace, text) for text in texts]
+        with self._lock:
+            results = [self.memory.get(key) for key in keys]
+        missing = [i for i, vector in enumerate(results) if vector is None]
+        cache_hits.labels("memory").inc(len(keys) - len(missing))
+        if self.disk is not None and missing:
+            found = await asyncio.to_thread(self.disk.get_many, namespace, [keys[i] for i in missing])
+            with self._lock:
+                for i, vector in zip(missing, found):
+                    if vector is not None:
+                        self.memory.put(keys[i], vector)
+                        results[i] = vector
+            cache_hits.labels("disk").inc(sum(vector is not None for vector in found))
+        cache_misses.inc(sum(vector is None for vector in results))
+        cache_bytes.labels("memory").set(self.memory.bytes)
+        return results
+
+    async def put_many(self, namespace: str, vectors: Dict[str, List[float]]) -> None:
+        """Store freshly computed embeddings, ``text => vector``; disk writes run on a worker thread."""
+        entries = [
+            (cache_key(namespace, text), np.asarray(vector, dtype=np.float32)) for text, vector in vectors.items()
+        ]
+        with self._lock:
+            for key, array in entries:
+                self.memory.put(key, array)
+        cache_bytes.labels("memory").set(self.memory.bytes)
+        if self.disk is not None:
+            await asyncio.to_thread(self._put_disk, namespace, entries)
+            cache_bytes.labels("disk").set(self.disk.bytes)
+
+    def _put_disk(self, namespace: str, entries: List[Tuple[bytes, np.ndarray]]) -> None:
+        try:
+            self.disk.put_many(namespace, entries)
+        except OSError as e:
+            logger.error(f"Failed to write embedding to the disk cache: {e}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "memory_entries": len(self.memory._entries),
+                "memory_bytes": self.memory.bytes,
+                "disk_bytes": self.disk.bytes if self.disk else 0,
+            }
@@ -0,0 +1,139 @@
+# Copyright (C) 2024 Intel Corporation
+# SPDX-License-Identifier: Apache-2.0
+
+import asyncio
+from typing import Awaitable, Callable, List, Tuple
+
+from prometheus_client import Counter, Histogram
+
+from comps import CustomLogger
+
+logger = CustomLogger("opea_embedding_coalescer")
+
+coalescing_factor = Histogram(
+    "opea_embedding_coalescing_factor",
+    "Concurrent embedding calls merged into one upstream request",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128),
+)
+coalesced_texts = Histogram(
+    "opea_embedding_coalesced_texts",
+    "Distinct texts sent in one coalesced upstream request",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256),
+)
+coalesced_duplicates = Counter(
+    "opea_embedding_coalesced_duplicates",
+    "Texts shared by several calls in one window and embedded only once",
+)
+
+# (texts, model, encoding_format, user) => (embeddings, prompt_tokens, model)
+PostTexts = Callable[[List[str], str, str, str], Awaitable[Tuple[list, int, str]]]
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap upper estimate of the tokens of ``text`` plus special tokens, without a tokenizer."""
+    return len(text) // 3 + 2
+
+
+class _Window:
+    """Calls collected for one (model, encoding_format, user) until the window is flushed."""
+
+    def __init__(self):
+        self.texts = []  # distinct texts, in arrival order
+        self.positions = {}  # text => index in self.texts
+        self.tokens = 0
+        self.callers = []  # (future, indexes into self.texts)
+        self.timer = None
+
+
+class EmbeddingCoalescer:
+    """Merges concurrent embedding calls into shared upstream requests.
+
+    Calls arriving within ``window`` seconds of the first one, with the same model,
+    encoding format and user, are sent upstream together. The window only waits
+    while another coalesced request is in flight; otherwise it is sent on the next
+    event loop iteration, so a lone caller gets no added latency. A window is
+    flushed early once it holds ``max_texts`` distinct texts or ``max_tokens``
+    estimated tokens.
+    Identical texts inside a window are embedded once, and every caller's future
+    receives its own embeddings in order. Prompt token usage is apportioned by text
+    length.
+    """
+
+    def __init__(self, post: PostTexts, window: float = 0.002, max_texts: int = 32, max_tokens: int = 16384):
+        self.post = post
+        self.window = window
+        self.max_texts = max_texts
+        self.max_tokens = max_tokens
+        self._pending = {}  # (model, encoding_format, user) => _Window
+        self._in_flight = 0  # coalesced requests sent and not answered yet
+        self._tasks = set()  # keeps running requests from being garbage collected
+
+    async def embed(self, texts: List[str], model, encoding_format, user):
+        """Embed ``texts``; returns ``(embeddings, prompt_tokens, model)`` like ``post``."""
+        if not texts:
+            return await self.post(texts, model, encoding_format, user)
+        params = (model, encoding_format, user)
+        window = self._pending.get(params)
+        if window is not None:
+            new_texts = [text for text in dict.fromkeys(texts) if text not in window.positions]
+            if len(window.texts) + len(new_texts) > self.max_texts or (
+                window.tokens + sum(estimate_tokens(text) for text in new_texts) > self.max_tokens
+            ):
+                self._flush(params, window)
+                window = None
+        if window is None:
+            window = self._pending[params] = _Window()
+            loop = asyncio.get_running_loop()
+            if self._in_flight:
+                window.timer = loop.call_later(self.window, self._flush, params, window)
+            else:
+                window.timer = loop.call_soon(self._flush, params, window)
+
+        indexes = []
+        for text in texts:
+            index = window.positions.get(text)
+            if index is None:
+                index = window.positions[text] = len(window.texts)
+                window.texts.append(text)
+                window.tokens += estimate_tokens(text)
+            indexes.append(index)
+        future = asyncio.get_running_loop().create_future()
+        window.callers.append((future, indexes))
+        if len(window.texts) >= self.max_texts or window.tokens >= self.max_tokens:
+            self._flush(params, window)
+        return await future
+
+    def _flush(self, params, window: _Window) -> None:
+        if self._pending.get(params) is window:
+            del self._pending[params]
+        if window.timer is not None:
+            window.timer.cancel()
+            window.timer = None
+        self._in_flight += 1
+        task = asyncio.ensure_future(self._run(params, window))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, params, window: _Window) -> None:
+        try:
+            embeddings, prompt_tokens, model = await self.post(window.texts, *params)
+        except Exception as e:
+            logger.error(f"Coalesced embedding request of {len(window.callers)} calls failed: {e}")
+            for future, _ in window.callers:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self._in_flight -= 1
+
+        references = sum(len(indexes) for _, indexes in window.callers)
+        coalescing_factor.observe(len(window.callers))
+        coalesced_texts.observe(len(window.texts))
+        coalesced_duplicates.inc(references - len(window.texts))
+
+        total_chars = sum(len(window.texts[i]) for _, indexes in window.callers for i in indexes) or 1
+        for future, indexes in window.callers:
+            if future.done():  # the caller went away
+                continue
+            tokens = round(prompt_tokens * sum(len(window.texts[i]) for i in indexes) / total_chars)
+            future.set_result(([embeddings[i] for i in indexes], tokens, model))
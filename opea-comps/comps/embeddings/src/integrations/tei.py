@@ -1,6 +1,7 @@
 # Copyright (C) 2024 Intel Corporation
 # SPDX-License-Identifier: Apache-2.0
 
+import asyncio
 import json
 import os
 from typing import List, Union
@@ -12,11 +13,26 @@ from comps import CustomLogger, OpeaComponent, OpeaComponentRegistry, ServiceTyp
 from comps.cores.mega.utils import get_access_token
 from comps.cores.proto.api_protocol import EmbeddingRequest, EmbeddingResponse
 
+from .embedding_cache import EmbeddingCache
+from .embedding_coalescer import EmbeddingCoalescer
+
 logger = CustomLogger("opea_tei_embedding")
 logflag = os.getenv("LOGFLAG", False)
 TOKEN_URL = os.getenv("TOKEN_URL")
 CLIENTID = os.getenv("CLIENTID")
 CLIENT_SECRET = os.getenv("CLIENT_SECRET")
+# Upper bound of texts sent to TEI in one call, matching TEI's --max-client-batch-size
+TEI_EMBEDDING_MAX_BATCH_TEXTS = int(os.getenv("TEI_EMBEDDING_MAX_BATCH_TEXTS", 32))
+# Embedding cache, off unless EMBEDDING_CACHE_MAX_BYTES is set, e.g. to 268435456 (256 MiB)
+EMBEDDING_CACHE_MAX_BYTES = int(os.getenv("EMBEDDING_CACHE_MAX_BYTES", 0))
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR")
+EMBEDDING_CACHE_DISK_DTYPE = os.getenv("EMBEDDING_CACHE_DISK_DTYPE", "float16")
+EMBEDDING_CACHE_DISK_MAX_BYTES = (
+    int(os.environ["EMBEDDING_CACHE_DISK_MAX_BYTES"]) if os.getenv("EMBEDDING_CACHE_DISK_MAX_BYTES") else None
+)
+# Request coalescing; the window only applies while another request is in flight. 0 disables it
+TEI_EMBEDDING_COALESCE_WINDOW_MS = float(os.getenv("TEI_EMBEDDING_COALESCE_WINDOW_MS", 2))
+TEI_EMBEDDING_COALESCE_MAX_TOKENS = int(os.getenv("TEI_EMBEDDING_COALESCE_MAX_TOKENS", 16384))
 
 
 @OpeaComponentRegistry.register("OPEA_TEI_EMBEDDING")
@@ -26,12 +42,35 @@ class OpeaTEIEmbedding(OpeaComponent):
     Attributes:
         client (AsyncInferenceClient): An instance of the async client for embedding generation.
         model_name (str): The name of the embedding model used.
+        cache (EmbeddingCache): Content-addressed cache of float embeddings, or None when disabled.
+        coalescer (EmbeddingCoalescer): Merges concurrent TEI calls, or None when disabled.
     """
 
     def __init__(self, name: str, description: str, config: dict = None):
         super().__init__(name, ServiceType.EMBEDDING.name.lower(), description, config)
         self.base_url = os.getenv("TEI_EMBEDDING_ENDPOINT", "http://localhost:8080")
         self.client = self._initialize_client()
+        self.cache = (
+            EmbeddingCache(
+                EMBEDDING_CACHE_MAX_BYTES,
+                EMBEDDING_CACHE_DIR,
+                EMBEDDING_CACHE_DISK_DTYPE,
+                EMBEDDING_CACHE_DISK_MAX_BYTES,
+            )
+            if EMBEDDING_CACHE_MAX_BYTES > 0
+            else None
+        )
+        self._model_names = {}  # cache namespace => model name reported by TEI
+        self.coalescer = (
+            EmbeddingCoalescer(
+                self._post_texts,
+                TEI_EMBEDDING_COALESCE_WINDOW_MS / 1000,
+                TEI_EMBEDDING_MAX_BATCH_TEXTS,
+                TEI_EMBEDDING_COALESCE_MAX_TOKENS,
+            )
+            if TEI_EMBEDDING_COALESCE_WINDOW_MS > 0
+            else None
+        )
 
         health_status = self.check_health()
         if not health_status:
@@ -58,23 +97,135 @@ class OpeaTEIEmbedding(OpeaComponent):
         Returns:
             EmbeddingResponse: The response in OpenAI embedding format, including embeddings, model, and usage information.
         """
-        # Parse input according to the EmbeddingRequest format
+        texts = self._parse_texts(input)
+        if self.cache is None and self.coalescer is None:
+            response = await self.client.post(
+                json={"input": texts, "encoding_format": input.encoding_format, "model": input.model, "user": input.user},
+                model=f"{self.base_url}/v1/embeddings",
+                task="text-embedding",
+            )
+            embeddings = json.loads(response.decode())
+            return EmbeddingResponse(**embeddings)
+
+        embeddings, prompt_tokens, model = await self._embed_texts(texts, input.model, input.encoding_format, input.user)
+        return EmbeddingResponse(
+            model=model,
+            data=[{"index": index, "embedding": embedding} for index, embedding in enumerate(embeddings)],
+            usage={"prompt_tokens": prompt_tokens, "total_tokens": prompt_tokens},
+        )
+
+    async def _post_texts(self, texts: List[str], model, encoding_format, user):
+        """Embed ``texts`` in TEI-sized chunks; returns ``(embeddings, prompt_tokens, model)``."""
+        chunks = [
+            texts[start : start + TEI_EMBEDDING_MAX_BATCH_TEXTS]
+            for start in range(0, len(texts), TEI_EMBEDDING_MAX_BATCH_TEXTS)
+        ]
+        responses = await asyncio.gather(
+            *[
+                self.client.post(
+                    json={"input": chunk, "encoding_format": encoding_format, "model": model, "user": user},
+                    model=f"{self.base_url}/v1/embeddings",
+                    task="text-embedding",
+                )
+                for chunk in chunks
+            ]
+        )
+        embeddings, prompt_tokens, response_model = [], 0, model
+        for response in responses:
+            data = json.loads(response.decode())
+            embeddings.extend(item["embedding"] for item in sorted(data["data"], key=lambda item: item["index"]))
+            prompt_tokens += (data.get("usage") or {}).get("prompt_tokens", 0)
+            response_model = data.get("model", response_model)
+        return embeddings, prompt_tokens, response_model
+
+    async def _post(self, texts: List[str], model, encoding_format, user):
+        """Send ``texts`` to TEI, merged with concurrent calls when coalescing is enabled."""
+        if self.coalescer is None:
+            return await self._post_texts(texts, model, encoding_format, user)
+        return await self.coalescer.embed(texts, model, encoding_format, user)
+
+    async def _embed_texts(self, texts: List[str], model, encoding_format, user):
+        """Embed ``texts`` through the cache: only distinct texts missing from it are sent to TEI.
+
+        Returns ``(embeddings, prompt_tokens, model)`` with embeddings in the order of
+        ``texts``; ``prompt_tokens`` only counts the texts TEI actually embedded.
+        """
+        if self.cache is None or encoding_format == "base64":
+            return await self._post(texts, model, encoding_format, user)
+
+        namespace = model or self.base_url
+        vectors = await self.cache.get_many(namespace, texts)
+        missing = list(dict.fromkeys(text for text, vector in zip(texts, vectors) if vector is None))
+        prompt_tokens, response_model = 0, self._model_names.get(namespace, model)
+        if missing:
+            embeddings, prompt_tokens, response_model = await self._post(missing, model, encoding_format, user)
+            self._model_names[namespace] = response_model
+            fresh = dict(zip(missing, embeddings))
+            await self.cache.put_many(namespace, fresh)
+            return (
+                [fresh[text] if vector is None else vector.tolist() for text, vector in zip(texts, vectors)],
+                prompt_tokens,
+                response_model,
+            )
+        return [vector.tolist() for vector in vectors], prompt_tokens, response_model
+
+    async def invoke_batch(self, inputs: List[EmbeddingRequest]) -> List[Union[EmbeddingResponse, Exception]]:
+        """Embeds the texts of several requests with as few TEI calls as possible.
+
+        Requests sharing model, encoding format and user are concatenated, looked up in
+        the cache, and the remaining texts are sent in chunks of at most
+        ``TEI_EMBEDDING_MAX_BATCH_TEXTS``; the embeddings are then split back per
+        request. Prompt token usage is apportioned by text length.
+
+        Returns:
+            list: One EmbeddingResponse per input, or the exception raised for it.
+        """
+        results = [None] * len(inputs)
+        groups = {}
+        for i, input in enumerate(inputs):
+            try:
+                texts = self._parse_texts(input)
+            except (TypeError, ValueError) as e:
+                results[i] = e
+                continue
+            groups.setdefault((input.model, input.encoding_format, input.user), []).append((i, texts))
+
+        async def embed_group(params, members):
+            model, encoding_format, user = params
+            texts = [text for _, member_texts in members for text in member_texts]
+            try:
+                embeddings, prompt_tokens, response_model = await self._embed_texts(texts, model, encoding_format, user)
+            except Exception as e:
+                for i, _ in members:
+                    results[i] = e
+                return
+
+            total_chars = sum(len(text) for text in texts) or 1
+            offset = 0
+            for i, member_texts in members:
+                member_embeddings = embeddings[offset : offset + len(member_texts)]
+                offset += len(member_texts)
+                tokens = round(prompt_tokens * sum(len(text) for text in member_texts) / total_chars)
+                results[i] = EmbeddingResponse(
+                    model=response_model,
+                    data=[{"index": index, "embedding": embedding} for index, embedding in enumerate(member_embeddings)],
+                    usage={"prompt_tokens": tokens, "total_tokens": tokens},
+                )
+
+        await asyncio.gather(*[embed_group(params, members) for params, members in groups.items()])
+        return results
+
+    def _parse_texts(self, input: EmbeddingRequest) -> List[str]:
+        """Parse input according to the EmbeddingRequest format."""
         if isinstance(input.input, str):
-            texts = [input.input.replace("\n", " ")]
+            return [input.input.replace("\n", " ")]
         elif isinstance(input.input, list):
             if all(isinstance(item, str) for item in input.input):
-                texts = [text.replace("\n", " ") for text in input.input]
+                return [text.replace("\n", " ") for text in input.input]
             else:
                 raise ValueError("Invalid input format: Only string or list of strings are supported.")
         else:
             raise TypeError("Unsupported input type: input must be a string or list of strings.")
-        response = await self.client.post(
-            json={"input": texts, "encoding_format": input.encoding_format, "model": input.model, "user": input.user},
-            model=f"{self.base_url}/v1/embeddings",
-            task="text-embedding",
-        )
-        embeddings = json.loads(response.decode())
-        return EmbeddingResponse(**embeddings)
 
     def check_health(self) -> bool:
         """Checks the health of the embedding service.
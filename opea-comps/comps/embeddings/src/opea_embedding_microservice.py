@@ -1,6 +1,7 @@
 # Copyright (C) 2024 Intel Corporation
 # SPDX-License-Identifier: Apache-2.0
 
+import asyncio
 import os
 import time
 
@@ -13,6 +14,7 @@ from comps import (
     OpeaComponentLoader,
     ServiceType,
     opea_microservices,
+    register_batch_infer,
     register_microservice,
     register_statistics,
     statistics_dict,
@@ -31,12 +33,23 @@ loader = OpeaComponentLoader(
 )
 
 
+# Dynamic batching: concurrent requests are grouped and sent to the backend together
+EMBEDDING_DYNAMIC_BATCHING = os.getenv("EMBEDDING_DYNAMIC_BATCHING", "false").lower() in ("true", "1", "yes")
+EMBEDDING_BATCH_TIMEOUT_MS = float(os.getenv("EMBEDDING_BATCH_TIMEOUT_MS", 10))
+EMBEDDING_MAX_BATCH_SIZE = int(os.getenv("EMBEDDING_MAX_BATCH_SIZE", 32))
+EMBEDDING_MAX_QUEUE_SIZE = int(os.getenv("EMBEDDING_MAX_QUEUE_SIZE", 1024))
+
+
 @register_microservice(
     name="opea_service@embedding",
     service_type=ServiceType.EMBEDDING,
     endpoint="/v1/embeddings",
     host="0.0.0.0",
     port=6000,
+    dynamic_batching=EMBEDDING_DYNAMIC_BATCHING,
+    dynamic_batching_timeout=EMBEDDING_BATCH_TIMEOUT_MS / 1000,
+    dynamic_batching_max_batch_size=EMBEDDING_MAX_BATCH_SIZE,
+    dynamic_batching_max_queue_size=EMBEDDING_MAX_QUEUE_SIZE,
 )
 @opea_telemetry
 @register_statistics(names=["opea_service@embedding"])
@@ -49,7 +62,10 @@ async def embedding(input: EmbeddingRequest) -> EmbeddingResponse:
 
     try:
         # Use the loader to invoke the component
-        embedding_response = await loader.invoke(input)
+        if EMBEDDING_DYNAMIC_BATCHING:
+            embedding_response = await opea_microservices["opea_service@embedding"].enqueue_request(input)
+        else:
+            embedding_response = await loader.invoke(input)
 
         # Log the result if logging is enabled
         if logflag:
@@ -64,6 +80,14 @@ async def embedding(input: EmbeddingRequest) -> EmbeddingResponse:
         raise
 
 
+@register_batch_infer("opea_service@embedding")
+async def embedding_batch(service_type, batch):
+    inputs = [req["request"] for req in batch]
+    if hasattr(loader.component, "invoke_batch"):
+        return await loader.component.invoke_batch(inputs)
+    return await asyncio.gather(*[loader.invoke(input) for input in inputs], return_exceptions=True)
+
+
 if __name__ == "__main__":
     opea_microservices["opea_service@embedding"].start()
     logger.info("OPEA Embedding Microservice is up and running successfully...")
@@ -6,6 +6,8 @@ from bson.objectid import ObjectId
 from integrations.mongo.config import COLLECTION_NAME
 from integrations.mongo.mongo_conn import MongoClient
 
+from comps.cores.common.mongo import build_projection, create_indexes, iter_documents
+
 
 class FeedbackStore:
 
@@ -20,6 +22,11 @@ class FeedbackStore:
             self.db_client = MongoClient.get_db_client()
         self.collection = self.db_client[COLLECTION_NAME]
 
+    @staticmethod
+    async def create_indexes() -> None:
+        """Creates the indexes the per-user queries rely on; run once at startup."""
+        await create_indexes(MongoClient.get_db_client()[COLLECTION_NAME], [[("chat_data.user", 1), ("_id", 1)]])
+
     async def save_feedback(self, feedback_data) -> str:
         """Stores a new feedback data into the storage.
 
@@ -74,8 +81,35 @@ class FeedbackStore:
             print(e)
             raise Exception(e)
 
-    async def get_all_feedback_of_user(self) -> list[dict]:
-        """Retrieves all feedback data of a user from the collection.
+    def iter_feedback_of_user(self, limit=None, after=None, fields=None):
+        """Yields the feedback data of a user in creation order, as it is read.
+
+        Takes the same arguments as get_all_feedback_of_user.
+
+        Raises:
+            KeyError: If ``after`` is not a valid feedback ID.
+            ValueError: If a field name is invalid.
+        """
+        try:
+            return iter_documents(
+                self.collection,
+                {"chat_data.user": self.user},
+                build_projection(fields, {"feedback_data": 0}),
+                limit,
+                after,
+                id_field="feedback_id",
+            )
+        except BsonError.InvalidId as e:
+            print(e)
+            raise KeyError(e)
+
+    async def get_all_feedback_of_user(self, limit=None, after=None, fields=None) -> list[dict]:
+        """Retrieves feedback data of a user from the collection, oldest first.
+
+        Args:
+            limit (int, optional): Return at most this many entries.
+            after (str, optional): feedback_id of the last entry of the previous page.
+            fields (list[str], optional): Fields to return. Defaults to all but ``feedback_data``.
 
         Returns:
             list[dict] | None: List of dict of feedback data of the user, None otherwise.
@@ -84,15 +118,10 @@ class FeedbackStore:
             Exception: If there is an error while retrieving data.
         """
         try:
-            feedback_data_list: list = []
-            cursor = self.collection.find({"chat_data.user": self.user}, {"feedback_data": 0})
-
-            async for document in cursor:
-                document["feedback_id"] = str(document["_id"])
-                del document["_id"]
-                feedback_data_list.append(document)
-            return feedback_data_list
+            return [document async for document in self.iter_feedback_of_user(limit, after, fields)]
 
+        except KeyError:
+            raise
         except Exception as e:
             print(e)
             raise Exception(e)
@@ -1,13 +1,15 @@
 # Copyright (C) 2024 Intel Corporation
 # SPDX-License-Identifier: Apache-2.0
 import os
-from typing import Annotated, Optional
+from typing import Annotated, List, Optional
 
 from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
 from feedback_store import FeedbackStore
 from pydantic import BaseModel, Field
 
 from comps import CustomLogger
+from comps.cores.common.mongo import ndjson
 from comps.cores.mega.micro_service import opea_microservices, register_microservice
 from comps.cores.proto.api_protocol import ChatCompletionRequest
 
@@ -51,10 +53,18 @@ class FeedbackId(BaseModel):
     Attributes:
         user (str): The user of the requested feedback data.
         feedback_id (str): The feedback_id of feedback data to be retrieved from database.
+        limit (int)[Optional]: Maximum number of entries to list.
+        after (str)[Optional]: feedback_id of the last entry of the previous page.
+        fields (list[str])[Optional]: Fields to return when listing.
+        stream (bool): Stream the list as newline-delimited JSON.
     """
 
     user: str
     feedback_id: Optional[str] = None
+    limit: Annotated[Optional[int], Field(gt=0)] = None
+    after: Optional[str] = None
+    fields: Optional[List[str]] = None
+    stream: bool = False
 
 
 @register_microservice(
@@ -117,8 +127,11 @@ async def get_feedback(feedback: FeedbackId):
         feedback_store.initialize_storage()
         if feedback.feedback_id:
             response = await feedback_store.get_feedback_by_id(feedback.feedback_id)
+        elif feedback.stream:
+            documents = feedback_store.iter_feedback_of_user(feedback.limit, feedback.after, feedback.fields)
+            return StreamingResponse(ndjson(documents), media_type="application/x-ndjson")
         else:
-            response = await feedback_store.get_all_feedback_of_user()
+            response = await feedback_store.get_all_feedback_of_user(feedback.limit, feedback.after, feedback.fields)
 
         if logflag:
             logger.info(response)
@@ -168,4 +181,5 @@ async def delete_feedback(feedback: FeedbackId):
 
 
 if __name__ == "__main__":
+    opea_microservices["opea_service@feedback_mongo"].add_startup_event(FeedbackStore.create_indexes())
     opea_microservices["opea_service@feedback_mongo"].start()
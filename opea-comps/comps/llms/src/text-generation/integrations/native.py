@@ -15,16 +15,19 @@ import sys
 
 sys.path.append("/test/GenAIComps/")
 
+import json
 import os
 import threading
 import time
 
 import torch
+from fastapi.responses import StreamingResponse
 from langchain_core.prompts import PromptTemplate
 
 from comps import CustomLogger, GeneratedDoc, OpeaComponent, OpeaComponentRegistry, ServiceType
 from comps.cores.proto.api_protocol import ChatCompletionRequest
 
+from .native_scheduler import BatchScheduler
 from .template import ChatTemplate
 from .utils import initialize_model
 
@@ -33,6 +36,12 @@ logflag = os.getenv("LOGFLAG", False)
 
 MODEL_NAME = os.getenv("LLM_MODEL_ID", "Qwen/Qwen2-7B-Instruct")
 
+# Request batching
+NATIVE_MAX_BATCH_SIZE = int(os.getenv("NATIVE_MAX_BATCH_SIZE", 8))
+NATIVE_BATCH_WAIT_MS = float(os.getenv("NATIVE_BATCH_WAIT_MS", 10))
+NATIVE_BUCKET_WIDTH = int(os.getenv("NATIVE_BUCKET_WIDTH", 128))
+NATIVE_MAX_INPUT_TOKENS = int(os.getenv("NATIVE_MAX_INPUT_TOKENS", 0))
+
 input_sentences = [
     "DeepSpeed is a machine learning framework",
     "He is working on",
@@ -115,6 +124,7 @@ model = None
 assistant_model = None
 tokenizer = None
 generation_config = None
+scheduler = None
 args = Args(**args_dict)
 initialization_lock = threading.Lock()
 initialized = False
@@ -176,7 +186,7 @@ def generate(
 
 
 def initialize():
-    global model, assistant_model, tokenizer, generation_config, initialized
+    global model, assistant_model, tokenizer, generation_config, scheduler, initialized
     with initialization_lock:
         if not initialized:
             # initialize model and tokenizer
@@ -197,6 +207,21 @@ def initialize():
             logger.info("[llm - native] Ready to inference")
             res = generate(["What is Deep Learning?"])
             logger.info(f"[llm - native] test result: {res}")
+            scheduler = BatchScheduler(
+                model,
+                tokenizer,
+                generation_config,
+                max_batch_size=NATIVE_MAX_BATCH_SIZE,
+                max_wait=NATIVE_BATCH_WAIT_MS / 1000,
+                bucket_width=NATIVE_BUCKET_WIDTH,
+                max_input_tokens=NATIVE_MAX_INPUT_TOKENS or None,
+                generate_kwargs={
+                    "assistant_model": assistant_model,
+                    "lazy_mode": True,
+                    "hpu_graphs": True,
+                    "ignore_eos": True,
+                },
+            )
             initialized = True
 
 
@@ -262,8 +287,33 @@ class OpeaTextGenNative(OpeaComponent):
         else:
             if input.documents:
                 prompt = ChatTemplate.generate_rag_prompt(message, input.documents)
-        res = generate([prompt])
+
+        if input.stream:
+
+            async def stream_generator():
+                first = True
+                async for text, finish_reason in scheduler.stream(prompt, input.max_tokens):
+                    if logflag:
+                        logger.info(f"[llm - native] chunk: {text}")
+                    # the role goes in the first delta only; the last chunk carries just the finish reason
+                    delta = {"role": "assistant"} if first else {}
+                    if finish_reason is None:
+                        delta["content"] = text
+                    first = False
+                    chunk = {
+                        "object": "chat.completion.chunk",
+                        "model": MODEL_NAME,
+                        "created": int(time.time()),
+                        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+                    }
+                    yield f"data: {json.dumps(chunk)}\n\n"
+                yield "data: [DONE]\n\n"
+
+            return StreamingResponse(stream_generator(), media_type="text/event-stream")
+
+        # queued and batched with concurrent requests on the scheduler thread
+        res = await scheduler.generate(prompt, input.max_tokens)
 
         if logflag:
             logger.info(f"[llm - native] inference result: {res}")
-        return GeneratedDoc(text=res[0], prompt=message)
+        return GeneratedDoc(text=res, prompt=message)
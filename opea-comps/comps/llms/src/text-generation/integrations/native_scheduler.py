@@ -0,0 +1,313 @@
+# Copyright (C) 2024 Intel Corporation
+# SPDX-License-Identifier: Apache-2.0
+
+import asyncio
+import copy
+import threading
+import time
+from collections import deque
+from typing import AsyncIterator, Optional, Tuple
+
+import torch
+from prometheus_client import Histogram
+
+from comps import CustomLogger
+
+logger = CustomLogger("opea_textgen_native_scheduler")
+
+batch_size_histogram = Histogram(
+    "opea_textgen_native_batch_size",
+    "Requests generated together in one batch",
+    buckets=(1, 2, 4, 8, 16, 32, 64),
+)
+queue_seconds = Histogram(
+    "opea_textgen_native_queue_seconds",
+    "Time a request waited before its batch started",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+
+
+class _End:
+    """Last item of a stream, with the OpenAI finish reason: "stop" or "length"."""
+
+    def __init__(self, finish_reason: str):
+        self.finish_reason = finish_reason
+
+
+class _Request:
+    def __init__(self, prompt: str, max_new_tokens: int, loop, stream: bool):
+        self.prompt = prompt
+        self.max_new_tokens = max_new_tokens
+        self.loop = loop
+        self.future = None if stream else loop.create_future()
+        self.queue = asyncio.Queue() if stream else None
+        self.length = None  # prompt tokens, set by the worker
+        self.enqueued = time.perf_counter()
+
+
+class _BatchStreamer:
+    """Receives the token ids of each generation step and forwards new text to streaming requests."""
+
+    def __init__(self, scheduler: "BatchScheduler", requests):
+        self.scheduler = scheduler
+        self.requests = requests
+        self.tokens = [[] for _ in requests]
+        self.sent = [""] * len(requests)
+        self.done = [request.queue is None for request in requests]
+        self.started = False
+
+    def put(self, value) -> None:
+        if not self.started:  # the first call carries the prompt
+            self.started = True
+            return
+        for row, token in enumerate(value.view(-1).tolist()[: len(self.requests)]):
+            if self.done[row]:
+                continue
+            request = self.requests[row]
+            if token == self.scheduler.tokenizer.eos_token_id:
+                self.finish(row, "stop")
+                continue
+            self.tokens[row].append(token)
+            text = self.scheduler.tokenizer.decode(self.tokens[row], skip_special_tokens=True)
+            # hold back incomplete multi-byte characters
+            if not text.endswith("\ufffd") and len(text) > len(self.sent[row]):
+                self.scheduler._emit(request, text[len(self.sent[row]) :])
+                self.sent[row] = text
+            if len(self.tokens[row]) >= request.max_new_tokens:
+                self.finish(row, "length")
+
+    def finish(self, row: int, finish_reason: str) -> None:
+        if self.done[row]:
+            return
+        self.done[row] = True
+        text = self.scheduler.tokenizer.decode(self.tokens[row], skip_special_tokens=True)
+        if len(text) > len(self.sent[row]):
+            self.scheduler._emit(self.requests[row], text[len(self.sent[row]) :])
+        self.scheduler._emit(self.requests[row], _End(finish_reason))
+
+    def end(self) -> None:
+        # generation stopped before these rows reached EOS or their limit, e.g. on a stop string
+        for row in range(len(self.requests)):
+            self.finish(row, "stop")
+
+
+class BatchScheduler:
+    """Batches concurrent generation requests for one model and runs them on a dedicated thread.
+
+    Prompts are queued and grouped by length bucket: prompts whose token counts
+    round up to the same multiple of ``bucket_width`` are left-padded to that
+    length and generated together, up to ``max_batch_size`` at a time. The batch
+    dimension is padded to a power of two when ``pad_batch`` is set, so static
+    shape backends such as HPU graphs see a small set of shapes. The oldest
+    request's bucket goes first; a batch waits at most ``max_wait`` seconds to
+    fill, and the next batch forms while the current one runs.
+
+    Each batch generates the largest ``max_new_tokens`` of its requests, capped
+    by the generation config; every request gets its own tokens, cut at its own
+    limit and at the end-of-sequence token. Streaming requests receive text as
+    it is generated. ``generate_kwargs`` are passed to ``model.generate`` as they
+    are, e.g. the HPU options of optimum-habana; any causal LM from transformers
+    works without them.
+    """
+
+    def __init__(
+        self,
+        model,
+        tokenizer,
+        generation_config,
+        max_batch_size: int = 8,
+        max_wait: float = 0.01,
+        bucket_width: int = 128,
+        max_input_tokens: Optional[int] = None,
+        pad_batch: bool = True,
+        generate_kwargs: Optional[dict] = None,
+    ):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.generation_config = generation_config
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.bucket_width = bucket_width
+        self.max_input_tokens = max_input_tokens
+        self.pad_batch = pad_batch
+        self.generate_kwargs = generate_kwargs or {}
+        # decoder-only models generate after the prompt, so pad on the left
+        self.tokenizer.padding_side = "left"
+        if self.tokenizer.pad_token is None:
+            self.tokenizer.pad_token = self.tokenizer.eos_token
+
+        self._inbox = deque()  # requests not tokenized yet
+        self._waiting = deque()  # tokenized requests, oldest first
+        self._condition = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="textgen-native-scheduler", daemon=True)
+        self._thread.start()
+
+    async def generate(self, prompt: str, max_new_tokens: Optional[int] = None) -> str:
+        """The prompt followed by its generated text, like ``batch_decode`` of the full sequence."""
+        request = self._submit(prompt, max_new_tokens, stream=False)
+        return await request.future
+
+    async def stream(
+        self, prompt: str, max_new_tokens: Optional[int] = None
+    ) -> AsyncIterator[Tuple[str, Optional[str]]]:
+        """``(text, finish_reason)`` pieces of the generated text (without the prompt) as they are produced.
+
+        ``finish_reason`` is None until the last piece, which has no text and a
+        reason of "stop" (end-of-sequence) or "length" (``max_new_tokens``).
+        """
+        request = self._submit(prompt, max_new_tokens, stream=True)
+        while True:
+            item = await request.queue.get()
+            if isinstance(item, _End):
+                yield "", item.finish_reason
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item, None
+
+    def close(self) -> None:
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._thread.join()
+
+    def _submit(self, prompt: str, max_new_tokens: Optional[int], stream: bool) -> _Request:
+        if self._closed:
+            raise RuntimeError("The scheduler is closed")
+        limit = self.generation_config.max_new_tokens
+        max_new_tokens = min(max_new_tokens, limit) if max_new_tokens else limit
+        request = _Request(prompt, max_new_tokens, asyncio.get_running_loop(), stream)
+        with self._condition:
+            self._inbox.append(request)
+            self._condition.notify()
+        return request
+
+    def _bucket(self, length: int) -> int:
+        return max(1, -(-length // self.bucket_width)) * self.bucket_width
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._inbox and not self._waiting and not self._closed:
+                    self._condition.wait()
+                if self._closed:
+                    break
+            self._admit()
+            batch = self._take_batch()
+            if batch:
+                self._execute(batch)
+        for request in list(self._inbox) + list(self._waiting):
+            self._fail(request, RuntimeError("The scheduler is closed"))
+
+    def _admit(self) -> None:
+        """Tokenize new requests and wait for the oldest bucket to fill, at most ``max_wait``."""
+        while True:
+            with self._condition:
+                arrived = list(self._inbox)
+                self._inbox.clear()
+            for request in arrived:
+                try:
+                    request.length = len(self.tokenizer(request.prompt)["input_ids"])
+                    if self.max_input_tokens and request.length > self.max_input_tokens:
+                        raise ValueError(
+                            f"Prompt has {request.length} tokens, more than the {self.max_input_tokens} allowed"
+                        )
+                    self._waiting.append(request)
+                except Exception as e:
+                    self._fail(request, e)
+            if not self._waiting:
+                return
+            bucket = self._bucket(self._waiting[0].length)
+            filled = sum(1 for request in self._waiting if self._bucket(request.length) == bucket)
+            remaining = self._waiting[0].enqueued + self.max_wait - time.perf_counter()
+            if filled >= self.max_batch_size or remaining <= 0:
+                return
+            with self._condition:
+                if not self._inbox and not self._closed:
+                    self._condition.wait(remaining)
+                if self._closed:
+                    return
+
+    def _take_batch(self):
+        if not self._waiting:
+            return []
+        bucket = self._bucket(self._waiting[0].length)
+        batch, rest = [], deque()
+        for request in self._waiting:
+            if len(batch) < self.max_batch_size and self._bucket(request.length) == bucket:
+                batch.append(request)
+            else:
+                rest.append(request)
+        self._waiting = rest
+        return batch
+
+    def _execute(self, batch) -> None:
+        started = time.perf_counter()
+        batch_size_histogram.observe(len(batch))
+        for request in batch:
+            queue_seconds.observe(started - request.enqueued)
+        try:
+            length = self._bucket(batch[0].length)
+            prompts = [request.prompt for request in batch]
+            if self.pad_batch:
+                size = 1 << (len(batch) - 1).bit_length()
+                prompts += [prompts[0]] * (min(size, max(self.max_batch_size, len(batch))) - len(batch))
+            inputs = self.tokenizer(
+                prompts,
+                return_tensors="pt",
+                padding="max_length",
+                max_length=length,
+                return_token_type_ids=False,
+            )
+            inputs = {name: tensor.to(self.model.device) for name, tensor in inputs.items()}
+            config = copy.deepcopy(self.generation_config)
+            config.max_new_tokens = max(request.max_new_tokens for request in batch)
+            streaming = any(request.queue is not None for request in batch)
+            streamer = _BatchStreamer(self, batch) if streaming else None
+            with torch.no_grad():
+                outputs = self.model.generate(
+                    **inputs, generation_config=config, streamer=streamer, **self.generate_kwargs
+                ).cpu()
+            if streamer is not None:
+                streamer.end()
+        except Exception as e:
+            logger.error(f"Generation of a batch of {len(batch)} failed: {e}")
+            for request in batch:
+                self._fail(request, e)
+            return
+
+        eos = self.tokenizer.eos_token_id
+        for row, request in enumerate(batch):
+            if request.future is None:
+                continue
+            generated = outputs[row, length : length + request.max_new_tokens].tolist()
+            if eos in generated:
+                generated = generated[: generated.index(eos)]
+            text = self.tokenizer.decode(outputs[row, :length].tolist() + generated, skip_special_tokens=True)
+            self._emit(request, text)
+        logger.info(
+            f"[ scheduler ] batch of {len(batch)} at {length} input tokens took {time.perf_counter() - started:.3f}s"
+        )
+
+    def _emit(self, request: _Request, item) -> None:
+        """Hand a result, a stream piece, ``_End`` or an exception to the request's event loop."""
+        if request.queue is not None:
+            request.loop.call_soon_threadsafe(request.queue.put_nowait, item)
+        elif isinstance(item, BaseException):
+            request.loop.call_soon_threadsafe(_set_exception, request.future, item)
+        else:
+            request.loop.call_soon_threadsafe(_set_result, request.future, item)
+
+    def _fail(self, request: _Request, error: BaseException) -> None:
+        self._emit(request, error)
+
+
+def _set_result(future, result) -> None:
+    if not future.done():  # the caller may have gone away
+        future.set_result(result)
+
+
+def _set_exception(future, error) -> None:
+    if not future.done():
+        future.set_exception(error)
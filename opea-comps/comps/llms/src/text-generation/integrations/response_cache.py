@@ -0,0 +1,342 @@
+# Copyright (C) 2024 Intel Corporation
+# SPDX-License-Identifier: Apache-2.0
+
+import hashlib
+import json
+import re
+import time
+import unicodedata
+import uuid
+from collections import OrderedDict, deque
+from typing import AsyncIterator, Awaitable, Callable, List, Optional
+
+import numpy as np
+from prometheus_client import Counter, Gauge
+
+from comps.cores.mega.logger import CustomLogger
+
+logger = CustomLogger("opea_llm_response_cache")
+
+cache_requests = Counter(
+    "opea_llm_cache_requests", "LLM requests by cache result: exact_hit, semantic_hit, miss or bypass", ["result"]
+)
+cache_evictions = Counter("opea_llm_cache_evictions", "Cached LLM responses evicted, by reason", ["reason"])
+cache_bytes = Gauge("opea_llm_cache_bytes", "Bytes held by the LLM response cache")
+cache_entries = Gauge("opea_llm_cache_entries", "Responses held by the LLM response cache")
+
+# generation parameters that change the output; anything else is ignored for keying
+KEY_PARAMS = (
+    "echo",
+    "frequency_penalty",
+    "max_tokens",
+    "n",
+    "presence_penalty",
+    "response_format",
+    "seed",
+    "stop",
+    "suffix",
+    "temperature",
+    "top_p",
+)
+
+# (texts) => embeddings, one per text
+Embed = Callable[[List[str]], Awaitable[List[List[float]]]]
+
+
+def normalize_text(text: str) -> str:
+    """NFC, with runs of whitespace collapsed and the ends trimmed."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def _normalize_content(content):
+    if isinstance(content, str):
+        return normalize_text(content)
+    return content  # multimodal content parts are keyed as they are
+
+
+def _digest(value) -> str:
+    return hashlib.sha256(json.dumps(value, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class CacheTicket:
+    """What a lookup learned about a request, so its response can be stored under the same keys."""
+
+    def __init__(self, kind: str, key: str, partition: Optional[str], vector: Optional[np.ndarray]):
+        self.kind = kind
+        self.key = key
+        self.partition = partition
+        self.vector = vector
+
+
+class _Entry:
+    __slots__ = ("payload", "size", "expires", "partition", "vector")
+
+    def __init__(self, payload: dict, size: int, expires: float, partition, vector):
+        self.payload = payload
+        self.size = size
+        self.expires = expires
+        self.partition = partition
+        self.vector = vector
+
+
+class ResponseCache:
+    """Cache of complete LLM responses with exact and optional semantic lookup.
+
+    Responses are keyed by the normalized messages or prompt, the model and the
+    generation parameters in ``KEY_PARAMS``. Only requests that are repeatable
+    are cached: a fixed ``seed`` or a temperature of at most ``max_temperature``.
+    When ``embed`` is given, an exact miss falls back to the cached response
+    whose last user message (or prompt) is most similar, if the cosine
+    similarity reaches ``threshold`` and everything else about the request is
+    the same. Entries expire after ``ttl`` seconds, and the least recently used
+    go first once ``max_bytes`` is exceeded. Meant to be used from one event loop.
+
+    Responses are stored in a neutral form (``kind``, ``model``, ``choices``
+    with ``text`` and ``finish_reason``, ``usage``) from which both a full
+    response and a stream of chunks are rebuilt.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int,
+        ttl: float = 3600,
+        embed: Optional[Embed] = None,
+        threshold: float = 0.95,
+        max_temperature: float = 0.01,
+    ):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.embed = embed
+        self.threshold = threshold
+        self.max_temperature = max_temperature
+        self.bytes = 0
+        self._entries = OrderedDict()  # key => _Entry, least recently used first
+        self._expiry = deque()  # (expires, key) in insertion order, which is expiry order
+        self._partitions = {}  # partition => {key: vector}
+
+    def cacheable(self, params: dict) -> bool:
+        if params.get("seed") is not None:
+            return True
+        temperature = params.get("temperature")
+        return temperature is not None and temperature <= self.max_temperature
+
+    async def lookup(self, kind: str, model: str, prompt, params: dict):
+        """``(payload, ticket)`` for a request; ``payload`` is None on a miss, ``ticket`` None when bypassed.
+
+        ``kind`` is "chat" with a list of messages as ``prompt`` or "completion" with a string.
+        """
+        if not self.cacheable(params):
+            cache_requests.labels("bypass").inc()
+            return None, None
+        self._expire()
+
+        params = {name: params.get(name) for name in KEY_PARAMS}
+        if kind == "chat":
+            messages = [{"role": m.get("role"), "content": _normalize_content(m.get("content"))} for m in prompt]
+            key = _digest([kind, model, params, messages])
+            last = messages[-1] if messages else None
+            query = last["content"] if last and last["role"] == "user" and isinstance(last["content"], str) else None
+            context = messages[:-1]
+        else:
+            query = normalize_text(prompt) if isinstance(prompt, str) else None
+            key = _digest([kind, model, params, query if query is not None else prompt])
+            context = []
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            cache_requests.labels("exact_hit").inc()
+            return entry.payload, None
+
+        partition = vector = None
+        if self.embed is not None and query:
+            partition = _digest([kind, model, params, context])
+            try:
+                vector = np.asarray((await self.embed([query]))[0], dtype=np.float32)
+                vector /= max(float(np.linalg.norm(vector)), 1e-12)
+            except Exception as e:
+                logger.error(f"Failed to embed the request for semantic lookup: {e}")
+                partition = None
+            if vector is not None:
+                candidates = self._partitions.get(partition)
+                if candidates:
+                    keys = list(candidates)
+                    scores = np.stack([candidates[k] for k in keys]) @ vector
+                    best = int(np.argmax(scores))
+                    if scores[best] >= self.threshold:
+                        self._entries.move_to_end(keys[best])
+                        cache_requests.labels("semantic_hit").inc()
+                        return self._entries[keys[best]].payload, None
+
+        cache_requests.labels("miss").inc()
+        return None, CacheTicket(kind, key, partition, vector)
+
+    def store(self, ticket: CacheTicket, payload: dict) -> None:
+        """Cache the response of a missed request, unless some choice did not finish cleanly."""
+        if not payload["choices"] or any(
+            choice["finish_reason"] in (None, "tool_calls", "function_call") for choice in payload["choices"]
+        ):
+            return
+        size = len(json.dumps(payload)) + len(ticket.key)
+        if ticket.vector is not None:
+            size += ticket.vector.nbytes
+        if size > self.max_bytes:
+            return
+        self._remove(ticket.key)
+        expires = time.monotonic() + self.ttl
+        self._entries[ticket.key] = _Entry(payload, size, expires, ticket.partition, ticket.vector)
+        self._expiry.append((expires, ticket.key))
+        if ticket.vector is not None:
+            self._partitions.setdefault(ticket.partition, {})[ticket.key] = ticket.vector
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            cache_evictions.labels("size").inc()
+        self._update_gauges()
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self.bytes -= entry.size
+        if entry.vector is not None:
+            candidates = self._partitions[entry.partition]
+            del candidates[key]
+            if not candidates:
+                del self._partitions[entry.partition]
+
+    def _expire(self) -> None:
+        now = time.monotonic()
+        expired = False
+        while self._expiry and self._expiry[0][0] <= now:
+            expires, key = self._expiry.popleft()
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires == expires:  # not replaced since
+                self._remove(key)
+                cache_evictions.labels("ttl").inc()
+                expired = True
+        if expired:
+            self._update_gauges()
+
+    def _update_gauges(self) -> None:
+        cache_bytes.set(self.bytes)
+        cache_entries.set(len(self._entries))
+
+
+def payload_from_response(kind: str, response) -> dict:
+    """Neutral form of a non-streamed ChatCompletion or Completion."""
+    choices = []
+    for choice in response.choices:
+        if kind == "chat":
+            if choice.message.content is None:  # tool calls and the like
+                return {"kind": kind, "model": response.model, "choices": [], "usage": None}
+            text = choice.message.content
+        else:
+            text = choice.text
+        choices.append({"index": choice.index, "text": text, "finish_reason": choice.finish_reason})
+    usage = response.usage.model_dump() if response.usage else None
+    return {"kind": kind, "model": response.model, "choices": choices, "usage": usage}
+
+
+class StreamRecorder:
+    """Collects the chunks of a streamed response into the neutral form."""
+
+    def __init__(self, kind: str):
+        self.kind = kind
+        self.model = None
+        self.usage = None
+        self.choices = {}  # index => {"index", "text" parts, "finish_reason"}
+
+    def add(self, chunk) -> None:
+        self.model = chunk.model
+        if getattr(chunk, "usage", None):
+            self.usage = chunk.usage.model_dump()
+        for choice in chunk.choices:
+            recorded = self.choices.setdefault(choice.index, {"index": choice.index, "text": [], "finish_reason": None})
+            if self.kind == "chat":
+                if choice.delta.tool_calls or choice.delta.function_call:
+                    recorded["finish_reason"] = "tool_calls"
+                text = choice.delta.content
+            else:
+                text = choice.text
+            if text:
+                recorded["text"].append(text)
+            if choice.finish_reason:
+                recorded["finish_reason"] = choice.finish_reason
+
+    def payload(self) -> dict:
+        choices = [
+            {"index": choice["index"], "text": "".join(choice["text"]), "finish_reason": choice["finish_reason"]}
+            for _, choice in sorted(self.choices.items())
+        ]
+        return {"kind": self.kind, "model": self.model, "choices": choices, "usage": self.usage}
+
+
+def build_response(payload: dict) -> dict:
+    """A ChatCompletion or Completion body equivalent to the cached response."""
+    created = int(time.time())
+    if payload["kind"] == "chat":
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": created,
+            "model": payload["model"],
+            "choices": [
+                {
+                    "index": choice["index"],
+                    "message": {"role": "assistant", "content": choice["text"]},
+                    "finish_reason": choice["finish_reason"],
+                    "logprobs": None,
+                }
+                for choice in payload["choices"]
+            ],
+            "usage": payload["usage"],
+        }
+    return {
+        "id": f"cmpl-{uuid.uuid4().hex}",
+        "object": "text_completion",
+        "created": created,
+        "model": payload["model"],
+        "choices": [
+            {"index": choice["index"], "text": choice["text"], "finish_reason": choice["finish_reason"], "logprobs": None}
+            for choice in payload["choices"]
+        ],
+        "usage": payload["usage"],
+    }
+
+
+async def replay_stream(payload: dict, include_usage: bool = False) -> AsyncIterator[str]:
+    """Server-sent events replaying a cached response in the chunk format of the upstream stream.
+
+    The text is sent a word at a time, then a chunk with the finish reason of
+    each choice, the usage chunk when requested, and ``[DONE]``.
+    """
+    chat = payload["kind"] == "chat"
+    base = {
+        "id": f"chatcmpl-{uuid.uuid4().hex}" if chat else f"cmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion.chunk" if chat else "text_completion",
+        "created": int(time.time()),
+        "model": payload["model"],
+    }
+
+    def event(choices, usage=None) -> str:
+        return f"data: {json.dumps({**base, 'choices': choices, 'usage': usage})}\n\n"
+
+    def choice(index, text=None, finish_reason=None, role=None) -> dict:
+        if chat:
+            delta = {"role": role} if role else {}
+            if text is not None:
+                delta["content"] = text
+            return {"index": index, "delta": delta, "finish_reason": finish_reason, "logprobs": None}
+        return {"index": index, "text": text or "", "finish_reason": finish_reason, "logprobs": None}
+
+    for cached in payload["choices"]:
+        if chat:
+            yield event([choice(cached["index"], "", role="assistant")])
+        for piece in re.findall(r"\s*\S+\s*?(?=\s|$)|\s+$", cached["text"]):
+            yield event([choice(cached["index"], piece)])
+    for cached in payload["choices"]:
+        yield event([choice(cached["index"], finish_reason=cached["finish_reason"])])
+    if include_usage and payload["usage"]:
+        yield event([], payload["usage"])
+    yield "data: [DONE]\n\n"
@@ -8,6 +8,8 @@ from typing import Union
 from fastapi.responses import StreamingResponse
 from langchain_core.prompts import PromptTemplate
 from openai import AsyncOpenAI
+from openai.types import Completion
+from openai.types.chat import ChatCompletion
 
 # ----------------------------------------------------------------------------------------------
 
@@ -26,6 +28,7 @@ from comps.cores.mega.constants import ServiceType
 from comps.cores.mega.utils import ConfigError, get_access_token, load_model_configs
 from comps.cores.proto.api_protocol import ChatCompletionRequest
 
+from .response_cache import ResponseCache, StreamRecorder, build_response, payload_from_response, replay_stream
 from .template import ChatTemplate
 
 logger = CustomLogger("opea_llm")
@@ -40,6 +43,15 @@ CLIENTID = os.getenv("CLIENTID")
 CLIENT_SECRET = os.getenv("CLIENT_SECRET")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "EMPTY")
 
+# Response cache; disabled unless LLM_CACHE_MAX_BYTES is set
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", 0))
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", 3600))
+LLM_CACHE_MAX_TEMPERATURE = float(os.getenv("LLM_CACHE_MAX_TEMPERATURE", 0.01))
+# semantic lookup through an OpenAI compatible embeddings endpoint, e.g. TEI
+LLM_CACHE_EMBEDDING_ENDPOINT = os.getenv("LLM_CACHE_EMBEDDING_ENDPOINT")
+LLM_CACHE_EMBEDDING_MODEL = os.getenv("LLM_CACHE_EMBEDDING_MODEL", "")
+LLM_CACHE_SIMILARITY_THRESHOLD = float(os.getenv("LLM_CACHE_SIMILARITY_THRESHOLD", 0.95))
+
 # Validate and Load the models config if MODEL_CONFIGS is not null
 configs_map = {}
 if MODEL_CONFIGS:
@@ -71,6 +83,7 @@ class OpeaTextGenService(OpeaComponent):
     def __init__(self, name: str, description: str, config: dict = None):
         super().__init__(name, ServiceType.LLM.name.lower(), description, config)
         self.client = self._initialize_client()
+        self.cache = self._initialize_cache()
         health_status = self.check_health()
         if not health_status:
             logger.error("OpeaTextGenService health check failed.")
@@ -86,6 +99,30 @@ class OpeaTextGenService(OpeaComponent):
         llm_endpoint = get_llm_endpoint()
         return AsyncOpenAI(api_key=OPENAI_API_KEY, base_url=llm_endpoint + "/v1", timeout=600, default_headers=headers)
 
+    def _initialize_cache(self):
+        """Creates the response cache when it is enabled."""
+        if LLM_CACHE_MAX_BYTES <= 0:
+            return None
+        embed = None
+        if LLM_CACHE_EMBEDDING_ENDPOINT:
+            embedding_client = AsyncOpenAI(api_key=OPENAI_API_KEY, base_url=LLM_CACHE_EMBEDDING_ENDPOINT + "/v1")
+
+            async def embed(texts):
+                response = await embedding_client.embeddings.create(model=LLM_CACHE_EMBEDDING_MODEL, input=texts)
+                return [item.embedding for item in response.data]
+
+        logger.info(
+            f"LLM response cache enabled: {LLM_CACHE_MAX_BYTES} bytes, ttl {LLM_CACHE_TTL_SECONDS}s, "
+            f"semantic lookup {'on' if embed else 'off'}"
+        )
+        return ResponseCache(
+            LLM_CACHE_MAX_BYTES,
+            LLM_CACHE_TTL_SECONDS,
+            embed,
+            LLM_CACHE_SIMILARITY_THRESHOLD,
+            LLM_CACHE_MAX_TEMPERATURE,
+        )
+
     def check_health(self) -> bool:
         """Checks the health of the TGI/vLLM LLM service.
 
@@ -213,6 +250,10 @@ class OpeaTextGenService(OpeaComponent):
 
                     input.messages.insert(0, {"role": "system", "content": system_prompt})
 
+            kind = "chat"
+            cached, ticket = await self._cache_lookup(kind, input.messages, input)
+            if cached is not None:
+                return cached
             chat_completion = await self.client.chat.completions.create(
                 model=MODEL_NAME,
                 messages=input.messages,
@@ -239,6 +280,10 @@ class OpeaTextGenService(OpeaComponent):
                 parallel_tool_calls=input.parallel_tool_calls,"""
         else:
             prompt, input = self.align_input(input, prompt_template, input_variables)
+            kind = "completion"
+            cached, ticket = await self._cache_lookup(kind, prompt, input)
+            if cached is not None:
+                return cached
             chat_completion = await self.client.completions.create(
                 model=MODEL_NAME,
                 prompt=prompt,
@@ -263,16 +308,52 @@ class OpeaTextGenService(OpeaComponent):
         if input.stream:
 
             async def stream_generator():
+                recorder = StreamRecorder(kind) if ticket else None
                 async for c in chat_completion:
                     if logflag:
                         logger.info(c)
+                    if recorder:
+                        recorder.add(c)
                     chunk = c.model_dump_json()
                     if chunk not in ["<|im_end|>", "<|endoftext|>"]:
                         yield f"data: {chunk}\n\n"
+                # only streams that ran to the end are cached
+                if recorder:
+                    self.cache.store(ticket, recorder.payload())
                 yield "data: [DONE]\n\n"
 
             return StreamingResponse(stream_generator(), media_type="text/event-stream")
         else:
             if logflag:
                 logger.info(chat_completion)
+            if ticket:
+                self.cache.store(ticket, payload_from_response(kind, chat_completion))
             return chat_completion
+
+    async def _cache_lookup(self, kind, prompt, input):
+        """Returns ``(cached response, ticket)``; the ticket is set when the response should be stored."""
+        if self.cache is None:
+            return None, None
+        params = {
+            "echo": getattr(input, "echo", None),
+            "frequency_penalty": input.frequency_penalty,
+            "max_tokens": input.max_tokens,
+            "n": input.n,
+            "presence_penalty": input.presence_penalty,
+            "response_format": input.response_format,
+            "seed": input.seed,
+            "stop": input.stop,
+            "suffix": getattr(input, "suffix", None),
+            "temperature": input.temperature,
+            "top_p": input.top_p,
+        }
+        payload, ticket = await self.cache.lookup(kind, MODEL_NAME, prompt, params)
+        if payload is None:
+            return None, ticket
+        if logflag:
+            logger.info(f"[ cache ] hit for {kind} request")
+        if input.stream:
+            include_usage = bool(input.stream_options and input.stream_options.include_usage)
+            return StreamingResponse(replay_stream(payload, include_usage), media_type="text/event-stream"), None
+        response = build_response(payload)
+        return (ChatCompletion if kind == "chat" else Completion).construct(**response), None
@@ -0,0 +1,171 @@
+# Copyright (C) 2024 Intel Corporation
+# SPDX-License-Identifier: Apache-2.0
+
+"""CPU tests of the batch scheduler with a tiny randomly initialized GPT-2."""
+
+import asyncio
+
+import pytest
+
+torch = pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+tokenizers = pytest.importorskip("tokenizers")
+
+from .native_scheduler import BatchScheduler  # noqa: E402
+
+VOCAB = 60  # w0 .. w59, then <pad> and <unk>
+PAD = VOCAB
+
+
+def make_tokenizer(eos_token="<pad>"):
+    vocab = {f"w{i}": i for i in range(VOCAB)}
+    vocab.update({"<pad>": PAD, "<unk>": PAD + 1})
+    backend = tokenizers.Tokenizer(tokenizers.models.WordLevel(vocab, unk_token="<unk>"))
+    backend.pre_tokenizer = tokenizers.pre_tokenizers.Whitespace()
+    return transformers.PreTrainedTokenizerFast(
+        tokenizer_object=backend, pad_token="<pad>", unk_token="<unk>", eos_token=eos_token
+    )
+
+
+@pytest.fixture(scope="module")
+def model():
+    torch.manual_seed(0)
+    config = transformers.GPT2Config(vocab_size=VOCAB + 2, n_positions=128, n_embd=32, n_layer=2, n_head=2)
+    return transformers.GPT2LMHeadModel(config).eval()
+
+
+def generation_config(tokenizer, max_new_tokens=12):
+    return transformers.GenerationConfig(
+        max_new_tokens=max_new_tokens,
+        do_sample=False,
+        eos_token_id=tokenizer.eos_token_id,
+        pad_token_id=tokenizer.pad_token_id,
+    )
+
+
+def reference(model, tokenizer, prompt, max_new_tokens, prompt_included=True):
+    """The prompt and its greedy continuation, generated on its own."""
+    inputs = tokenizer(prompt, return_tensors="pt", return_token_type_ids=False)
+    outputs = model.generate(**inputs, generation_config=generation_config(tokenizer, max_new_tokens))[0]
+    if not prompt_included:
+        outputs = outputs[inputs["input_ids"].shape[1] :]
+    return tokenizer.decode(outputs, skip_special_tokens=True)
+
+
+def count_generate_calls(model, monkeypatch):
+    calls = []
+    generate = model.generate
+
+    def counted(*args, **kwargs):
+        calls.append(kwargs["input_ids"].shape)
+        return generate(*args, **kwargs)
+
+    monkeypatch.setattr(model, "generate", counted)
+    return calls
+
+
+def run(scheduler, main):
+    try:
+        return asyncio.run(main())
+    finally:
+        scheduler.close()
+
+
+async def collect(stream):
+    return [item async for item in stream]
+
+
+def test_mixed_max_new_tokens_in_one_batch(model, monkeypatch):
+    tokenizer = make_tokenizer()
+    prompts = {"w1 w2 w3": 5, "w5": 12, "w7 w8 w9 w10 w11 w12": 3, "w3 w3": 9}
+    expected = [reference(model, tokenizer, prompt, limit) for prompt, limit in prompts.items()]
+    scheduler = BatchScheduler(
+        model, tokenizer, generation_config(tokenizer), max_batch_size=4, max_wait=0.2, bucket_width=8
+    )
+    calls = count_generate_calls(model, monkeypatch)
+
+    async def all_prompts():
+        return await asyncio.gather(*[scheduler.generate(prompt, limit) for prompt, limit in prompts.items()])
+
+    results = run(scheduler, all_prompts)
+
+    assert results == expected
+    assert len(calls) == 1
+
+
+def test_eos_stops_its_row_only(model):
+    # make a token that "w1 w2 w3" greedily generates a few steps in the end-of-sequence token
+    tokenizer = make_tokenizer()
+    inputs = tokenizer("w1 w2 w3", return_tensors="pt", return_token_type_ids=False)
+    generated = model.generate(**inputs, generation_config=generation_config(tokenizer, 8))[0, 3:].tolist()
+    eos = next(
+        token for step, token in enumerate(generated) if step >= 2 and token < VOCAB and token not in generated[:step]
+    )
+    tokenizer = make_tokenizer(eos_token=f"w{eos}")
+    other = next(
+        prompt
+        for prompt in (f"w{i}" for i in range(VOCAB))
+        if f"w{eos}" not in reference(model, make_tokenizer(), prompt, 6).split()
+    )
+    scheduler = BatchScheduler(
+        model, tokenizer, generation_config(tokenizer), max_batch_size=4, max_wait=0.2, bucket_width=8
+    )
+
+    async def both():
+        return await asyncio.gather(
+            collect(scheduler.stream("w1 w2 w3", 8)),
+            collect(scheduler.stream(other, 6)),
+            scheduler.generate("w1 w2 w3", 8),
+        )
+
+    stopped, continued, generated_text = run(scheduler, both)
+
+    assert stopped[-1] == ("", "stop")
+    assert continued[-1] == ("", "length")
+    assert "".join(text for text, _ in stopped) == reference(model, tokenizer, "w1 w2 w3", 8, prompt_included=False)
+    assert len("".join(text for text, _ in continued).split()) == 6
+    assert generated_text == reference(model, tokenizer, "w1 w2 w3", 8)
+    assert f"w{eos}" not in generated_text.split()
+
+
+def test_stream_and_generate_in_one_batch(model, monkeypatch):
+    tokenizer = make_tokenizer()
+    expected_stream = reference(model, tokenizer, "w4 w5", 7, prompt_included=False)
+    expected_generate = reference(model, tokenizer, "w9 w8 w7", 4)
+    scheduler = BatchScheduler(
+        model, tokenizer, generation_config(tokenizer), max_batch_size=4, max_wait=0.2, bucket_width=8
+    )
+    calls = count_generate_calls(model, monkeypatch)
+
+    async def both():
+        return await asyncio.gather(collect(scheduler.stream("w4 w5", 7)), scheduler.generate("w9 w8 w7", 4))
+
+    pieces, generated_text = run(scheduler, both)
+
+    assert len(calls) == 1
+    assert all(reason is None for _, reason in pieces[:-1])
+    assert pieces[-1] == ("", "length")
+    assert "".join(text for text, _ in pieces) == expected_stream
+    assert generated_text == expected_generate
+
+
+def test_max_input_tokens_rejects_long_prompts(model):
+    tokenizer = make_tokenizer()
+    scheduler = BatchScheduler(
+        model,
+        tokenizer,
+        generation_config(tokenizer),
+        max_batch_size=4,
+        max_wait=0.05,
+        bucket_width=8,
+        max_input_tokens=4,
+    )
+
+    async def requests():
+        with pytest.raises(ValueError, match="5 tokens"):
+            await scheduler.generate("w1 w2 w3 w4 w5", 4)
+        with pytest.raises(ValueError, match="5 tokens"):
+            await collect(scheduler.stream("w1 w2 w3 w4 w5", 4))
+        return await scheduler.generate("w1 w2 w3 w4", 4)
+
+    assert run(scheduler, requests) == reference(model, tokenizer, "w1 w2 w3 w4", 4)
@@ -0,0 +1,247 @@
+# Copyright (C) 2024 Intel Corporation
+# SPDX-License-Identifier: Apache-2.0
+"""Compare keyword ($text) and semantic prompt search on a synthetic prompt corpus.
+
+Seeds a separate collection with prompts on a fixed set of topics, spread over
+many users, then runs keyword and paraphrased queries against both search
+modes. A result is relevant when it belongs to the query's topic and user.
+
+    python bench_prompt_search.py --prompts 100000 --users 100 --top-k 10
+
+MongoDB is configured like the service (MONGO_HOST, MONGO_PORT, DB_NAME) and an
+embedder through PROMPT_EMBEDDING_ENDPOINT or PROMPT_EMBEDDING_MODEL.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import sys
+import time
+
+from integrations.mongo.mongo_conn import MongoClient
+from integrations.semantic_index import SemanticIndex, get_prompt_embedder
+
+from comps.cores.common.mongo import create_indexes
+
+# topic => (prompt templates, keyword queries, paraphrased queries without the templates' words)
+TOPICS = {
+    "summarize": (
+        [
+            "Summarize the following {subject} report in three bullet points.",
+            "Write a short summary of this {subject} article for busy readers.",
+            "Condense the {subject} meeting notes into key takeaways.",
+        ],
+        ["summary of report"],
+        ["give me the gist of a long document", "boil this text down to the main ideas"],
+    ),
+    "translate": (
+        [
+            "Translate this {subject} paragraph from English to French.",
+            "Provide a German translation of the {subject} product description.",
+            "Translate the {subject} user manual into Spanish, keeping the tone formal.",
+        ],
+        ["translate to French"],
+        ["render this text in another language", "convert my sentence so a speaker of Italian understands it"],
+    ),
+    "sql": (
+        [
+            "Write a SQL query that returns the top customers by {subject} revenue.",
+            "Generate SQL to join the orders and {subject} tables on customer id.",
+            "Optimize this slow SQL query over the {subject} table.",
+        ],
+        ["SQL query join"],
+        ["fetch rows from a relational database", "speed up a select statement on postgres"],
+    ),
+    "email": (
+        [
+            "Draft a polite email declining the {subject} meeting invitation.",
+            "Write a follow-up email to a client about the {subject} proposal.",
+            "Compose an email announcing the {subject} launch to the team.",
+        ],
+        ["draft email client"],
+        ["help me reply to my manager's message", "a courteous note turning down an invite"],
+    ),
+    "debug": (
+        [
+            "Explain why this Python function raises a KeyError when processing {subject} data.",
+            "Find the bug in the following {subject} code and propose a fix.",
+            "Why does my {subject} script crash with a segmentation fault?",
+        ],
+        ["bug fix code"],
+        ["my program throws an exception, what is wrong", "troubleshoot an error in a snippet"],
+    ),
+    "poem": (
+        [
+            "Write a haiku about {subject} in autumn.",
+            "Compose a rhyming poem celebrating {subject}.",
+            "Write a sonnet about the beauty of {subject}.",
+        ],
+        ["poem about autumn"],
+        ["some verses in the style of Basho", "lyrical lines with a rhythm and rhyme"],
+    ),
+    "recipe": (
+        [
+            "Suggest a vegetarian recipe using {subject} and rice.",
+            "Give me a quick dinner recipe with {subject}.",
+            "List the ingredients and steps to bake a {subject} cake.",
+        ],
+        ["dinner recipe ingredients"],
+        ["what should I cook tonight", "how to prepare a meal in the kitchen"],
+    ),
+    "interview": (
+        [
+            "Prepare ten interview questions for a {subject} engineer position.",
+            "Act as an interviewer and ask me about my {subject} experience.",
+            "Give feedback on my answer to a {subject} interview question.",
+        ],
+        ["interview questions engineer"],
+        ["practice for a job screening call", "help me get ready to meet a hiring manager"],
+    ),
+}
+
+SUBJECTS = [
+    "finance",
+    "marketing",
+    "healthcare",
+    "logistics",
+    "retail",
+    "energy",
+    "education",
+    "insurance",
+    "gaming",
+    "travel",
+    "pumpkin",
+    "mountain",
+    "ocean",
+    "coffee",
+    "robotics",
+    "gardening",
+]
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+
+    def at(q):
+        return round(samples[min(int(q * len(samples)), len(samples) - 1)] * 1000, 3)
+
+    mean = round(statistics.mean(samples) * 1000, 3)
+    return {"p50_ms": at(0.5), "p95_ms": at(0.95), "p99_ms": at(0.99), "mean_ms": mean}
+
+
+def recall(hits, relevant, k):
+    if not relevant:
+        return None
+    return len(set(hits) & relevant) / min(k, len(relevant))
+
+
+async def seed(collection, embedder, prompts, users, batch_size, rng):
+    await collection.drop()
+    topics = list(TOPICS)
+    seeded = 0
+    while seeded < prompts:
+        batch = []
+        for _ in range(min(batch_size, prompts - seeded)):
+            topic = rng.choice(topics)
+            text = rng.choice(TOPICS[topic][0]).format(subject=rng.choice(SUBJECTS))
+            # numeric topic so the wildcard text index cannot match the label
+            topic_id = topics.index(topic)
+            batch.append({"prompt_text": text, "user": f"user{rng.randrange(users)}", "topic": topic_id})
+        vectors = await embedder.embed([document["prompt_text"] for document in batch])
+        for document, vector in zip(batch, vectors):
+            document["embedding"] = vector.tolist()
+            document["embedding_model"] = embedder.name
+        await collection.insert_many(batch)
+        seeded += len(batch)
+        print(f"seeded {seeded}/{prompts}", end="\r", file=sys.stderr)
+    print(file=sys.stderr)
+    await create_indexes(collection, [[("user", 1), ("_id", 1)], [("$**", "text")]])
+
+
+async def main(args):
+    embedder = get_prompt_embedder()
+    if embedder is None:
+        sys.exit("Set PROMPT_EMBEDDING_ENDPOINT or PROMPT_EMBEDDING_MODEL to benchmark semantic search")
+    rng = random.Random(args.seed)
+    collection = MongoClient.get_db_client()[args.collection]
+    if not args.reuse or await collection.estimated_document_count() != args.prompts:
+        await seed(collection, embedder, args.prompts, args.users, args.batch_size, rng)
+
+    index = SemanticIndex()
+    topics = list(TOPICS)
+    relevant = {}  # (user, topic) => prompt ids
+    started = time.perf_counter()
+    async for document in collection.find({}, {"user": 1, "topic": 1, "embedding": 1}):
+        prompt_id = str(document["_id"])
+        index.add(document["user"], prompt_id, document["embedding"])
+        relevant.setdefault((document["user"], topics[document["topic"]]), set()).add(prompt_id)
+    build_seconds = time.perf_counter() - started
+
+    queries = []  # (topic, kind, query)
+    for topic, (_, keyword, paraphrased) in TOPICS.items():
+        queries += [(topic, "keyword", query) for query in keyword]
+        queries += [(topic, "paraphrase", query) for query in paraphrased]
+    query_vectors = {}
+    embed_latency = []
+    for _, _, query in queries:
+        started = time.perf_counter()
+        query_vectors[query] = (await embedder.embed([query]))[0]
+        embed_latency.append(time.perf_counter() - started)
+
+    latency = {"text": [], "semantic_index": []}
+    recalls = {(mode, kind): [] for mode in ("text", "semantic") for kind in ("keyword", "paraphrase")}
+    for _ in range(args.rounds):
+        for topic, kind, query in queries:
+            user = f"user{rng.randrange(args.users)}"
+            relevant_ids = relevant.get((user, topic), set())
+
+            started = time.perf_counter()
+            cursor = collection.find({"$text": {"$search": query}, "user": user}, {"score": {"$meta": "textScore"}})
+            documents = await cursor.sort([("score", {"$meta": "textScore"})]).to_list(length=args.top_k)
+            latency["text"].append(time.perf_counter() - started)
+            text_recall = recall([str(document["_id"]) for document in documents], relevant_ids, args.top_k)
+
+            started = time.perf_counter()
+            hits = index.search(user, query_vectors[query], args.top_k)
+            latency["semantic_index"].append(time.perf_counter() - started)
+            semantic_recall = recall([prompt_id for prompt_id, _ in hits], relevant_ids, args.top_k)
+
+            if text_recall is not None:
+                recalls[("text", kind)].append(text_recall)
+                recalls[("semantic", kind)].append(semantic_recall)
+
+    report = {
+        "prompts": args.prompts,
+        "users": args.users,
+        "top_k": args.top_k,
+        "index": {**index.stats(), "build_seconds": round(build_seconds, 3)},
+        "latency": {
+            "text": percentiles(latency["text"]),
+            "semantic_index": percentiles(latency["semantic_index"]),
+            "query_embedding": percentiles(embed_latency),
+        },
+        "recall": {
+            f"{mode}_{kind}": round(statistics.mean(values), 3) if values else None
+            for (mode, kind), values in recalls.items()
+        },
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--prompts", type=int, default=100000)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--rounds", type=int, default=20, help="passes over the query set, each with random users")
+    parser.add_argument("--collection", default="PromptSearchBenchmark")
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--reuse", action="store_true", help="keep an already seeded collection of the same size")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="also write the report to this JSON file")
+    asyncio.run(main(parser.parse_args()))
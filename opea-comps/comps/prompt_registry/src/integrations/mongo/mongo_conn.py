@@ -3,7 +3,7 @@
 
 from typing import Any
 
-import motor.motor_asyncio as motor
+from comps.cores.common.mongo import get_motor_client
 
 from .config import DB_NAME, MONGO_HOST, MONGO_PORT
 
@@ -14,7 +14,8 @@ class MongoClient:
     @staticmethod
     def get_db_client() -> Any:
         try:
-            client = motor.AsyncIOMotorClient(MongoClient.conn_url)
+            # shared by all requests of this process
+            client = get_motor_client(MongoClient.conn_url)
             db = client[DB_NAME]
             return db
 
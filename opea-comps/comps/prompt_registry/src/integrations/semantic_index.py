@@ -0,0 +1,220 @@
+# Copyright (C) 2024 Intel Corporation
+# SPDX-License-Identifier: Apache-2.0
+
+import asyncio
+import os
+import threading
+from collections import OrderedDict
+from typing import List, Optional
+
+import aiohttp
+import numpy as np
+
+from comps import CustomLogger
+
+logger = CustomLogger("prompt_semantic_index")
+
+# OpenAI compatible embeddings endpoint, e.g. the OPEA embedding microservice at http://host:6000/v1/embeddings
+PROMPT_EMBEDDING_ENDPOINT = os.getenv("PROMPT_EMBEDDING_ENDPOINT")
+# sentence-transformers model run in-process when no endpoint is set
+PROMPT_EMBEDDING_MODEL = os.getenv("PROMPT_EMBEDDING_MODEL")
+PROMPT_EMBEDDING_BATCH_SIZE = int(os.getenv("PROMPT_EMBEDDING_BATCH_SIZE", 64))
+# float32 copies of recently searched partitions; numpy has no fast float16 matmul
+PROMPT_INDEX_HOT_BYTES = int(os.getenv("PROMPT_INDEX_HOT_BYTES", 256 * 1024 * 1024))
+
+_SCORE_BLOCK_ROWS = 4096
+
+
+class PromptEmbedder:
+    """Embeds prompt texts through an embeddings endpoint or a local sentence-transformers model."""
+
+    def __init__(self, endpoint: Optional[str] = None, model: Optional[str] = None, batch_size: int = 64):
+        if not endpoint and not model:
+            raise ValueError("Either an embedding endpoint or a model is required")
+        self.endpoint = endpoint
+        self.model_name = model
+        # stored next to each embedding so vectors of another model are never mixed in
+        self.name = endpoint or model
+        self.batch_size = batch_size
+        self._model = None
+        self._session = None
+        self._lock = threading.Lock()
+
+    def _local_model(self):
+        with self._lock:
+            if self._model is None:
+                from sentence_transformers import SentenceTransformer
+
+                self._model = SentenceTransformer(self.model_name)
+            return self._model
+
+    async def _post(self, texts: List[str]) -> List[List[float]]:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=60))
+        async with self._session.post(self.endpoint, json={"input": texts}) as response:
+            response.raise_for_status()
+            data = (await response.json())["data"]
+        return [item["embedding"] for item in sorted(data, key=lambda item: item.get("index", 0))]
+
+    async def embed(self, texts: List[str]) -> np.ndarray:
+        """L2-normalized float32 embeddings of ``texts``, one row per text."""
+        vectors = []
+        for start in range(0, len(texts), self.batch_size):
+            batch = texts[start : start + self.batch_size]
+            if self.endpoint:
+                vectors.extend(await self._post(batch))
+            else:
+                vectors.extend(await asyncio.to_thread(self._local_model().encode, batch))
+        return normalize(np.asarray(vectors, dtype=np.float32))
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class _Partition:
+    """Vectors of one user, packed in a contiguous float16 matrix that grows by doubling.
+
+    ``widened`` is an optional float32 copy of the matrix, kept in step with it,
+    that lets searches skip the float16 conversion.
+    """
+
+    def __init__(self, dim: int, capacity: int = 16):
+        self.vectors = np.empty((capacity, dim), dtype=np.float16)
+        self.widened = None
+        self.ids = []  # row => prompt id
+        self.rows = {}  # prompt id => row
+
+    def add(self, prompt_id: str, vector: np.ndarray) -> None:
+        row = self.rows.get(prompt_id)
+        if row is None:
+            row = len(self.ids)
+            if row == len(self.vectors):
+                grown = np.empty((2 * len(self.vectors), self.vectors.shape[1]), dtype=np.float16)
+                grown[:row] = self.vectors
+                self.vectors = grown
+                self.widened = None
+            self.ids.append(prompt_id)
+            self.rows[prompt_id] = row
+        self.vectors[row] = vector
+        if self.widened is not None:
+            self.widened[row] = self.vectors[row]
+
+    def remove(self, prompt_id: str) -> bool:
+        row = self.rows.pop(prompt_id, None)
+        if row is None:
+            return False
+        # move the last row into the hole so the matrix stays dense
+        last = len(self.ids) - 1
+        last_id = self.ids.pop()
+        if row != last:
+            self.vectors[row] = self.vectors[last]
+            if self.widened is not None:
+                self.widened[row] = self.widened[last]
+            self.ids[row] = last_id
+            self.rows[last_id] = row
+        return True
+
+    def search(self, query: np.ndarray, k: int):
+        size = len(self.ids)
+        if size == 0:
+            return []
+        if self.widened is not None:
+            scores = self.widened[:size] @ query
+        else:
+            # numpy has no float16 BLAS; widen block by block and score in float32
+            scores = np.empty(size, dtype=np.float32)
+            for start in range(0, size, _SCORE_BLOCK_ROWS):
+                end = min(start + _SCORE_BLOCK_ROWS, size)
+                scores[start:end] = self.vectors[start:end].astype(np.float32) @ query
+        k = min(k, size)
+        top = np.argpartition(-scores, k - 1)[:k] if k < size else np.arange(size)
+        top = top[np.argsort(-scores[top])]
+        return [(self.ids[row], float(scores[row])) for row in top]
+
+
+class SemanticIndex:
+    """In-memory cosine-similarity index of prompt embeddings, partitioned by user.
+
+    Each user's prompts live in their own dense float16 matrix, so a search only
+    scores that user's rows with one matrix-vector product, and create and delete
+    update a single row in place. Scoring within a partition is exhaustive, so
+    results are exact top-k. Partitions searched recently also keep a float32
+    copy, least recently searched first out once ``hot_bytes`` is exceeded.
+    """
+
+    def __init__(self, hot_bytes: int = PROMPT_INDEX_HOT_BYTES):
+        self.dim = None
+        self.hot_bytes = hot_bytes
+        self._partitions = {}  # user => _Partition
+        self._hot = OrderedDict()  # user => bytes of its float32 copy, least recently searched first
+        self._hot_used = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return sum(len(partition.ids) for partition in self._partitions.values())
+
+    def add(self, user: str, prompt_id: str, vector) -> None:
+        vector = np.asarray(vector, dtype=np.float32)
+        with self._lock:
+            if self.dim is None:
+                self.dim = vector.shape[0]
+            elif vector.shape[0] != self.dim:
+                raise ValueError(f"Embedding dimension {vector.shape[0]} does not match the index dimension {self.dim}")
+            partition = self._partitions.get(user)
+            if partition is None:
+                partition = self._partitions[user] = _Partition(self.dim)
+            partition.add(prompt_id, vector)
+
+    def remove(self, user: str, prompt_id: str) -> bool:
+        with self._lock:
+            partition = self._partitions.get(user)
+            if partition is None or not partition.remove(prompt_id):
+                return False
+            if not partition.ids:
+                del self._partitions[user]
+                self._hot_used -= self._hot.pop(user, 0)
+            return True
+
+    def search(self, user: str, query, k: int = 5):
+        """``[(prompt_id, cosine similarity)]`` of the ``k`` prompts of ``user`` closest to ``query``."""
+        with self._lock:
+            partition = self._partitions.get(user)
+            if partition is None:
+                return []
+            self._touch(user, partition)
+            return partition.search(np.asarray(query, dtype=np.float32), k)
+
+    def _touch(self, user: str, partition: _Partition) -> None:
+        if partition.widened is not None:
+            self._hot.move_to_end(user)
+            return
+        # not widened yet, or the float32 copy was dropped when the partition grew
+        self._hot_used -= self._hot.pop(user, 0)
+        size = partition.vectors.size * 4
+        if size > self.hot_bytes:
+            return
+        while self._hot and self._hot_used + size > self.hot_bytes:
+            evicted, charged = self._hot.popitem(last=False)
+            self._partitions[evicted].widened = None
+            self._hot_used -= charged
+        partition.widened = partition.vectors.astype(np.float32)
+        self._hot[user] = size
+        self._hot_used += size
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "users": len(self._partitions),
+                "prompts": sum(len(partition.ids) for partition in self._partitions.values()),
+                "bytes": sum(partition.vectors.nbytes for partition in self._partitions.values()),
+                "hot_bytes": self._hot_used,
+            }
+
+
+def get_prompt_embedder() -> Optional[PromptEmbedder]:
+    """The embedder configured through the environment, or None when semantic search is disabled."""
+    if not PROMPT_EMBEDDING_ENDPOINT and not PROMPT_EMBEDDING_MODEL:
+        return None
+    return PromptEmbedder(PROMPT_EMBEDDING_ENDPOINT, PROMPT_EMBEDDING_MODEL, PROMPT_EMBEDDING_BATCH_SIZE)
@@ -1,12 +1,14 @@
 # Copyright (C) 2024 Intel Corporation
 # SPDX-License-Identifier: Apache-2.0
 import os
-from typing import Optional
+from typing import List, Literal, Optional
 
+from fastapi.responses import StreamingResponse
 from prompt_store import PromptStore
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 from comps import CustomLogger
+from comps.cores.common.mongo import ndjson
 from comps.cores.mega.micro_service import opea_microservices, register_microservice
 
 logger = CustomLogger("prompt_registry")
@@ -31,11 +33,24 @@ class PromptId(BaseModel):
     Attributes:
         user (str): The user of the requested prompt.
         prompt_id (str): The prompt_id of prompt to be retrieved from database.
+        prompt_text (str)[Optional]: Text to search prompts for.
+        search_type (str): "text" for keyword search or "semantic" for similarity search over the user's prompts.
+        top_k (int): Maximum number of search results.
+        limit (int)[Optional]: Maximum number of prompts to list.
+        after (str)[Optional]: prompt_id of the last prompt of the previous page.
+        fields (list[str])[Optional]: Fields to return when listing.
+        stream (bool): Stream the list as newline-delimited JSON.
     """
 
     user: str
     prompt_id: Optional[str] = None
     prompt_text: Optional[str] = None
+    search_type: Literal["text", "semantic"] = "text"
+    top_k: int = Field(5, gt=0)
+    limit: Optional[int] = Field(None, gt=0)
+    after: Optional[str] = None
+    fields: Optional[List[str]] = None
+    stream: bool = False
 
 
 @register_microservice(
@@ -92,10 +107,15 @@ async def get_prompt(prompt: PromptId):
         prompt_store.initialize_storage()
         if prompt.prompt_id is not None:
             response = await prompt_store.get_user_prompt_by_id(prompt.prompt_id)
+        elif prompt.prompt_text and prompt.search_type == "semantic":
+            response = await prompt_store.semantic_search(prompt.prompt_text, prompt.top_k)
         elif prompt.prompt_text:
-            response = await prompt_store.prompt_search(prompt.prompt_text)
+            response = await prompt_store.prompt_search(prompt.prompt_text, prompt.top_k)
+        elif prompt.stream:
+            documents = prompt_store.iter_prompt_of_user(prompt.limit, prompt.after, prompt.fields)
+            return StreamingResponse(ndjson(documents), media_type="application/x-ndjson")
         else:
-            response = await prompt_store.get_all_prompt_of_user()
+            response = await prompt_store.get_all_prompt_of_user(prompt.limit, prompt.after, prompt.fields)
         if logflag:
             logger.info(response)
         return response
@@ -140,4 +160,6 @@ async def delete_prompt(prompt: PromptId):
 
 
 if __name__ == "__main__":
+    opea_microservices["opea_service@prompt"].add_startup_event(PromptStore.create_indexes())
+    opea_microservices["opea_service@prompt"].add_startup_event(PromptStore.load_semantic_index())
     opea_microservices["opea_service@prompt"].start()
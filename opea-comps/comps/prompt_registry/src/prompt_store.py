@@ -6,6 +6,16 @@ import bson.errors as BsonError
 from bson.objectid import ObjectId
 from integrations.mongo.config import COLLECTION_NAME
 from integrations.mongo.mongo_conn import MongoClient
+from integrations.semantic_index import SemanticIndex, get_prompt_embedder
+
+from comps import CustomLogger
+from comps.cores.common.mongo import build_projection, create_indexes, iter_documents
+
+logger = CustomLogger("prompt_store")
+
+# semantic search is enabled when an embedder is configured; the index is per process
+prompt_embedder = get_prompt_embedder()
+semantic_index = SemanticIndex()
 
 
 class PromptStore:
@@ -21,6 +31,50 @@ class PromptStore:
             self.db_client = MongoClient.get_db_client()
         self.collection = self.db_client[COLLECTION_NAME]
 
+    @staticmethod
+    async def create_indexes() -> None:
+        """Creates the per-user index and the text index used by prompt_search; run once at startup."""
+        await create_indexes(
+            MongoClient.get_db_client()[COLLECTION_NAME], [[("user", 1), ("_id", 1)], [("$**", "text")]]
+        )
+
+    @staticmethod
+    async def load_semantic_index() -> None:
+        """Builds the in-memory semantic index from the stored embeddings; run once at startup.
+
+        Prompts stored without an embedding, or embedded by another model, are
+        embedded now and updated in place.
+        """
+        if prompt_embedder is None:
+            return
+        collection = MongoClient.get_db_client()[COLLECTION_NAME]
+        model = prompt_embedder.name
+        missing = []
+
+        async def embed_missing():
+            vectors = await prompt_embedder.embed([document["prompt_text"] for document in missing])
+            for document, vector in zip(missing, vectors):
+                await collection.update_one(
+                    {"_id": document["_id"]}, {"$set": {"embedding": vector.tolist(), "embedding_model": model}}
+                )
+                semantic_index.add(document["user"], str(document["_id"]), vector)
+            missing.clear()
+
+        try:
+            cursor = collection.find({}, {"user": 1, "prompt_text": 1, "embedding": 1, "embedding_model": 1})
+            async for document in cursor:
+                if document.get("embedding") and document.get("embedding_model") == model:
+                    semantic_index.add(document["user"], str(document["_id"]), document["embedding"])
+                else:
+                    missing.append(document)
+                    if len(missing) >= prompt_embedder.batch_size:
+                        await embed_missing()
+            if missing:
+                await embed_missing()
+            logger.info(f"Semantic prompt index loaded: {semantic_index.stats()}")
+        except Exception as e:
+            logger.error(f"Failed to load the semantic prompt index: {e}")
+
     async def save_prompt(self, prompt) -> str:
         """Stores a new prompt into the storage.
 
@@ -34,18 +88,49 @@ class PromptStore:
             Exception: If an error occurs while storing the prompt.
         """
         try:
-            inserted_prompt = await self.collection.insert_one(
-                prompt.model_dump(by_alias=True, mode="json", exclude={"id"})
-            )
+            document = prompt.model_dump(by_alias=True, mode="json", exclude={"id"})
+            vector = None
+            if prompt_embedder is not None:
+                try:
+                    vector = (await prompt_embedder.embed([document["prompt_text"]]))[0]
+                    document["embedding"] = vector.tolist()
+                    document["embedding_model"] = prompt_embedder.name
+                except Exception as e:
+                    # still store the prompt; it is embedded when the index is next loaded
+                    logger.error(f"Failed to embed prompt: {e}")
+            inserted_prompt = await self.collection.insert_one(document)
             prompt_id = str(inserted_prompt.inserted_id)
+            if vector is not None:
+                semantic_index.add(self.user, prompt_id, vector)
             return prompt_id
 
         except Exception as e:
             print(e)
             raise Exception(e)
 
-    async def get_all_prompt_of_user(self) -> list[dict]:
-        """Retrieves all prompts of a user from the collection.
+    def iter_prompt_of_user(self, limit=None, after=None, fields=None):
+        """Yields the prompts of a user in creation order, as they are read.
+
+        Takes the same arguments as get_all_prompt_of_user.
+
+        Raises:
+            KeyError: If ``after`` is not a valid prompt ID.
+            ValueError: If a field name is invalid.
+        """
+        try:
+            projection = build_projection(fields, {"data": 0, "embedding": 0})
+            return iter_documents(self.collection, {"user": self.user}, projection, limit, after)
+        except BsonError.InvalidId as e:
+            print(e)
+            raise KeyError(e)
+
+    async def get_all_prompt_of_user(self, limit=None, after=None, fields=None) -> list[dict]:
+        """Retrieves prompts of a user from the collection, oldest first.
+
+        Args:
+            limit (int, optional): Return at most this many prompts.
+            after (str, optional): ID of the last prompt of the previous page.
+            fields (list[str], optional): Fields to return. Defaults to all but the embedding.
 
         Returns:
             list[dict] | None: List of dict of prompts of the user, None otherwise.
@@ -54,15 +139,10 @@ class PromptStore:
             Exception: If there is an error while retrieving data.
         """
         try:
-            prompt_list: list = []
-            cursor = self.collection.find({"user": self.user}, {"data": 0})
-
-            async for document in cursor:
-                document["id"] = str(document["_id"])
-                del document["_id"]
-                prompt_list.append(document)
-            return prompt_list
+            return [document async for document in self.iter_prompt_of_user(limit, after, fields)]
 
+        except KeyError:
+            raise
         except Exception as e:
             print(e)
             raise Exception(e)
@@ -95,11 +175,12 @@ class PromptStore:
             print(e)
             raise Exception(e)
 
-    async def prompt_search(self, keyword) -> list | None:
+    async def prompt_search(self, keyword, top_k=5) -> list | None:
         """Retrieves prompt from the collection based on keyword provided.
 
         Args:
             keyword (str): The keyword of prompt to search for.
+            top_k (int): Maximum number of prompts to return.
 
         Returns:
             list | None: The list of relevant prompt if found, None otherwise.
@@ -108,14 +189,12 @@ class PromptStore:
             Exception: If there is an error while searching data.
         """
         try:
-            # Create a text index if not already created
-            self.collection.create_index([("$**", "text")])
-            # Perform text search
+            # Perform text search on the text index created at startup
             results = self.collection.find({"$text": {"$search": keyword}}, {"score": {"$meta": "textScore"}})
             sorted_results = results.sort([("score", {"$meta": "textScore"})])
 
-            # Return a list of top 5 most relevant data
-            relevant_data = await sorted_results.to_list(length=5)
+            # Return a list of top_k most relevant data
+            relevant_data = await sorted_results.to_list(length=top_k)
 
             # Serialize data and return
             serialized_data = [
@@ -129,6 +208,40 @@ class PromptStore:
             print(e)
             raise Exception(e)
 
+    async def semantic_search(self, query, top_k=5) -> list:
+        """Retrieves the prompts of the user closest in meaning to ``query``.
+
+        Args:
+            query (str): Text to search for.
+            top_k (int): Maximum number of prompts to return.
+
+        Returns:
+            list: Prompts with their cosine similarity as ``score``, best first.
+
+        Raises:
+            Exception: If semantic search is not configured or the search fails.
+        """
+        if prompt_embedder is None:
+            raise Exception("Semantic search requires PROMPT_EMBEDDING_ENDPOINT or PROMPT_EMBEDDING_MODEL")
+        try:
+            vector = (await prompt_embedder.embed([query]))[0]
+            hits = semantic_index.search(self.user, vector, top_k)
+            if not hits:
+                return []
+
+            ids = [ObjectId(prompt_id) for prompt_id, _ in hits]
+            cursor = self.collection.find({"_id": {"$in": ids}}, {"prompt_text": 1})
+            prompt_texts = {str(doc["_id"]): doc["prompt_text"] async for doc in cursor}
+            return [
+                {"id": prompt_id, "prompt_text": prompt_texts[prompt_id], "user": self.user, "score": score}
+                for prompt_id, score in hits
+                if prompt_id in prompt_texts
+            ]
+
+        except Exception as e:
+            print(e)
+            raise Exception(e)
+
     async def delete_prompt(self, prompt_id) -> bool:
         """Delete a prompt from collection by given prompt_id.
 
@@ -148,6 +261,8 @@ class PromptStore:
 
             delete_count = result.deleted_count
             print(f"Deleted {delete_count} documents!")
+            if delete_count == 1:
+                semantic_index.remove(self.user, prompt_id)
 
             return True if delete_count == 1 else False
 
@@ -1,9 +1,10 @@
 # Copyright (C) 2024 Intel Corporation
 # SPDX-License-Identifier: Apache-2.0
 
+import asyncio
 import json
 import os
-from typing import Union
+from typing import List, Union
 
 import requests
 from huggingface_hub import AsyncInferenceClient
@@ -25,6 +26,8 @@ logflag = os.getenv("LOGFLAG", False)
 TOKEN_URL = os.getenv("TOKEN_URL")
 CLIENTID = os.getenv("CLIENTID")
 CLIENT_SECRET = os.getenv("CLIENT_SECRET")
+# Upper bound of texts merged into one TEI call, matching TEI's --max-client-batch-size
+TEI_RERANKING_MAX_BATCH_TEXTS = int(os.getenv("TEI_RERANKING_MAX_BATCH_TEXTS", 32))
 
 
 @OpeaComponentRegistry.register("OPEA_TEI_RERANKING")
@@ -63,14 +66,8 @@ class OpeaTEIReranking(OpeaComponent):
 
         if input.retrieved_docs:
             docs = [doc.text for doc in input.retrieved_docs]
-            if isinstance(input, SearchedDoc):
-                query = input.initial_query
-            else:
-                # for RerankingRequest, ChatCompletionRequest
-                query = input.input
-
             response = await self.client.post(
-                json={"query": query, "texts": docs},
+                json={"query": self._query(input), "texts": docs},
                 model=f"{self.base_url}/rerank",
                 task="text-reranking",
             )
@@ -80,6 +77,72 @@ class OpeaTEIReranking(OpeaComponent):
                     {"text": input.retrieved_docs[best_response["index"]].text, "score": best_response["score"]}
                 )
 
+        return self._build_response(input, reranking_results)
+
+    async def invoke_batch(
+        self, inputs: List[Union[SearchedDoc, RerankingRequest, ChatCompletionRequest]]
+    ) -> List[Union[LLMParamsDoc, RerankingResponse, ChatCompletionRequest, Exception]]:
+        """Reranks several requests, sharing one TEI call between requests with the same query.
+
+        TEI scores one query against many texts, so requests asking the same question
+        (common when a megaservice fans out) are merged into a single call over the union
+        of their documents, up to ``TEI_RERANKING_MAX_BATCH_TEXTS`` texts per call;
+        distinct queries are sent concurrently.
+
+        Returns:
+            list: One response per input, or the exception raised for it.
+        """
+        results = [None] * len(inputs)
+        groups = []  # (query, member indexes)
+        open_groups = {}  # query => (group, number of texts)
+        for i, input in enumerate(inputs):
+            if not input.retrieved_docs:
+                results[i] = self._build_response(input, [])
+                continue
+            query, size = self._query(input), len(input.retrieved_docs)
+            group, texts = open_groups.get(query, (None, 0))
+            if group is None or texts + size > TEI_RERANKING_MAX_BATCH_TEXTS:
+                group, texts = (query, []), 0
+                groups.append(group)
+            group[1].append(i)
+            open_groups[query] = (group, texts + size)
+
+        async def rerank_group(query, members):
+            texts, owners = [], []
+            for i in members:
+                for local_index, doc in enumerate(inputs[i].retrieved_docs):
+                    texts.append(doc.text)
+                    owners.append((i, local_index))
+            try:
+                response = await self.client.post(
+                    json={"query": query, "texts": texts},
+                    model=f"{self.base_url}/rerank",
+                    task="text-reranking",
+                )
+            except Exception as e:
+                for i in members:
+                    results[i] = e
+                return
+
+            ranked = {i: [] for i in members}
+            # TEI returns the texts ordered by score, so each request's share stays ordered
+            for best_response in json.loads(response.decode()):
+                i, local_index = owners[best_response["index"]]
+                if len(ranked[i]) < inputs[i].top_n:
+                    ranked[i].append({"text": inputs[i].retrieved_docs[local_index].text, "score": best_response["score"]})
+            for i in members:
+                results[i] = self._build_response(inputs[i], ranked[i])
+
+        await asyncio.gather(*[rerank_group(query, members) for query, members in groups])
+        return results
+
+    def _query(self, input) -> str:
+        if isinstance(input, SearchedDoc):
+            return input.initial_query
+        # for RerankingRequest, ChatCompletionRequest
+        return input.input
+
+    def _build_response(self, input, reranking_results: list):
         if isinstance(input, SearchedDoc):
             result = [doc["text"] for doc in reranking_results]
             if logflag:
@@ -1,6 +1,7 @@
 # Copyright (C) 2024 Intel Corporation
 # SPDX-License-Identifier: Apache-2.0
 
+import asyncio
 import os
 import time
 from typing import Union
@@ -13,6 +14,7 @@ from comps import (
     OpeaComponentLoader,
     ServiceType,
     opea_microservices,
+    register_batch_infer,
     register_microservice,
     register_statistics,
     statistics_dict,
@@ -29,12 +31,23 @@ rerank_component_name = os.getenv("RERANK_COMPONENT_NAME", "OPEA_TEI_RERANKING")
 loader = OpeaComponentLoader(rerank_component_name, description=f"OPEA RERANK Component: {rerank_component_name}")
 
 
+# Dynamic batching: concurrent requests are grouped and sent to the backend together
+RERANKING_DYNAMIC_BATCHING = os.getenv("RERANKING_DYNAMIC_BATCHING", "false").lower() in ("true", "1", "yes")
+RERANKING_BATCH_TIMEOUT_MS = float(os.getenv("RERANKING_BATCH_TIMEOUT_MS", 10))
+RERANKING_MAX_BATCH_SIZE = int(os.getenv("RERANKING_MAX_BATCH_SIZE", 32))
+RERANKING_MAX_QUEUE_SIZE = int(os.getenv("RERANKING_MAX_QUEUE_SIZE", 1024))
+
+
 @register_microservice(
     name="opea_service@reranking",
     service_type=ServiceType.RERANK,
     endpoint="/v1/reranking",
     host="0.0.0.0",
     port=8000,
+    dynamic_batching=RERANKING_DYNAMIC_BATCHING,
+    dynamic_batching_timeout=RERANKING_BATCH_TIMEOUT_MS / 1000,
+    dynamic_batching_max_batch_size=RERANKING_MAX_BATCH_SIZE,
+    dynamic_batching_max_queue_size=RERANKING_MAX_QUEUE_SIZE,
 )
 @opea_telemetry
 @register_statistics(names=["opea_service@reranking"])
@@ -49,7 +62,10 @@ async def reranking(
 
     try:
         # Use the loader to invoke the component
-        reranking_response = await loader.invoke(input)
+        if RERANKING_DYNAMIC_BATCHING:
+            reranking_response = await opea_microservices["opea_service@reranking"].enqueue_request(input)
+        else:
+            reranking_response = await loader.invoke(input)
 
         # Log the result if logging is enabled
         if logflag:
@@ -64,6 +80,14 @@ async def reranking(
         raise
 
 
+@register_batch_infer("opea_service@reranking")
+async def reranking_batch(service_type, batch):
+    inputs = [req["request"] for req in batch]
+    if hasattr(loader.component, "invoke_batch"):
+        return await loader.component.invoke_batch(inputs)
+    return await asyncio.gather(*[loader.invoke(input) for input in inputs], return_exceptions=True)
+
+
 if __name__ == "__main__":
     opea_microservices["opea_service@reranking"].start()
     logger.info("OPEA Reranking Microservice is starting...")
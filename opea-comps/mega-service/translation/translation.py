@@ -98,6 +98,7 @@ class TranslationService:
             output_datatype=ChatCompletionResponse,
         )
         self.service.add_route(self.endpoint, self.handle_request, methods=["POST"])
+        self.service.add_shutdown_event(self.megaservice.close)
         self.service.start()
 
 